@@ -72,6 +72,12 @@ with col2:
     if st.button("Grants"):
         st.switch_page("pages/4_Grants.py")
 
+if st.button("Drift"):
+    st.switch_page("pages/5_Drift.py")
+
+if st.button("History"):
+    st.switch_page("pages/6_History.py")
+
 st.markdown("<hr>", unsafe_allow_html=True)
 st.markdown("""
     <div style='text-align: center; color: grey; font-size: 0.85rem; padding: 1rem 0;'>
@@ -0,0 +1,474 @@
+import base64
+import hashlib
+import importlib.abc
+import importlib.util
+import itertools
+import re
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# ------------------------ Fake Account ------------------------
+# Deterministic, in-memory stand-ins for the account metadata the pages
+# read. `scale` multiplies the object counts so the same scenarios can be
+# run against a small or a large account.
+
+SIZES = ["XSMALL", "SMALL", "MEDIUM", "LARGE", "XLARGE"]
+
+def make_account(scale: float = 1.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n_users = int(5000 * scale)
+    n_roles = int(500 * scale)
+    n_warehouses = max(int(50 * scale), 5)
+    created = pd.Timestamp("2025-01-01")
+
+    roles = pd.DataFrame({
+        "NAME": [f"ROLE_{i:05d}" for i in range(n_roles)],
+        "OWNER": "SECURITYADMIN",
+        "COMMENT": [f"Role {i}" if i % 3 else None for i in range(n_roles)],
+        "CREATED_ON": created,
+    })
+    warehouses = pd.DataFrame({
+        "NAME": [f"WH_{i:03d}" for i in range(n_warehouses)],
+        "WAREHOUSE_SIZE": [SIZES[i % len(SIZES)] for i in range(n_warehouses)],
+        "WAREHOUSE_TYPE": "STANDARD",
+        "SCALING_POLICY": "STANDARD",
+        "AUTO_SUSPEND": [[60, 300, 600][i % 3] for i in range(n_warehouses)],
+        "AUTO_RESUME": True,
+        "ENABLE_QUERY_ACCELERATION": False,
+        "QUERY_ACCELERATION_MAX_SCALE_FACTOR": 8,
+        "MIN_CLUSTER_COUNT": 1,
+        "MAX_CLUSTER_COUNT": [1 + i % 3 for i in range(n_warehouses)],
+        "RESOURCE_MONITOR": None,
+        "OWNER": "SYSADMIN",
+        "COMMENT": None,
+        "CREATED_ON": created,
+        "UPDATED_ON": created,
+    })
+    user_names = [f"USER_{i:06d}" for i in range(n_users)]
+    users = pd.DataFrame({
+        "NAME": user_names,
+        "LOGIN_NAME": user_names,
+        "DISPLAY_NAME": [f"User {i}" for i in range(n_users)],
+        "FIRST_NAME": "Bench",
+        "LAST_NAME": [f"User{i}" for i in range(n_users)],
+        "EMAIL": [f"user{i}@example.com" for i in range(n_users)],
+        "COMMENT": None,
+        "DISABLED": rng.random(n_users) < 0.05,
+        "MUST_CHANGE_PASSWORD": False,
+        "DEFAULT_WAREHOUSE": warehouses["NAME"].to_numpy()[rng.integers(0, n_warehouses, n_users)],
+        "DEFAULT_NAMESPACE": None,
+        "DEFAULT_ROLE": roles["NAME"].to_numpy()[rng.integers(0, n_roles, n_users)],
+        "DEFAULT_SECONDARY_ROLES": None,
+        "OWNER": "USERADMIN",
+        "TYPE": "PERSON",
+        "CREATED_ON": created,
+    })
+
+    # Grants: a shallow role hierarchy plus table privileges
+    n_grants = int(20000 * scale)
+    parents = rng.integers(0, n_roles, n_roles)
+    hierarchy = pd.DataFrame({
+        "PRIVILEGE": "USAGE",
+        "GRANTED_ON": "ROLE",
+        "NAME": roles["NAME"],
+        "TABLE_CATALOG": None,
+        "TABLE_SCHEMA": None,
+        "GRANTEE_NAME": roles["NAME"].to_numpy()[parents],
+        "GRANT_OPTION": "false",
+    })
+    tables = pd.DataFrame({
+        "PRIVILEGE": np.array(["SELECT", "INSERT", "UPDATE"])[rng.integers(0, 3, n_grants)],
+        "GRANTED_ON": "TABLE",
+        "NAME": [f"T_{i % 2000:04d}" for i in range(n_grants)],
+        "TABLE_CATALOG": "BENCH_DB",
+        "TABLE_SCHEMA": [f"S_{i % 20:02d}" for i in range(n_grants)],
+        "GRANTEE_NAME": roles["NAME"].to_numpy()[rng.integers(0, n_roles, n_grants)],
+        "GRANT_OPTION": "false",
+    })
+    grants_to_roles = pd.concat([hierarchy, tables], ignore_index=True)
+    grants_to_users = pd.DataFrame({"ROLE": users["DEFAULT_ROLE"], "GRANTEE_NAME": users["NAME"]})
+
+    # ACCOUNT_USAGE history, already aggregated per warehouse per hour
+    hours = 90 * 24
+    wh = np.repeat(warehouses["NAME"].to_numpy(), hours)
+    hour = np.tile(pd.date_range("2026-01-01", periods=hours, freq="h").to_numpy(), n_warehouses)
+    size = wh.size
+    busy = np.repeat(rng.random(n_warehouses) * 10, hours)
+    metering = pd.DataFrame({"WAREHOUSE_NAME": wh, "HOUR": hour, "CREDITS": rng.random(size)})
+    load = pd.DataFrame({"WAREHOUSE_NAME": wh, "HOUR": hour, "RUNNING": rng.random(size) * busy,
+                         "QUEUED": rng.random(size) * 0.2})
+    load["PEAK_LOAD"] = load["RUNNING"] * 1.5 + load["QUEUED"]
+    queries = pd.DataFrame({
+        "WAREHOUSE_NAME": wh, "HOUR": hour,
+        "QUERIES": rng.integers(1, 200, size),
+        "EXECUTION_SECONDS": rng.random(size) * 500,
+        "QUEUED_SECONDS": rng.random(size) * 20,
+        "LOCAL_SPILL_BYTES": rng.random(size) * 1e8,
+        "REMOTE_SPILL_BYTES": np.zeros(size),
+        "SPILLING_QUERIES": rng.integers(0, 5, size),
+    })
+
+    # Objects as ACCOUNT_USAGE lists them: the tables the grants refer to
+    objects = tables[["TABLE_CATALOG", "TABLE_SCHEMA", "NAME"]].drop_duplicates()
+    schemata = objects[["TABLE_CATALOG", "TABLE_SCHEMA"]].drop_duplicates().rename(
+        columns={"TABLE_CATALOG": "CATALOG_NAME", "TABLE_SCHEMA": "SCHEMA_NAME"})
+    objects = objects.rename(columns={"NAME": "TABLE_NAME"}).assign(IS_VIEW=False)
+
+    drifted = users["NAME"].iloc[: max(n_users // 50, 1)]
+    drift = pd.DataFrame({
+        "KIND": "users",
+        "NAME": drifted,
+        "STATUS": "changed",
+        "FIELD": "email",
+        "CHANGE": "changed",
+        "REPO_VALUE": "repo@example.com",
+        "LIVE_VALUE": "live@example.com",
+        "DETECTED_AT": pd.Timestamp("2026-10-01"),
+    })
+
+    return {
+        "users": users,
+        "roles": roles,
+        "warehouses": warehouses,
+        "grants_to_roles": grants_to_roles,
+        "grants_to_users": grants_to_users,
+        "metering": metering,
+        "load": load,
+        "queries": queries,
+        "drift": drift,
+        "databases": pd.DataFrame({"NAME": ["BENCH_DB"]}),
+        "schemata": schemata.reset_index(drop=True),
+        "tables": objects.reset_index(drop=True),
+        "network_policies": pd.DataFrame({
+            "NAME": ["CORPORATE_ONLY", "SERVICE_ACCOUNTS", "VPN_ONLY"],
+            "COMMENT": None,
+            "CREATED_ON": created,
+        }),
+    }
+
+# ------------------------ Fake Snowpark ------------------------
+
+class FakeJob:
+    # Answers straight away but only hands the result over once the
+    # session's latency has passed since submission, so jobs that are in
+    # flight together overlap the way server-side queries do.
+
+    def __init__(self, session, sql: str, pandas: bool = False):
+        self.query_id, self._result = session._execute(sql)
+        self._ready_at = time.perf_counter() + session.latency
+        self._pandas = pandas
+
+    def result(self):
+        time.sleep(max(0.0, self._ready_at - time.perf_counter()))
+        if not self._pandas:
+            return self._result
+        return self._result.copy() if isinstance(self._result, pd.DataFrame) else pd.DataFrame(self._result)
+
+class FakeDataFrame:
+    # Lazy like Snowpark: the query only "runs" on collect/to_pandas.
+
+    def __init__(self, session, sql: str):
+        self.session = session
+        self.sql = sql
+
+    def collect(self, block: bool = True):
+        job = FakeJob(self.session, self.sql)
+        return job.result() if block else job
+
+    def collect_nowait(self):
+        return self.collect(block=False)
+
+    def to_pandas(self, block: bool = True):
+        job = FakeJob(self.session, self.sql, pandas=True)
+        return job.result() if block else job
+
+class FakeSession:
+    # Answers the SQL the app issues from `account`, and counts every query
+    # so the benchmark can report queries per rerun.
+
+    def __init__(self, account: dict, current_user: str = "BENCH_USER", latency_ms: float = 0):
+        self.account = account
+        self.current_user = current_user
+        self.latency = latency_ms / 1000
+        self.query_count = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._results = {}
+
+    def sql(self, sql: str):
+        return FakeDataFrame(self, sql)
+
+    def _execute(self, sql: str):
+        with self._lock:
+            self.query_count += 1
+            query_id = f"01bench-{next(self._ids):08d}"
+        result = self._answer(" ".join(sql.split()))
+        self._results[query_id] = result
+        return query_id, result
+
+    def _answer(self, sql: str):
+        from snowflake.snowpark import Row
+        a = self.account
+        scan = re.search(r"RESULT_SCAN\('([^']+)'\)", sql)
+        if scan:
+            return self._results[scan.group(1)]
+        m = re.match(r"SHOW USERS LIMIT (\d+)(?: FROM '([^']*)')?", sql)
+        if m:
+            users = a["users"]
+            if m.group(2):
+                users = users[users["NAME"] > m.group(2)]
+            return users.head(int(m.group(1)))
+        m = re.match(r"SHOW (\w+) LIKE '([^']*)'(?: IN \w+ (\S+))?", sql)
+        if m:
+            exists = self._live_exists(m.group(1), m.group(3), m.group(2))
+            return [Row(name=m.group(2))] if exists else []
+        if sql.startswith("SHOW DATABASES"):
+            return a["databases"]
+        if sql.startswith("SHOW ROLES"):
+            return a["roles"]
+        if sql.startswith("SHOW WAREHOUSES"):
+            return a["warehouses"]
+        if sql.startswith("SHOW NETWORK POLICIES"):
+            return a["network_policies"]
+        if sql.startswith("SHOW PARAMETERS IN WAREHOUSE"):
+            return [Row(key="MAX_CONCURRENCY_LEVEL", value="8"),
+                    Row(key="STATEMENT_TIMEOUT_IN_SECONDS", value="172800"),
+                    Row(key="STATEMENT_QUEUED_TIMEOUT_IN_SECONDS", value="0")]
+        if sql.startswith("SELECT CURRENT_USER()"):
+            return [Row(self.current_user)]
+        for marker, key in (("ACCOUNT_USAGE.SCHEMATA", "schemata"), ("ACCOUNT_USAGE.TABLES", "tables"),
+                            ("GRANTS_TO_ROLES", "grants_to_roles"), ("GRANTS_TO_USERS", "grants_to_users"),
+                            ("WAREHOUSE_METERING_HISTORY", "metering"), ("WAREHOUSE_LOAD_HISTORY", "load"),
+                            ("QUERY_HISTORY", "queries"), ("FROM IAC_DRIFT ", "drift")):
+            if marker in sql + " ":
+                return a[key]
+        raise ValueError(f"Fake session has no answer for: {sql[:120]}")
+
+    def _live_exists(self, kind: str, parent: str, name: str) -> bool:
+        # What SHOW <kind> LIKE finds. Tables named T_ plus five digits (the
+        # ones the grants scenarios submit) exist live but not yet in
+        # ACCOUNT_USAGE, as a freshly created table would.
+        a = self.account
+        if kind == "TABLES":
+            database, schema = parent.split(".")
+            tables = a["tables"]
+            listed = tables[(tables["TABLE_CATALOG"] == database) & (tables["TABLE_SCHEMA"] == schema)]
+            return not listed.empty and (name in set(listed["TABLE_NAME"]) or bool(re.fullmatch(r"T_\d{5}", name)))
+        if kind == "SCHEMAS":
+            schemata = a["schemata"]
+            return name in set(schemata.loc[schemata["CATALOG_NAME"] == parent, "SCHEMA_NAME"])
+        names = {"ROLES": a["roles"], "WAREHOUSES": a["warehouses"], "DATABASES": a["databases"]}.get(kind)
+        return names is not None and name in set(names["NAME"])
+
+# ------------------------ Fake GitHub ------------------------
+
+class FakeRequester:
+    # The raw requests utils.github makes (branch, file contents, open pulls,
+    # the issues listing, moving a branch), with ETags on the GETs.
+
+    def __init__(self, repo):
+        self.repo = repo
+        # What PyGithub keeps from the X-RateLimit-* headers
+        self.rate_limiting = (4990, 5000)
+        self.rate_limiting_resettime = int(time.time()) + 3600
+
+    def requestJsonAndCheck(self, verb, url, parameters=None, headers=None, input=None):
+        from github import GithubException
+        self.repo.calls += 1
+        path = url[len(self.repo.url):]
+        if verb == "PATCH" and path.startswith("/git/refs/heads/"):
+            branch = path[len("/git/refs/heads/"):]
+            if branch not in self.repo.refs:
+                raise GithubException(422, {"message": "Reference does not exist"}, {})
+            self.repo.refs[branch] = input["sha"]
+            return {}, {"ref": f"refs/heads/{branch}", "object": {"sha": input["sha"]}}
+        if verb == "PATCH" and path.startswith("/pulls/"):
+            pull = self.repo.pulls[int(path.split("/")[2]) - 1]
+            pull.update(input, updated_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+            return {}, pull
+        if path.startswith("/branches/"):
+            name = path.split("/", 2)[2]
+            if name not in self.repo.refs:
+                raise GithubException(404, {"message": "Branch not found"}, {})
+            head = self.repo.refs[name]
+            data = {"name": name, "commit": {
+                "sha": head, "url": f"{self.repo.url}/commits/{head}",
+                "commit": {"sha": head, "url": f"{self.repo.url}/git/commits/{head}",
+                           "tree": {"sha": "tree0", "url": f"{self.repo.url}/git/trees/tree0"}},
+            }}
+        elif path == "/pulls":
+            head = (parameters or {}).get("head", "").split(":")[-1]
+            data = [pull for pull in self.repo.pulls if pull["head"] == head and pull["state"] == "open"]
+        elif path.startswith("/pulls/"):
+            data = self.repo.pulls[int(path.split("/")[2]) - 1]
+        elif path == "/issues":
+            data = self.repo.issues(**(parameters or {}))
+        elif path.startswith("/contents/"):
+            name = path[len("/contents/"):]
+            if name not in self.repo.files:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            content = self.repo.files[name].encode()
+            data = {"type": "file", "path": name, "name": name, "encoding": "base64",
+                    "sha": hashlib.sha1(content).hexdigest(), "content": base64.b64encode(content).decode()}
+        else:
+            raise GithubException(404, {"message": "Not Found"}, {})
+        etag = '"' + hashlib.md5(repr(data).encode()).hexdigest() + '"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return {"etag": etag}, None
+        return {"etag": etag}, data
+
+class FakeRepo:
+    def __init__(self, full_name: str, files: dict):
+        self.full_name = full_name
+        self.url = f"https://api.github.invalid/repos/{full_name}"
+        self.default_branch = "main"
+        self.refs = {"main": "commit0"}
+        self.files = files
+        self.calls = 0
+        self.pulls = make_pull_history(FakeGithub.history_size)
+        self._ids = itertools.count(1)
+        self._requester = FakeRequester(self)
+
+    def issues(self, since=None, per_page=30, page=1, **_):
+        # GET /issues?state=all&sort=updated&direction=asc: PRs as issues
+        pulls = sorted((p for p in self.pulls if not since or p["updated_at"] >= since),
+                       key=lambda p: (p["updated_at"], p["number"]))
+        return [
+            {"number": p["number"], "title": p["title"], "body": p["body"],
+             "state": "open" if p["state"] == "open" else "closed",
+             "created_at": p["created_at"], "updated_at": p["updated_at"], "html_url": p["html_url"],
+             "pull_request": {"url": p["url"], "merged_at": p["updated_at"] if p["state"] == "merged" else None}}
+            for p in pulls[(int(page) - 1) * int(per_page):int(page) * int(per_page)]
+        ]
+
+    def create_git_tree(self, elements, base_tree=None):
+        self.calls += 1
+        return SimpleNamespace(sha=f"tree{next(self._ids)}")
+
+    def create_git_commit(self, message, tree, parents):
+        self.calls += 1
+        return SimpleNamespace(sha=f"commit{next(self._ids)}")
+
+    def create_git_ref(self, ref, sha):
+        from github import GithubException
+        self.calls += 1
+        branch = ref[len("refs/heads/"):]
+        if branch in self.refs:
+            raise GithubException(422, {"message": "Reference already exists"}, {})
+        self.refs[branch] = sha
+        return SimpleNamespace(ref=ref, sha=sha)
+
+    def create_pull(self, title, body, head, base):
+        self.calls += 1
+        number = len(self.pulls) + 1
+        html_url = f"https://github.invalid/{self.full_name}/pull/{number}"
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.pulls.append({"number": number, "title": title, "body": body, "head": head, "state": "open",
+                           "created_at": now, "updated_at": now,
+                           "url": f"{self.url}/pulls/{number}", "html_url": html_url})
+        return SimpleNamespace(number=number, html_url=html_url)
+
+class FakeGithub:
+    repos = {}
+    files = {}
+    history_size = 0
+
+    def __init__(self, token=None, *args, **kwargs):
+        self.token = token
+
+    def get_repo(self, full_name: str):
+        if full_name not in FakeGithub.repos:
+            FakeGithub.repos[full_name] = FakeRepo(full_name, FakeGithub.files)
+        FakeGithub.repos[full_name].calls += 1
+        return FakeGithub.repos[full_name]
+
+def make_pull_history(n: int):
+    # Past PRs: mostly app-raised and merged, one in ten from elsewhere.
+    pulls = []
+    start = pd.Timestamp("2025-01-01", tz="UTC")
+    for i in range(n):
+        number = i + 1
+        kind = ["users", "roles", "warehouses", "grants"][i % 4]
+        name = f"{kind.upper()[:-1]}_{i:05d}"
+        path = "users.yaml" if kind == "users" else f"{kind}/{name.lower()}.yaml"
+        title = f"[IaC] Update: {path}" if i % 10 else f"Bump dependencies ({i})"
+        created = start + pd.Timedelta(hours=i)
+        pulls.append({
+            "number": number, "title": title, "head": f"seed-{number}",
+            "body": f"Generated by Snowflake user: `USER_{i % 50:04d}` via the IaC Assistant.\n\nObjects: `{name}`",
+            "state": "open" if i >= n - 20 else ("closed" if i % 7 == 0 else "merged"),
+            "created_at": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updated_at": (created + pd.Timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "url": f"https://api.github.invalid/pulls/{number}",
+            "html_url": f"https://github.invalid/pull/{number}",
+        })
+    return pulls
+
+def github_calls():
+    return sum(repo.calls for repo in FakeGithub.repos.values())
+
+def make_repo_files(account: dict):
+    # The repo YAML the PR flow merges into, one entry per existing object.
+    users = "users:\n" + "".join(f"  - name: {n}\n    default_role: PUBLIC\n" for n in account["users"]["NAME"])
+    roles = "roles:\n" + "".join(f"  - name: {n}\n" for n in account["roles"]["NAME"])
+    warehouses = "warehouses:\n" + "".join(f"  - name: {n}\n    warehouse_size: XSMALL\n"
+                                           for n in account["warehouses"]["NAME"])
+    return {"users.yaml": users, "roles.yaml": roles, "warehouses.yaml": warehouses,
+            "grants/role_00000_select.yaml": "grants:\n  - role: ROLE_00000\n    privileges:\n      - SELECT\n"
+                                             "    on:\n      object_type: TABLE\n      name: BENCH_DB.S_00.T_0000\n"}
+
+# ------------------------ Local Repository ------------------------
+
+def make_local_repo(account: dict, path: str):
+    # A bare repository at path holding make_repo_files, for --vcs local.
+    import subprocess
+    from utils.local_git import LocalGitBackend
+    subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=main", path], check=True)
+    backend = LocalGitBackend(path)
+    backend.create_branch("main", backend.commit(make_repo_files(account), backend.head("main"), "seed"))
+    return path
+
+# ------------------------ Install ------------------------
+# The app imports Snowpark and PyGithub lazily, and the cold-start benchmark
+# times those imports, so the fakes are patched in as each module is first
+# imported rather than by importing it here.
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    def __init__(self, name: str, patch):
+        self.name = name
+        self.patch = patch
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.name:
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        exec_module = spec.loader.exec_module
+
+        def _exec_module(module):
+            exec_module(module)
+            self.patch(module)
+
+        spec.loader.exec_module = _exec_module
+        return spec
+
+def _on_import(name: str, patch):
+    if name in sys.modules:
+        patch(sys.modules[name])
+    else:
+        sys.meta_path.insert(0, _PatchOnImport(name, patch))
+
+def install(scale: float = 1.0, latency_ms: float = 0):
+    # Must run before the app first calls get_active_session or Github.
+    account = make_account(scale)
+    session = FakeSession(account, latency_ms=latency_ms)
+    _on_import("snowflake.snowpark.context", lambda m: setattr(m, "get_active_session", lambda: session))
+    _on_import("github", lambda m: setattr(m, "Github", FakeGithub))
+    FakeGithub.files.clear()
+    FakeGithub.files.update(make_repo_files(account))
+    FakeGithub.history_size = int(2000 * scale)
+    return session
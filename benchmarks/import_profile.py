@@ -0,0 +1,90 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Import-time profile of Home.py and each page: runs the script's top-level
+# imports under `python -X importtime` in a fresh process (after importing
+# streamlit, which the app server has already loaded) and reports what they
+# cost, grouped by top-level package.
+#
+#   python benchmarks/import_profile.py                  # every page
+#   python benchmarks/import_profile.py pages/1_Users.py --tree --min-ms 5
+#
+# Imports deferred into functions don't show here; the cold_start.*
+# scenarios in run_benchmarks.py time them with the first render.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MARKER = "--- page imports ---"
+
+def page_scripts():
+    return ["Home.py"] + sorted(str(p.relative_to(REPO_ROOT)) for p in (REPO_ROOT / "pages").glob("*.py"))
+
+def top_level_imports(script: str):
+    tree = ast.parse((REPO_ROOT / script).read_text())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+def profile(script: str):
+    # -> [(depth, name, self_us, cumulative_us)] in importtime's order
+    code = "\n".join(["import streamlit", "import sys", f"sys.stderr.write({MARKER!r} + '\\n')"]
+                     + top_level_imports(script))
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                           capture_output=True, text=True, cwd=REPO_ROOT, env=env)
+    if child.returncode:
+        raise RuntimeError(f"{script}: {child.stderr.strip().splitlines()[-1]}")
+    rows = []
+    lines = child.stderr.splitlines()
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = (part for part in line[len("import time:"):].split("|"))
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def summarise(rows, top: int = 5):
+    packages = {}
+    for _, name, self_us, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    heaviest = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(c for depth, _, _, c in rows if depth == 0) / 1000, 1),
+        "modules": len(rows),
+        "packages_ms": {p: round(us / 1000, 1) for p, us in heaviest},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile what each page's top-level imports cost.")
+    parser.add_argument("scripts", nargs="*", help="Scripts relative to the repo root (default: Home.py and every page).")
+    parser.add_argument("--tree", action="store_true", help="Print the import tree as well.")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Hide tree entries cheaper than this (cumulative).")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for script in args.scripts or page_scripts():
+        rows = profile(script)
+        report[script] = summarise(rows)
+        if args.tree and not args.json:
+            print(f"{script}\n{'self ms':>9}{'cum ms':>9}  module")
+            for depth, name, self_us, cumulative_us in rows:
+                if cumulative_us >= args.min_ms * 1000:
+                    print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>9.1f}  {'  ' * depth}{name}")
+            print()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{'script':<26}{'import ms':>10}{'modules':>9}  heaviest packages (self ms)")
+    for script, summary in report.items():
+        heaviest = ", ".join(f"{p} {ms:.0f}" for p, ms in summary["packages_ms"].items())
+        print(f"{script:<26}{summary['total_ms']:>10.1f}{summary['modules']:>9}  {heaviest}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
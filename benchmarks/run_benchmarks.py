@@ -0,0 +1,385 @@
+import argparse
+import atexit
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Rerun benchmarks for Home.py and every page, driven through Streamlit's
+# AppTest against the in-memory Snowpark session and GitHub in fakes.py.
+#
+#   python benchmarks/run_benchmarks.py                    # compare with baseline.json
+#   python benchmarks/run_benchmarks.py --update-baseline  # record a new baseline
+#   python benchmarks/run_benchmarks.py --only users.      # scenarios by name prefix
+#
+# Each scenario opens the page in a fresh AppTest, performs its untimed setup
+# interactions, then times one rerun. Per scenario we record the median rerun
+# latency, the Snowflake queries and GitHub calls it caused, and the peak
+# Python allocation during the rerun. The run fails when a scenario is slower
+# or allocates more than baseline x --threshold, or makes more queries/calls.
+#
+# --vcs local sends submissions to a temporary bare git repository through
+# utils.local_git instead of the fake GitHub, so its GitHub calls are 0.
+#
+# cold_start.* scenarios start a new Python process per sample and time the
+# first render of the page there, including every import it triggers
+# (streamlit itself is already loaded, as it is in the app server). The
+# fakes need pandas, so its import is outside the timing.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+BENCH_REPO = "bench/iac"
+SLACK_MS = 25
+SLACK_KIB = 512
+
+# ------------------------ Interactions ------------------------
+
+_names = itertools.count(1)
+
+def _by_label(elements, label: str):
+    return next(e for e in elements if e.label == label)
+
+def click(label: str):
+    return lambda at: _by_label(at.button, label).click()
+
+def type_into(label: str, value):
+    return lambda at: _by_label(at.text_input, label).input(value() if callable(value) else value)
+
+def select(key: str, option: int = 1):
+    def _select(at):
+        box = at.selectbox(key=key)
+        box.select(box.options[option])
+    return _select
+
+def choose(label: str, option):
+    return lambda at: _by_label(at.selectbox, label).select(option)
+
+def toggle(label: str):
+    return lambda at: _by_label(at.toggle, label).set_value(True)
+
+def run(at):
+    at.run()
+
+def batching(seconds: float):
+    # PR batching window for this scenario; measure() puts it back afterwards
+    def _batching(at):
+        import utils.jobs
+        utils.jobs.PR_BATCH_WINDOW_SECONDS = seconds
+    return _batching
+
+def clear_caches(at):
+    import streamlit as st
+    from utils.github import clear_github_cache
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    clear_github_cache()
+
+def unique(prefix: str):
+    # Submissions are de-duplicated by content, so each one gets a new name.
+    return lambda: f"{prefix}_{next(_names):05d}"
+
+USER_FORM = [
+    type_into("*Name", unique("BENCH_USER")),
+    type_into("*Default Role", "ROLE_00001"),
+    type_into("*Default Warehouse", "WH_001"),
+    run,
+    choose("*Default Role", "ROLE_00001"),
+    choose("*Default Warehouse", "WH_001"),
+    type_into("*Display Name", "Bench User"),
+    type_into("*Email", "bench@example.com"),
+    type_into("*First Name", "Bench"),
+    type_into("*Last Name", "User"),
+    type_into("*Password", "Bench-Passw0rd!"),
+    run,
+]
+
+GRANT_FORM = [
+    type_into("Role to Grant", "ROLE_00000"),
+    type_into("Privilege", "SELECT"),
+    type_into("Object Name", unique("BENCH_DB.S_00.T")),
+    run,
+]
+
+BULK_GRANT_FORM = [
+    type_into("Role to Grant", "ROLE_00000"),
+    type_into("Privilege", "SELECT"),
+    run,
+    choose("Grant On", "All existing and future in"),
+    run,
+    type_into("Schema Name", "BENCH_DB.S_00"),
+    run,
+]
+
+# ------------------------ Scenarios ------------------------
+# name -> (script, untimed setup steps, step before the timed rerun). A
+# scenario without an action times the page's first render.
+
+SCENARIOS = {
+    "home.render": ("Home.py", [], None),
+
+    "users.render": ("pages/1_Users.py", [], None),
+    "users.type": ("pages/1_Users.py", [run], type_into("*Name", "BENCH_USER")),
+    "users.switch_mode": ("pages/1_Users.py", [run], click("Edit Existing User")),
+    "users.edit_cold": ("pages/1_Users.py", [run, click("Edit Existing User"), run, clear_caches],
+                        click("Edit Existing User")),
+    "users.search": ("pages/1_Users.py", [run, click("Edit Existing User"), run],
+                     type_into("Select a user to edit", "USER_0042")),
+    "users.select": ("pages/1_Users.py", [run, click("Edit Existing User"), run], select("user_picker_select")),
+    "users.submit": ("pages/1_Users.py", [run] + USER_FORM, click("Submit & Raise PR")),
+    "users.submit_batched": ("pages/1_Users.py", [batching(0.05), run] + USER_FORM, click("Submit & Raise PR")),
+
+    "roles.render": ("pages/2_Roles.py", [], None),
+    "roles.switch_mode": ("pages/2_Roles.py", [run], click("Edit Existing Role")),
+    "roles.select": ("pages/2_Roles.py", [run, click("Edit Existing Role"), run], select("role_picker_select")),
+
+    "warehouses.render": ("pages/3_Warehouses.py", [], None),
+    "warehouses.type": ("pages/3_Warehouses.py", [run], type_into("*Warehouse Name", "BENCH_WH")),
+    "warehouses.switch_mode": ("pages/3_Warehouses.py", [run], click("Edit Existing Warehouse")),
+    "warehouses.select": ("pages/3_Warehouses.py", [run, click("Edit Existing Warehouse"), run],
+                          select("warehouse_picker_select")),
+    "warehouses.advise": ("pages/3_Warehouses.py", [run, click("Right-size Warehouse"), run],
+                          select("warehouse_picker_select")),
+    "warehouses.advise_cold": ("pages/3_Warehouses.py", [run, clear_caches], click("Right-size Warehouse")),
+
+    "grants.render": ("pages/4_Grants.py", [], None),
+    "grants.add": ("pages/4_Grants.py", [run] + GRANT_FORM, click("Add to Grants List")),
+    "grants.add_bulk": ("pages/4_Grants.py", [run] + BULK_GRANT_FORM, click("Add to Grants List")),
+    "grants.analyse": ("pages/4_Grants.py", [run] + GRANT_FORM + [click("Add to Grants List"), run],
+                       toggle("Analyse effective access")),
+    "grants.submit": ("pages/4_Grants.py", [run] + GRANT_FORM + [click("Add to Grants List"), run],
+                      click("Submit & Raise PR")),
+
+    "drift.render": ("pages/5_Drift.py", [], None),
+    "history.render": ("pages/6_History.py", [], None),
+    "history.refresh": ("pages/6_History.py", [run], click("Refresh")),
+    "history.filter": ("pages/6_History.py", [run], type_into("Object name contains", "ROLE_00")),
+    "diagnostics.render": ("pages/9_Diagnostics.py", [], None),
+}
+
+COLD_STARTS = {
+    "cold_start.home": "Home.py",
+    "cold_start.users": "pages/1_Users.py",
+    "cold_start.roles": "pages/2_Roles.py",
+    "cold_start.warehouses": "pages/3_Warehouses.py",
+    "cold_start.grants": "pages/4_Grants.py",
+    "cold_start.drift": "pages/5_Drift.py",
+    "cold_start.history": "pages/6_History.py",
+    "cold_start.diagnostics": "pages/9_Diagnostics.py",
+}
+
+# ------------------------ Measurement ------------------------
+
+_components = None
+
+def _app(script: str):
+    # Each AppTest scans installed packages for components on its first run;
+    # the app server does that once at startup, so every AppTest here shares
+    # one scan made outside the timings.
+    global _components
+    from streamlit.testing.v1 import AppTest
+    if _components is None:
+        from streamlit.components.v2.component_manager import BidiComponentManager
+        _components = BidiComponentManager()
+        _components.discover_and_register_components(start_file_watching=False)
+    at = AppTest.from_file(str(REPO_ROOT / script), default_timeout=120)
+    at._bidi_component_manager = _components
+    at.secrets["GITHUB_TOKEN"] = "bench-token"
+    at.secrets["GITHUB_REPO"] = BENCH_REPO
+    return at
+
+def _wait_for_jobs(seen, timeout: float = 30):
+    # -> errors of the PR jobs queued since `seen` was taken
+    from utils.jobs import _jobs
+    deadline = time.monotonic() + timeout
+    while any(j["status"] in ("queued", "batched", "running") for j in list(_jobs.values())):
+        if time.monotonic() > deadline:
+            raise TimeoutError("PR jobs did not finish")
+        time.sleep(0.01)
+    return [j["error"] for job_id, j in list(_jobs.items()) if job_id not in seen and j["status"] == "error"]
+
+def measure(session, name: str, trace_alloc: bool):
+    import utils.jobs
+    window = utils.jobs.PR_BATCH_WINDOW_SECONDS
+    try:
+        return _measure(session, name, trace_alloc)
+    finally:
+        utils.jobs.PR_BATCH_WINDOW_SECONDS = window
+
+def _measure(session, name: str, trace_alloc: bool):
+    script, setup, action = SCENARIOS[name]
+    at = _app(script)
+    for step in setup:
+        step(at)
+    if action:
+        action(at)
+    queries, calls = session.query_count, fakes.github_calls()
+    from utils.jobs import _jobs
+    seen = set(_jobs)
+    if trace_alloc:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] if trace_alloc else None
+    if trace_alloc:
+        tracemalloc.stop()
+    errors = _wait_for_jobs(seen)
+    if at.exception or errors:
+        raise RuntimeError(f"{name}: {at.exception[0].message if at.exception else errors[0]}")
+    return {
+        "ms": ms,
+        "queries": session.query_count - queries,
+        "github_calls": fakes.github_calls() - calls,
+        "peak_kib": peak / 1024 if peak is not None else None,
+    }
+
+def cold_start(session, script: str):
+    # Runs in the child process started by run_cold_start.
+    import streamlit.testing.v1  # noqa: F401 - part of the app server, not the page
+    modules = len(sys.modules)
+    at = _app(script)
+    start = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"{script}: {at.exception[0].message}")
+    return {"ms": ms, "queries": session.query_count, "modules": len(sys.modules) - modules}
+
+def run_cold_start(name: str, repeat: int, scale: float, latency_ms: float):
+    samples = []
+    for _ in range(repeat):
+        child = subprocess.run(
+            [sys.executable, __file__, "--cold-start", COLD_STARTS[name], "--scale", str(scale),
+             "--latency-ms", str(latency_ms)],
+            capture_output=True, text=True, cwd=REPO_ROOT,
+        )
+        if child.returncode:
+            raise RuntimeError(f"{name}: {child.stderr.strip().splitlines()[-1]}")
+        samples.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    return {
+        "ms": round(statistics.median(s["ms"] for s in samples), 1),
+        "queries": max(s["queries"] for s in samples),
+        "github_calls": 0,
+        "peak_kib": None,
+        "modules": max(s["modules"] for s in samples),
+    }
+
+def run_scenario(session, name: str, repeat: int, scale: float, latency_ms: float):
+    if name in COLD_STARTS:
+        return run_cold_start(name, repeat, scale, latency_ms)
+    # One untimed warm-up (imports, caches), `repeat` timed reruns, and one
+    # more under tracemalloc, which slows Python down too much to time.
+    measure(session, name, trace_alloc=False)
+    samples = [measure(session, name, trace_alloc=False) for _ in range(repeat)]
+    alloc = measure(session, name, trace_alloc=True)
+    return {
+        "ms": round(statistics.median(s["ms"] for s in samples), 1),
+        "queries": max(s["queries"] for s in samples),
+        "github_calls": max(s["github_calls"] for s in samples),
+        "peak_kib": round(alloc["peak_kib"], 1),
+    }
+
+def compare(result: dict, baseline: dict, threshold: float):
+    problems = []
+    if result["ms"] > baseline["ms"] * threshold + SLACK_MS:
+        problems.append(f"{result['ms']:.0f}ms vs {baseline['ms']:.0f}ms")
+    if result["queries"] > baseline["queries"]:
+        problems.append(f"{result['queries']} queries vs {baseline['queries']}")
+    if result["github_calls"] > baseline["github_calls"]:
+        problems.append(f"{result['github_calls']} GitHub calls vs {baseline['github_calls']}")
+    if result["peak_kib"] is not None and result["peak_kib"] > baseline["peak_kib"] * threshold + SLACK_KIB:
+        problems.append(f"{result['peak_kib']:.0f}KiB peak vs {baseline['peak_kib']:.0f}KiB")
+    return problems
+
+def environment():
+    import streamlit
+    return {"python": platform.python_version(), "streamlit": streamlit.__version__,
+            "machine": platform.machine(), "system": platform.system()}
+
+# ------------------------ CLI ------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page reruns against fake Snowflake and GitHub backends.")
+    parser.add_argument("--only", action="append", default=[], help="Run scenarios whose name starts with this (repeatable).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed reruns per scenario; the median is reported.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the fake account's object counts.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated Snowflake round trip per query.")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Fail when latency or allocation exceeds baseline x this.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--output", type=Path, help="Also write this run's results as JSON.")
+    parser.add_argument("--vcs", choices=["github", "local"], default="github",
+                        help="Submit to the fake GitHub or to a temporary local git repository.")
+    parser.add_argument("--cold-start", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)  # pages load their images by relative path
+    logging.disable(logging.WARNING)  # bare-mode and deprecation warnings on every rerun
+    session = fakes.install(args.scale, args.latency_ms)
+    if "IAC_HISTORY_CACHE_DIR" not in os.environ:
+        # A history cache left by an earlier run would skip the first listing
+        history_dir = tempfile.mkdtemp(prefix="iac-bench-history-")
+        atexit.register(shutil.rmtree, history_dir, ignore_errors=True)
+        os.environ["IAC_HISTORY_CACHE_DIR"] = history_dir
+    if args.vcs == "local":
+        global BENCH_REPO
+        workdir = tempfile.mkdtemp(prefix="iac-bench-")
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        BENCH_REPO = fakes.make_local_repo(session.account, os.path.join(workdir, "iac.git"))
+        os.environ["GITHUB_REPO"] = BENCH_REPO  # the Users page reads it from the environment
+    if args.cold_start:
+        print(json.dumps(cold_start(session, args.cold_start)))
+        return 0
+
+    all_names = list(SCENARIOS) + list(COLD_STARTS)
+    names = [n for n in all_names if not args.only or any(n.startswith(p) for p in args.only)]
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if baseline and (baseline.get("scale") != args.scale or baseline.get("latency_ms", 0) != args.latency_ms
+                     or baseline.get("environment") != environment() or baseline.get("vcs", "github") != args.vcs):
+        print("note: baseline was recorded with a different scale, latency, VCS or environment; "
+              "timing comparisons are indicative only")
+
+    results, failures = {}, {}
+    print(f"{'scenario':<26}{'ms':>9}{'queries':>9}{'github':>8}{'peak KiB':>11}")
+    for name in names:
+        result = results[name] = run_scenario(session, name, args.repeat, args.scale, args.latency_ms)
+        problems = compare(result, baseline["scenarios"][name], args.threshold) \
+            if name in baseline.get("scenarios", {}) else []
+        if problems:
+            failures[name] = problems
+        peak = "-" if result["peak_kib"] is None else f"{result['peak_kib']:.0f}"
+        print(f"{name:<26}{result['ms']:>9.1f}{result['queries']:>9}{result['github_calls']:>8}{peak:>11}"
+              + ("  REGRESSED: " + "; ".join(problems) if problems else ""))
+
+    report = {"environment": environment(), "scale": args.scale, "latency_ms": args.latency_ms,
+              "vcs": args.vcs, "repeat": args.repeat, "scenarios": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    if args.update_baseline:
+        if names != all_names:
+            report["scenarios"] = {**baseline.get("scenarios", {}), **results}
+        args.baseline.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if failures:
+        print(f"{len(failures)} scenario(s) regressed past {args.threshold}x baseline")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
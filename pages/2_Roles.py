@@ -1,19 +1,15 @@
 import streamlit as st
-from snowflake.snowpark.context import get_active_session
-from ruamel.yaml import YAML
-from io import StringIO
 # from utils.github_integration import raise_github_pr
-from utils.shared_css import inject_shared_css
+from utils.shared_css import inject_shared_css, render_footer
+from utils.tracing import begin_page, span
+from utils.catalog import get_catalog
+from utils.search import object_picker
+from utils.yaml_io import dump_yaml
 
 # ── App Setup ─────────────────────────────────────────
 st.set_page_config(page_title="Roles", layout="centered", initial_sidebar_state="collapsed")
 inject_shared_css()
-session = get_active_session()
-
-yaml = YAML()
-yaml.indent(mapping=2, sequence=4, offset=2)
-yaml.default_flow_style = False
-yaml.allow_unicode = True
+begin_page("Roles")
 
 # ── Page State ────────────────────────────────────────
 if "role_mode" not in st.session_state:
@@ -38,35 +34,13 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# ── Helpers ───────────────────────────────────────────
-@st.cache_data
-def get_existing_roles():
-    df = session.sql("SELECT DISTINCT name FROM SNOWFLAKE.ACCOUNT_USAGE.ROLES ORDER BY name").to_pandas()
-    return df["NAME"].tolist()
-
-def get_role_details(role_name: str):
-    df = session.sql(f"""
-        SELECT name, owner, comment
-        FROM SNOWFLAKE.ACCOUNT_USAGE.ROLES
-        WHERE name = '{role_name}'
-        LIMIT 1
-    """).to_pandas()
-    if df.empty:
-        return {}
-    row = df.iloc[0]
-    return {
-        "name": row["NAME"],
-        "owner": row["OWNER"],
-        "comment": row["COMMENT"]
-    }
-
 # ── Form Fields ───────────────────────────────────────
 role_info = {}
 if st.session_state.role_mode == "edit":
-    roles = get_existing_roles()
-    selected_role = st.selectbox("Select a role to edit", roles)
+    catalog = get_catalog()
+    selected_role = object_picker("Select a role to edit", catalog.role_index, key="role_picker")
     if selected_role:
-        role_info = get_role_details(selected_role)
+        role_info = catalog.role(selected_role)
 
 role_name = st.text_input("*Role Name", value=role_info.get("name", ""), placeholder="e.g. ANALYST")
 comment = st.text_area("Comment (optional)", value=role_info.get("comment", ""), placeholder="Describe the role or leave blank")
@@ -86,13 +60,13 @@ if comment_clean:
     role_data["comment"] = comment_clean
 
 role_yaml = {"roles": [role_data]}
-yaml_stream = StringIO()
-yaml.dump(role_yaml, yaml_stream)
+with span("yaml.dump"):
+    yaml_text = dump_yaml(role_yaml)
 
 # ── YAML Preview ──────────────────────────────────────
 st.markdown("---")
 st.markdown('<h3 style="text-align: center;">YAML Preview</h3>', unsafe_allow_html=True)
-st.code(yaml_stream.getvalue(), language="yaml")
+st.code(yaml_text, language="yaml")
 
 # ── Submit / Delete Buttons ───────────────────────────
 submit_label = "Submit & Raise PR" if st.session_state.role_mode == "create" else "Update & Raise PR"
@@ -129,22 +103,14 @@ with col_delete:
                             }
                         ]
                     }
-                    delete_stream = StringIO()
-                    yaml.dump(delete_yaml, delete_stream)
+                    delete_text = dump_yaml(delete_yaml)
                     try:
                         filename = f"roles/delete/{role_name_clean.lower().replace(' ', '_')}.yaml"
                         # pr_url = raise_github_pr(...)
                         st.success("Delete PR logic ready — YAML generated successfully.")
-                        st.code(delete_stream.getvalue(), language="yaml")
+                        st.code(delete_text, language="yaml")
                     except Exception as e:
                         st.error(f"Failed to raise delete PR: {e}")
 
 # ── Footer ────────────────────────────────────────────
-st.markdown("---", unsafe_allow_html=True)
-st.markdown("""
-    <div style='text-align: center; color: grey; font-size: 0.85rem; padding: 1rem 0;'>
-        © 2025 Created by Practiv
-    </div>
-""", unsafe_allow_html=True)
-
-st.image("logo_practiv.png", use_container_width=True)
\ No newline at end of file
+render_footer()
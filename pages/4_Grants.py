@@ -1,8 +1,13 @@
 import streamlit as st
-from ruamel.yaml import YAML
-from io import StringIO
-from utils.shared_css import inject_shared_css
-# from utils.github_integration import raise_github_pr
+from utils.shared_css import inject_shared_css, render_footer
+from utils.tracing import begin_page, span
+from utils.jobs import submit_pr, track_job, render_pr_jobs
+from utils.vcs import vcs_settings
+from utils.privileges import get_privilege_index
+from utils.grants import GrantSet, BULK_OBJECT_TYPES, bulk_object_type, parse_bulk
+from utils.catalog import check_references, object_count
+from utils.references import grant_references
+from utils.yaml_io import dump_yaml
 
 st.set_page_config(
     page_title="Grants",
@@ -12,11 +17,23 @@ st.set_page_config(
 )
 
 inject_shared_css()
-yaml = YAML()
+begin_page("Grants")
 
-# Session state to store multiple grants
+# Grant On choice -> scopes it adds (ALL / FUTURE <type>S IN <container>)
+GRANT_SCOPES = {
+    "One object": (),
+    "All existing in": ("ALL",),
+    "Future in": ("FUTURE",),
+    "All existing and future in": ("ALL", "FUTURE"),
+}
+
+def _count_text(object_type: str, container: str) -> str:
+    n = object_count(object_type, container)
+    return "unknown" if n is None else f"{n:,}"
+
+# Session state to store multiple grants (de-duplicated, grouped per role/object)
 if "grants_list" not in st.session_state:
-    st.session_state["grants_list"] = []
+    st.session_state["grants_list"] = GrantSet()
 
 with st.container():
     st.markdown('<h1 style="text-align: center;">Grants</h1>', unsafe_allow_html=True)
@@ -25,25 +42,45 @@ with st.container():
     with col1:
         role = st.text_input("Role to Grant", placeholder="e.g. ANALYST")
         privilege = st.text_input("Privilege", placeholder="e.g. SELECT")
+        scopes = GRANT_SCOPES[st.selectbox("Grant On", list(GRANT_SCOPES))]
     with col2:
-        object_type = st.selectbox("Object Type", ["TABLE", "VIEW", "SCHEMA", "DATABASE", "WAREHOUSE"])
-        object_name = st .text_input("Object Name", placeholder="e.g. MY_DB.MY_SCHEMA.MY_TABLE")
+        if not scopes:
+            object_type = st.selectbox("Object Type", ["TABLE", "VIEW", "SCHEMA", "DATABASE", "WAREHOUSE"])
+            object_name = st .text_input("Object Name", placeholder="e.g. MY_DB.MY_SCHEMA.MY_TABLE")
+        else:
+            object_type = st.selectbox("Object Type", list(BULK_OBJECT_TYPES))
+            container = st.selectbox("In", BULK_OBJECT_TYPES[object_type][1])
+            object_name = st.text_input(f"{container.title()} Name",
+                                        placeholder="e.g. MY_DB.MY_SCHEMA" if container == "SCHEMA" else "e.g. MY_DB")
 
     grant_option = st.selectbox("Include 'WITH GRANT OPTION'?", ["false", "true"])
 
+    if scopes and object_name:
+        plural = BULK_OBJECT_TYPES[object_type][0].lower()
+        existing = _count_text(object_type, object_name)
+        if "ALL" in scopes:
+            st.caption(f"Grants on the {existing} {plural} in {object_name} today, as one YAML entry and one statement.")
+        if "FUTURE" in scopes:
+            st.caption(f"Applies to {plural} created in {object_name} from now on ({existing} exist today).")
+
+    grants = [(object_type, object_name)] if not scopes else [
+        (bulk_object_type(scope, object_type, container), object_name) for scope in scopes
+    ]
+
     add_button_disabled = not all([role, privilege, object_name])
 
     if st.button("Add to Grants List", disabled=add_button_disabled):
-        st.session_state["grants_list"].append({
-            'role': role,
-            'privilege': privilege,
-            'on': {
-                'object_type': object_type,
-                'name': object_name
-            },
-            'with_grant_option': grant_option == "true"
-        })
-        st.success("Grant added!")
+        added = 0
+        for grant_type, grant_name in grants:
+            if st.session_state["grants_list"].add(role, privilege, grant_type, grant_name, grant_option == "true"):
+                added += 1
+                # Keep the session's access index in step with the pending list
+                if "privilege_index" in st.session_state:
+                    st.session_state["privilege_index"].add_grant(role, privilege, grant_type, grant_name, grant_option == "true")
+        if not added:
+            st.warning("That grant is already in the list.")
+        else:
+            st.success("Grant added!")
 
     # YAML Preview
     if st.session_state["grants_list"]:
@@ -51,34 +88,88 @@ with st.container():
         st.markdown('<h3 style="text-align: center;">Grants YAML Preview</h3>', unsafe_allow_html=True)
 
         grant_yaml = {
-            'grants': st.session_state["grants_list"]
+            'grants': st.session_state["grants_list"].entries()
         }
 
-        yaml_stream = StringIO()
-        yaml.dump(grant_yaml, yaml_stream)
-        st.code(yaml_stream.getvalue(), language='yaml')
+        with span("yaml.dump"):
+            yaml_text = dump_yaml(grant_yaml, style="plain")
+        st.code(yaml_text, language='yaml')
+
+        bulk_rows = []
+        for entry in grant_yaml["grants"]:
+            bulk = parse_bulk(entry["on"]["object_type"])
+            if bulk:
+                n = object_count(bulk[1], entry["on"]["name"])
+                bulk_rows.append({
+                    "Role": entry["role"],
+                    "Privileges": ", ".join(entry["privileges"]),
+                    "Grant On": f"{entry['on']['object_type']} {entry['on']['name']}",
+                    "Objects Today": n,
+                    # FUTURE grants cover objects that don't exist yet
+                    "Per-object Grants": n * len(entry["privileges"]) if n is not None and bulk[0] == "ALL" else None,
+                })
+        if bulk_rows:
+            covered = sum(r["Per-object Grants"] or 0 for r in bulk_rows)
+            st.caption(f"{len(bulk_rows)} bulk entries stand in for {covered:,} per-object grants.")
+            st.dataframe(bulk_rows, hide_index=True, use_container_width=True)
 
-        if st.button("Submit & Raise PR"):
+        if st.button("Submit & Raise PR") and check_references(grant_references(grant_yaml["grants"])):
             try:
                 safe_filename = f"{role}_{privilege}".lower().replace(" ", "_")
                 filename = f"grants/{safe_filename}.yaml"
-                pr_url = raise_github_pr(
-                    filename=filename,
-                    file_contents=yaml_stream.getvalue(),
-                    token=st.secrets["GITHUB_TOKEN"],
-                    repo_name=st.secrets["GITHUB_REPO"]
+                token, repo_name = vcs_settings()
+                job_id = submit_pr(
+                    {filename: yaml_text},
+                    token=token,
+                    repo_name=repo_name,
+                    label=filename
                 )
-                st.success(f"PR created: [View PR]({pr_url})")
-                st.session_state["grants_list"] = []  # Clear list after PR
+                track_job("grant_pr_jobs", job_id)
+                st.session_state["grants_list"] = GrantSet()  # Clear list once queued
+                st.session_state.pop("privilege_index", None)
             except Exception as e:
                 st.error(f"Failed to create PR: {e}")
 
+    render_pr_jobs("grant_pr_jobs")
+
+    # Effective Access
+    st.markdown("---")
+    if st.toggle("Analyse effective access", help="Resolve access through the role hierarchy, including grants pending in the list above."):
+        if "privilege_index" not in st.session_state:
+            # Fork the shared snapshot so pending grants stay in this session
+            index = get_privilege_index().fork()
+            for g in st.session_state["grants_list"].expanded():
+                index.add_grant(g['role'], g['privilege'], g['on']['object_type'], g['on']['name'], g['with_grant_option'])
+            st.session_state["privilege_index"] = index
+        index = st.session_state["privilege_index"]
+
+        question = st.radio("Question", ["Who can access an object?", "What can a role do?"], horizontal=True)
+        if question == "Who can access an object?":
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                q_privilege = st.text_input("Privilege", value="SELECT", key="access_privilege")
+            with col2:
+                q_type = st.selectbox("Object Type", ["TABLE", "VIEW", "SCHEMA", "DATABASE", "WAREHOUSE"], key="access_object_type")
+            with col3:
+                q_name = st.text_input("Object Name", placeholder="e.g. MY_DB.MY_SCHEMA.MY_TABLE", key="access_object_name")
+            if q_privilege and q_name:
+                roles, users = index.who_can(q_privilege, q_type, q_name)
+                st.markdown(f"**{len(roles)}** roles · **{len(users)}** users")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.dataframe({"Role": roles}, hide_index=True, use_container_width=True)
+                with col2:
+                    st.dataframe({"User": users}, hide_index=True, use_container_width=True)
+        else:
+            q_role = st.text_input("Role", placeholder="e.g. ANALYST", key="access_role")
+            if q_role:
+                rows = index.role_privileges(q_role)
+                inherited = index.inherited_roles(q_role)
+                st.markdown(f"**{len(rows)}** privileges · inherits **{len(inherited)}** roles")
+                st.dataframe(
+                    [{"Privilege": p, "Object Type": t, "Object": n, "Via Role": via, "Grant Option": g} for p, t, n, via, g in rows],
+                    hide_index=True, use_container_width=True
+                )
+
 # ── Footer ────────────────────────────────────────────
-st.markdown("---", unsafe_allow_html=True)
-st.markdown("""
-    <div style='text-align: center; color: grey; font-size: 0.85rem; padding: 1rem 0;'>
-        © 2025 Created by Practiv
-    </div>
-""", unsafe_allow_html=True)
-
-st.image("logo_practiv.png", use_container_width=True)
\ No newline at end of file
+render_footer()
@@ -0,0 +1,90 @@
+import streamlit as st
+from utils.shared_css import inject_shared_css, render_footer
+from utils.tracing import begin_page, span, frame_size
+from utils.session import get_session
+
+st.set_page_config(page_title="Drift", layout="centered", initial_sidebar_state="collapsed")
+inject_shared_css()
+begin_page("Drift")
+
+# Written by scripts/detect_drift.py, run on a schedule by .github/workflows/drift.yml.
+DRIFT_TABLE = "IAC_DRIFT"
+STATUS_LABELS = {
+    "changed": "Changed outside IaC",
+    "missing": "Missing from account",
+    "unmanaged": "Not in the repo",
+}
+
+# ------------------------ Load Report ------------------------
+
+@st.cache_data(ttl=60, show_spinner="Loading drift report…")
+def load_drift_report():
+    session = get_session()
+    with span("snowflake.drift_report") as s:
+        df = session.sql(f"""
+            SELECT KIND, NAME, STATUS, FIELD, CHANGE, REPO_VALUE, LIVE_VALUE, DETECTED_AT
+            FROM {DRIFT_TABLE}
+            ORDER BY KIND, NAME, FIELD
+        """).to_pandas()
+        s["rows"], s["bytes"] = len(df), frame_size(df)
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+st.markdown('<h1 style="text-align: center;">Drift</h1>', unsafe_allow_html=True)
+st.markdown(
+    "<p style='text-align: center;'>Users, roles and warehouses whose live settings no longer match the repo YAML.</p>",
+    unsafe_allow_html=True
+)
+
+try:
+    report = load_drift_report()
+except Exception as e:
+    st.info(f"No drift report yet. Run `python -m scripts.detect_drift` to create `{DRIFT_TABLE}`.")
+    st.caption(str(e))
+    render_footer()
+    st.stop()
+
+if st.button("Refresh"):
+    load_drift_report.clear()
+    st.rerun()
+
+if report.empty:
+    st.success("No drift detected. The account matches the repository.")
+    render_footer()
+    st.stop()
+
+# ------------------------ Summary ------------------------
+
+objects = report.drop_duplicates(["kind", "name"])
+st.caption(f"Last detected {report['detected_at'].max():%Y-%m-%d %H:%M}")
+cols = st.columns(len(STATUS_LABELS))
+for col, (status, label) in zip(cols, STATUS_LABELS.items()):
+    col.metric(label, f"{int((objects['status'] == status).sum()):,}")
+
+# ------------------------ Detail ------------------------
+
+st.markdown("---")
+col1, col2, col3 = st.columns(3)
+with col1:
+    kinds = st.multiselect("Object Type", sorted(report["kind"].unique()), default=sorted(report["kind"].unique()))
+with col2:
+    statuses = st.multiselect("Status", list(STATUS_LABELS), default=["changed", "missing"],
+                              format_func=STATUS_LABELS.get)
+with col3:
+    name_filter = st.text_input("Name contains")
+
+view = report[report["kind"].isin(kinds) & report["status"].isin(statuses)]
+if name_filter:
+    view = view[view["name"].str.contains(name_filter, case=False, regex=False)]
+
+st.dataframe(
+    view.drop(columns=["detected_at"]),
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "repo_value": "In repo",
+        "live_value": "In account",
+    },
+)
+
+render_footer()
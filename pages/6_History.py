@@ -0,0 +1,73 @@
+import streamlit as st
+from utils.shared_css import inject_shared_css, render_footer
+from utils.tracing import begin_page
+from utils.history import refresh_history, history_frame
+from utils.vcs import vcs_settings
+
+st.set_page_config(page_title="History", layout="centered", initial_sidebar_state="collapsed")
+inject_shared_css()
+begin_page("History")
+
+STATE_LABELS = {"open": "Open", "merged": "Merged", "closed": "Closed"}
+
+st.markdown('<h1 style="text-align: center;">History</h1>', unsafe_allow_html=True)
+st.markdown(
+    "<p style='text-align: center;'>Pull requests raised from this app, newest first.</p>",
+    unsafe_allow_html=True
+)
+
+# ------------------------ Load History ------------------------
+
+force = st.button("Refresh")
+try:
+    with st.spinner("Loading history…"):
+        history = refresh_history(*vcs_settings(), force=force)
+except Exception as e:
+    st.error(f"Failed to load history: {e}")
+    render_footer()
+    st.stop()
+
+changes = history_frame(history)
+if changes.empty:
+    st.info("No pull requests raised from this app yet.")
+    render_footer()
+    st.stop()
+
+cols = st.columns(len(STATE_LABELS))
+for col, (state, label) in zip(cols, STATE_LABELS.items()):
+    col.metric(label, f"{int((changes['state'] == state).sum()):,}")
+
+# ------------------------ Filters ------------------------
+
+st.markdown("---")
+col1, col2, col3 = st.columns(3)
+with col1:
+    kinds = st.multiselect("Object Type", sorted({k for ks in changes["object_types"] for k in ks}))
+with col2:
+    name_filter = st.text_input("Object name contains")
+with col3:
+    users = st.multiselect("Submitted by", sorted({u for us in changes["users"] for u in us}))
+
+view = changes
+if kinds:
+    view = view[view["object_types"].map(lambda ks: any(k in kinds for k in ks))]
+if name_filter:
+    view = view[view["search"].str.contains(name_filter.lower(), regex=False)]
+if users:
+    view = view[view["users"].map(lambda us: any(u in users for u in us))]
+
+st.caption(f"{len(view):,} of {len(changes):,} pull requests")
+st.dataframe(
+    view[["number", "title", "state", "users", "object_types", "created_at", "url"]],
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "number": "#",
+        "users": "Submitted by",
+        "object_types": "Object Types",
+        "created_at": st.column_config.DatetimeColumn("Created", format="YYYY-MM-DD HH:mm"),
+        "url": st.column_config.LinkColumn("Link", display_text="Open"),
+    },
+)
+
+render_footer()
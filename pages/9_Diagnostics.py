@@ -0,0 +1,69 @@
+import json
+import time
+import streamlit as st
+from utils.shared_css import inject_shared_css, render_footer
+from utils.tracing import SPAN_BUFFER_SIZE, get_spans, clear_spans, summarise
+from utils.rate_limit import rate_limit_status
+
+# Not linked from Home and hidden from the sidebar; open /Diagnostics directly.
+st.set_page_config(page_title="Diagnostics", layout="wide", initial_sidebar_state="collapsed")
+inject_shared_css()
+
+st.markdown('<h1 style="text-align: center;">Diagnostics</h1>', unsafe_allow_html=True)
+
+spans = get_spans()
+st.caption(f"{len(spans):,} of the last {SPAN_BUFFER_SIZE:,} spans recorded by this app process.")
+
+if not spans:
+    st.info("Nothing recorded yet. Use the other pages, then come back.")
+    render_footer()
+    st.stop()
+
+# ------------------------ Summaries ------------------------
+
+operations = summarise(spans, by=("operation",))
+reruns = summarise([s for s in spans if s["operation"] in ("page.rerun", "page.fragment")], by=("page", "operation"))
+by_page = summarise([s for s in spans if s["operation"] not in ("page.rerun", "page.fragment")], by=("page", "operation"))
+
+st.markdown('<h3>Page reruns</h3>', unsafe_allow_html=True)
+st.dataframe(reruns, hide_index=True, use_container_width=True)
+
+st.markdown('<h3>Operations</h3>', unsafe_allow_html=True)
+st.dataframe(operations, hide_index=True, use_container_width=True)
+
+with st.expander("Operations per page"):
+    st.dataframe(by_page, hide_index=True, use_container_width=True)
+
+with st.expander("Slowest spans"):
+    slowest = sorted(spans, key=lambda s: s["ms"], reverse=True)[:50]
+    st.dataframe(slowest, hide_index=True, use_container_width=True)
+
+# ------------------------ GitHub Rate Limits ------------------------
+
+limits = rate_limit_status()
+if limits:
+    st.markdown('<h3>GitHub rate limits</h3>', unsafe_allow_html=True)
+    st.caption("Per token (shown as a hash): the latest X-RateLimit-* values, and the requests "
+               "the app delayed, retried or had rejected to stay within them.")
+    st.dataframe(limits, hide_index=True, use_container_width=True)
+
+# ------------------------ Export ------------------------
+
+col1, col2 = st.columns(2)
+with col1:
+    export = {
+        "generated_at": time.time(),
+        "page_reruns": reruns,
+        "operations": operations,
+        "operations_per_page": by_page,
+        "github_rate_limits": limits,
+        "spans": spans,
+    }
+    st.download_button("Download JSON", json.dumps(export, default=str),
+                       file_name="iac_diagnostics.json", mime="application/json")
+with col2:
+    if st.button("Clear"):
+        clear_spans()
+        st.rerun()
+
+render_footer()
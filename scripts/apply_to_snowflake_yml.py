@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+from scripts.ddl_executor import execute_plan
+from scripts.snowflake_plan import load_desired, load_actual, build_plan
+from scripts.state_ledger import FileLedger, SnowflakeLedger, diff_against_ledger
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def connect():
+    import snowflake.connector
+    return snowflake.connector.connect(
+        account=os.environ["SNOWFLAKE_ACCOUNT"],
+        user=os.environ["SNOWFLAKE_USER"],
+        password=os.environ["SNOWFLAKE_PASSWORD"],
+        role=os.getenv("SNOWFLAKE_ROLE"),
+        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+        database=os.getenv("SNOWFLAKE_DATABASE"),
+        schema=os.getenv("SNOWFLAKE_SCHEMA"),
+    )
+
+def apply(conn, root=REPO_ROOT, dry_run=False, ledger=None, connect=None, parallel=8, continue_on_error=False):
+    # Diff the repo YAML against the account and run only the statements
+    # needed to converge. An unchanged repo produces an empty plan. With a
+    # ledger, only files and entries whose content hash moved since the last
+    # successful apply are considered, and the ledger advances on success.
+    # Statements run on up to `parallel` connections opened with `connect`
+    # (just `conn` when no factory is given), in dependency order.
+    if ledger is None:
+        desired = load_desired(root)
+        actual = load_actual(conn, desired)
+        plan = build_plan(desired, actual)
+    else:
+        desired, records, changed_paths = diff_against_ledger(root, ledger.load())
+        print(f"{len(changed_paths)} changed file(s) since the last apply.")
+        actual = load_actual(conn, desired, scoped=True)
+        # A deleted ALL grant revokes per-object grants from unchanged files
+        # too, so the planner needs every grant the repo keeps to restore them.
+        managed = None
+        if any(key[2].startswith("ALL ") for key in desired["grants"]["deleted"]):
+            managed = load_desired(root)["grants"]["present"]
+        plan = build_plan(desired, actual, incremental=True, managed=managed)
+
+    if not plan:
+        print("No changes. Snowflake matches the repository.")
+    else:
+        print(f"{len(plan)} statement(s) planned:")
+    if dry_run:
+        for stmt in plan:
+            print(f"  {stmt.sql}")
+        return plan
+    if connect is None:
+        parallel = 1
+    results = execute_plan(plan, connect, parallel=parallel, continue_on_error=continue_on_error, seed=conn)
+    failed = [r for r in results if r["status"] != "ok"]
+    if failed:
+        # Leave the ledger where it was so the next run retries these files.
+        raise RuntimeError(f"{len(failed)} of {len(plan)} statement(s) did not complete.")
+    if ledger is not None:
+        ledger.save(records, changed_paths)
+    return plan
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply the IaC YAML in this repo to Snowflake.")
+    parser.add_argument("--root", default=REPO_ROOT, type=Path, help="Repository root holding the YAML files.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without running it.")
+    parser.add_argument("--full", action="store_true", help="Ignore the ledger and reconcile every object.")
+    parser.add_argument("--ledger-file", type=Path, help="Keep the apply ledger in a local JSON file instead of Snowflake.")
+    parser.add_argument("--parallel", type=int, default=8, help="Number of Snowflake connections running DDL at once.")
+    parser.add_argument("--continue-on-error", action="store_true",
+                        help="Keep running statements that don't depend on a failed one.")
+    parser.add_argument("--ledger-table", default=os.getenv("IAC_LEDGER_TABLE", "IAC_APPLY_LEDGER"),
+                        help="Snowflake table holding the apply ledger.")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        ledger = None
+        if not args.full:
+            ledger = FileLedger(args.ledger_file) if args.ledger_file else SnowflakeLedger(conn, args.ledger_table, dry_run=args.dry_run)
+        apply(conn, args.root, dry_run=args.dry_run, ledger=ledger, connect=connect,
+              parallel=args.parallel, continue_on_error=args.continue_on_error)
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# ------------------------ Dependency Graph ------------------------
+
+def build_graph(plan):
+    # deps[i] = indexes of statements that must finish before plan[i] runs:
+    # - earlier statements on the same object (create -> alter -> ownership)
+    # - non-drop statements on every object plan[i] references (the role
+    #   behind a default_role, the role and warehouse behind a grant)
+    # - for a drop, every earlier statement that references the dropped object
+    # Objects are indexed as we go, so building the graph is linear in the plan.
+    deps = [set() for _ in plan]
+    last_on = {}
+    defined = {}
+    referrers = {}
+    for i, stmt in enumerate(plan):
+        obj = (stmt.kind, stmt.name)
+        if obj in last_on:
+            deps[i].add(last_on[obj])
+        if stmt.action == "drop":
+            deps[i].update(referrers.get(obj, ()))
+        for ref in stmt.refs:
+            deps[i].update(defined.get(ref, ()))
+            referrers.setdefault(ref, []).append(i)
+        last_on[obj] = i
+        if stmt.action != "drop":
+            defined.setdefault(obj, []).append(i)
+    return deps
+
+# ------------------------ Execution ------------------------
+
+class ConnectionPool:
+    # Opens connections lazily, one per concurrently running statement. A
+    # `seed` connection is lent to the pool but never closed by it.
+    def __init__(self, connect, seed=None):
+        self._connect = connect
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        if seed is not None:
+            self._idle.put(seed)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            with self._lock:
+                self._all.append(conn)
+            return conn
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+
+def _run(pool, stmt):
+    conn = pool.acquire()
+    start = time.perf_counter()
+    try:
+        cur = conn.cursor()
+        try:
+            cur.execute(stmt.sql)
+        finally:
+            cur.close()
+        return time.perf_counter() - start
+    finally:
+        pool.release(conn)
+
+def execute_plan(plan, connect, parallel: int = 8, continue_on_error: bool = False, seed=None, log=print):
+    # Runs `plan` on up to `parallel` connections, starting each statement as
+    # soon as its dependencies have succeeded. Returns one result dict per
+    # statement: status is ok / failed / skipped / cancelled. fail-fast stops
+    # scheduling on the first error; continue-on-error only skips statements
+    # that depend (directly or not) on a failure.
+    deps = build_graph(plan)
+    dependents = [[] for _ in plan]
+    for i, ds in enumerate(deps):
+        for d in ds:
+            dependents[d].append(i)
+    waiting = [len(ds) for ds in deps]
+    results = [{"statement": stmt, "status": "pending", "seconds": None, "error": None} for stmt in plan]
+    ready = [i for i, n in enumerate(waiting) if n == 0]
+    stop = False
+
+    def skip(i):
+        stack = list(dependents[i])
+        while stack:
+            j = stack.pop()
+            if results[j]["status"] == "pending":
+                results[j]["status"] = "skipped"
+                stack.extend(dependents[j])
+
+    pool = ConnectionPool(connect, seed)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="ddl") as workers:
+            running = {}
+            while ready or running:
+                # Only `parallel` statements are handed to the workers at a
+                # time, so fail-fast leaves the rest unstarted
+                while ready and not stop and len(running) < parallel:
+                    i = ready.pop()
+                    if results[i]["status"] != "pending":
+                        continue
+                    results[i]["status"] = "running"
+                    running[workers.submit(_run, pool, plan[i])] = i
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        results[i]["seconds"] = future.result()
+                        results[i]["status"] = "ok"
+                        log(f"  ok      {results[i]['seconds']:6.2f}s  {plan[i].sql}")
+                        for j in dependents[i]:
+                            waiting[j] -= 1
+                            if waiting[j] == 0:
+                                ready.append(j)
+                    except Exception as e:
+                        results[i]["status"] = "failed"
+                        results[i]["error"] = str(e)
+                        log(f"  FAILED           {plan[i].sql}\n          {e}")
+                        skip(i)
+                        if not continue_on_error:
+                            stop = True
+    finally:
+        pool.close()
+
+    for r in results:
+        if r["status"] == "pending":
+            r["status"] = "cancelled"
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    busy = sum(r["seconds"] or 0 for r in results)
+    log(f"{len(plan)} statement(s) in {time.perf_counter() - started:.2f}s wall / {busy:.2f}s total: "
+        + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    return results
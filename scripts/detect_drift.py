@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from scripts.apply_to_snowflake_yml import REPO_ROOT, connect
+from scripts.snowflake_plan import (
+    load_desired, _changed, _normalise,
+    USER_PROPERTIES, USER_CREATE_ONLY, USER_UNSETTABLE,
+    ROLE_PROPERTIES, WAREHOUSE_PROPERTIES, WAREHOUSE_UNSETTABLE,
+)
+from scripts.snowflake_state import query, load_users, load_roles, load_warehouses, load_warehouse_parameters
+from scripts.state_ledger import content_hash
+
+# Drift is anything the next apply would change: a field where the account
+# and the repo YAML disagree, an object the YAML defines that the account
+# lacks, or an object in the account the YAML doesn't manage.
+#
+# Each run probes the account with one SHOW per object type, reading back
+# only name, a HASH() fingerprint of the managed columns, and the object's
+# created/updated time via RESULT_SCAN. Only objects whose fingerprint moved,
+# whose timestamp is past the stored watermark, or whose YAML entry changed
+# are fetched in full and diffed; every other object keeps its last report.
+# Warehouse parameters (concurrency, timeouts) aren't SHOW columns and
+# change no timestamp, so managed warehouses also have them read on every
+# run and folded into their fingerprint.
+
+DRIFT_KINDS = {
+    "users": {
+        "show": "USERS",
+        "columns": ['"login_name"', '"display_name"', '"first_name"', '"last_name"', '"email"', '"comment"',
+                    '"disabled"', '"default_warehouse"', '"default_namespace"', '"default_role"',
+                    '"default_secondary_roles"', '"owner"', '"type"'],
+        "changed_at": '"created_on"',
+        "exclude": "'SNOWFLAKE'",
+        "load": lambda conn, rows, names: load_users(conn, rows=rows),
+        "properties": {**USER_PROPERTIES, "owner": "ident"},
+        "skip": USER_CREATE_ONLY,
+        "unsettable": USER_UNSETTABLE,
+    },
+    "roles": {
+        "show": "ROLES",
+        "columns": ['"owner"', '"comment"'],
+        "changed_at": '"created_on"',
+        "load": lambda conn, rows, names: load_roles(conn, rows=rows),
+        "properties": {**ROLE_PROPERTIES, "owner": "ident"},
+        "unsettable": {"comment"},
+    },
+    "warehouses": {
+        "show": "WAREHOUSES",
+        "columns": ['"size"', '"type"', '"scaling_policy"', '"auto_suspend"', '"auto_resume"',
+                    '"enable_query_acceleration"', '"query_acceleration_max_scale_factor"',
+                    '"min_cluster_count"', '"max_cluster_count"', '"resource_monitor"', '"owner"', '"comment"'],
+        "changed_at": 'GREATEST("created_on", "updated_on")',
+        "load": lambda conn, rows, names: load_warehouses(conn, with_parameters=names, rows=rows),
+        "parameters": load_warehouse_parameters,
+        "properties": {**WAREHOUSE_PROPERTIES, "owner": "ident"},
+        "unsettable": WAREHOUSE_UNSETTABLE,
+    },
+}
+
+FETCH_CHUNK = 1000
+
+# ------------------------ Account Probe ------------------------
+
+def _show(conn, object_type: str):
+    # Run SHOW without fetching its rows; RESULT_SCAN reads them server-side.
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SHOW {object_type}")
+        return cur.sfqid
+    finally:
+        cur.close()
+
+def _literal(value) -> str:
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def probe(conn, spec):
+    # -> (query_id, {name: (fingerprint, changed_at epoch seconds)})
+    query_id = _show(conn, spec["show"])
+    where = f'WHERE "name" NOT IN ({spec["exclude"]})' if spec.get("exclude") else ""
+    rows = query(conn, f"""
+        SELECT "name" AS NAME, HASH({", ".join(spec["columns"])}) AS FINGERPRINT,
+               DATE_PART(EPOCH_SECOND, {spec["changed_at"]}) AS CHANGED_AT
+        FROM TABLE(RESULT_SCAN('{query_id}'))
+        {where}
+    """)
+    return query_id, {r["name"]: (r["fingerprint"], int(r["changed_at"] or 0)) for r in rows}
+
+def fetch(conn, spec, query_id: str, names, with_parameters=()):
+    # Full SHOW rows for `names`, read back from the probe's result set.
+    rows = []
+    names = sorted(names)
+    for i in range(0, len(names), FETCH_CHUNK):
+        chunk = ", ".join(_literal(n) for n in names[i:i + FETCH_CHUNK])
+        rows += query(conn, f"SELECT * FROM TABLE(RESULT_SCAN('{query_id}')) WHERE \"name\" IN ({chunk})")
+    with_parameters = set(with_parameters)
+    return spec["load"](conn, rows, [n for n in names if n in with_parameters])
+
+# ------------------------ Diff ------------------------
+
+def diff_object(spec, entry, live, deleted=False):
+    # -> None when in sync, else {"status": ..., "fields": [...]}. Field
+    # changes are from the repo's point of view: "added" is set in the
+    # account only, "removed" is in the YAML only, "changed" differs.
+    if deleted:
+        return None  # an `action: delete` entry is a pending apply, not drift
+    if entry is None and live is None:
+        return None
+    if entry is None:
+        return {"status": "unmanaged", "fields": []}
+    if live is None:
+        return {"status": "missing", "fields": []}
+    properties = spec["properties"]
+    changed, unset = _changed(entry, live, properties, skip=spec.get("skip", ()))
+    fields = []
+    for key in changed + [k for k in unset if k in spec["unsettable"]]:
+        want = _normalise(entry.get(key), properties[key])
+        have = _normalise(live.get(key), properties[key])
+        change = "added" if want is None else "removed" if have is None else "changed"
+        fields.append({"field": key, "change": change, "repo": want, "live": have})
+    return {"status": "changed", "fields": fields} if fields else None
+
+def detect_drift(conn, root, state):
+    # -> (new_state, reports, rechecked). `reports[kind][name]` is the new
+    # report (None = in sync) for every name in `rechecked[kind]`.
+    desired = load_desired(root)
+    new_state = {"watermarks": {}, "live": {}, "desired": {}}
+    reports, rechecked = {}, {}
+
+    for kind, spec in DRIFT_KINDS.items():
+        watermark = state.get("watermarks", {}).get(kind, 0)
+        old_live = state.get("live", {}).get(kind, {})
+        old_desired = state.get("desired", {}).get(kind, {})
+
+        query_id, live = probe(conn, spec)
+        present = desired[kind]["present"]
+        if spec.get("parameters"):
+            parameters = spec["parameters"](conn, set(live) & set(present))
+            live = {n: (content_hash([fp, parameters.get(n)]) if n in parameters else fp, at)
+                    for n, (fp, at) in live.items()}
+        deleted = desired[kind]["deleted"]
+        want_hash = {key: content_hash(entry) for key, entry in present.items()}
+        want_hash.update({key: "deleted" for key in deleted})
+
+        changed = {n for n, (fp, at) in live.items() if old_live.get(n) != fp or at > watermark}
+        changed |= set(old_live) - set(live)
+        changed |= {k for k, h in want_hash.items() if old_desired.get(k) != h}
+        changed |= set(old_desired) - set(want_hash)
+
+        # Unmanaged objects only need to exist; full rows are for managed ones.
+        records = fetch(conn, spec, query_id, changed & set(live) & set(present), with_parameters=present)
+        reports[kind] = {
+            name: diff_object(spec, present.get(name), records.get(name, {} if name in live else None),
+                              deleted=name in deleted)
+            for name in changed
+        }
+        rechecked[kind] = changed
+        new_state["watermarks"][kind] = max([watermark] + [at for _, at in live.values()])
+        new_state["live"][kind] = {n: fp for n, (fp, _) in live.items()}
+        new_state["desired"][kind] = want_hash
+        print(f"{kind}: {len(live)} in account, {len(changed)} re-checked, "
+              f"{sum(1 for r in reports[kind].values() if r)} drifted")
+    return new_state, reports, rechecked
+
+# ------------------------ Stores ------------------------
+
+class FileDriftStore:
+    # Local JSON stand-in for the Snowflake tables, for dry runs and dev.
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists():
+            return {}
+        return json.loads(self.path.read_text())
+
+    def save(self, state, reports, rechecked):
+        drift = self.load().get("drift", {})
+        for kind, names in rechecked.items():
+            current = drift.setdefault(kind, {})
+            for name in names:
+                if reports[kind].get(name):
+                    current[name] = reports[kind][name]
+                else:
+                    current.pop(name, None)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({**state, "drift": drift}, indent=2, sort_keys=True, default=str))
+
+class SnowflakeDriftStore:
+    # Probe state lives in <table>_STATE as one JSON document per kind; the
+    # report the Drift page reads is <table>, one row per drifted field (or
+    # per missing/unmanaged object). Only rechecked objects' rows are rewritten.
+
+    def __init__(self, conn, table: str = "IAC_DRIFT"):
+        self.conn = conn
+        self.table = table
+        self.state_table = f"{table}_STATE"
+
+    def _execute(self, sql: str, params=None, many=False):
+        cur = self.conn.cursor()
+        try:
+            if many:
+                cur.executemany(sql, params)
+                return []
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def load(self):
+        self._execute(f"CREATE TABLE IF NOT EXISTS {self.state_table} (KIND STRING, STATE STRING, SAVED_AT TIMESTAMP_LTZ)")
+        self._execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                KIND STRING, NAME STRING, STATUS STRING, FIELD STRING, CHANGE STRING,
+                REPO_VALUE STRING, LIVE_VALUE STRING, DETECTED_AT TIMESTAMP_LTZ
+            )
+        """)
+        state = {"watermarks": {}, "live": {}, "desired": {}}
+        for kind, saved in self._execute(f"SELECT KIND, STATE FROM {self.state_table}"):
+            saved = json.loads(saved)
+            for section in state:
+                state[section][kind] = saved[section]
+        return state
+
+    def save(self, state, reports, rechecked):
+        # One transaction, so a failure part way keeps the previous reports
+        # and state rather than dropping a kind's rows unsaved.
+        self._execute("BEGIN")
+        try:
+            for kind, names in rechecked.items():
+                names = sorted(names)
+                for i in range(0, len(names), FETCH_CHUNK):
+                    chunk = names[i:i + FETCH_CHUNK]
+                    self._execute(
+                        f"DELETE FROM {self.table} WHERE KIND = %s AND NAME IN ({', '.join(['%s'] * len(chunk))})",
+                        (kind, *chunk),
+                    )
+                rows = []
+                for name in names:
+                    report = reports[kind].get(name)
+                    if not report:
+                        continue
+                    for f in report["fields"] or [{}]:
+                        rows.append((kind, name, report["status"], f.get("field"), f.get("change"),
+                                     _text(f.get("repo")), _text(f.get("live"))))
+                if rows:
+                    self._execute(
+                        f"INSERT INTO {self.table} (KIND, NAME, STATUS, FIELD, CHANGE, REPO_VALUE, LIVE_VALUE, DETECTED_AT) "
+                        f"VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP())",
+                        rows, many=True,
+                    )
+                saved = {section: state[section][kind] for section in state}
+                self._execute(f"DELETE FROM {self.state_table} WHERE KIND = %s", (kind,))
+                self._execute(
+                    f"INSERT INTO {self.state_table} (KIND, STATE, SAVED_AT) SELECT %s, %s, CURRENT_TIMESTAMP()",
+                    (kind, json.dumps(saved)),
+                )
+        except Exception:
+            self._execute("ROLLBACK")
+            raise
+        self._execute("COMMIT")
+
+def _text(value):
+    return None if value is None else str(value)
+
+# ------------------------ CLI ------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report drift between the IaC YAML in this repo and Snowflake.")
+    parser.add_argument("--root", default=REPO_ROOT, type=Path, help="Repository root holding the YAML files.")
+    parser.add_argument("--state-file", type=Path, help="Keep drift state and report in a local JSON file instead of Snowflake.")
+    parser.add_argument("--report-table", default=os.getenv("IAC_DRIFT_TABLE", "IAC_DRIFT"),
+                        help="Snowflake table the drift report is written to.")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        store = FileDriftStore(args.state_file) if args.state_file else SnowflakeDriftStore(conn, args.report_table)
+        state, reports, rechecked = detect_drift(conn, args.root, store.load())
+        store.save(state, reports, rechecked)
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
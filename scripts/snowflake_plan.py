@@ -0,0 +1,354 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from ruamel.yaml import YAML
+from utils.grant_entries import expand_grant_entries, parse_bulk
+from scripts.snowflake_state import (
+    ident_key, object_key, quote_ident, split_name,
+    load_users, load_roles, load_warehouses, load_grants, load_future_grants, load_object_counts,
+)
+
+OBJECT_KINDS = ("roles", "warehouses", "users", "grants")
+
+@dataclass
+class Statement:
+    kind: str    # role | warehouse | user | grant
+    name: str    # object key (a tuple for grants)
+    action: str  # create | alter | unset | ownership | grant | revoke | drop
+    sql: str
+    refs: frozenset = field(default_factory=frozenset)  # other (kind, key) objects this one needs
+
+# ------------------------ Desired State ------------------------
+
+def yaml_files(root):
+    root = Path(root)
+    files = {kind: sorted(root.glob(f"{kind}/**/*.yaml")) for kind in OBJECT_KINDS}
+    if (root / "users.yaml").exists():
+        files["users"].insert(0, root / "users.yaml")
+    return files
+
+def grant_key(entry):
+    on = entry.get("on") or {}
+    return (
+        ident_key(entry["role"]),
+        str(entry["privilege"]).strip().upper(),
+        " ".join(str(on.get("object_type", "")).split()).upper(),
+        object_key(on.get("name", "")),
+    )
+
+def entry_key(kind: str, entry):
+    return grant_key(entry) if kind == "grants" else ident_key(entry["name"])
+
+def parse_file(kind: str, path):
+    data = YAML(typ="safe").load(Path(path).read_text()) or {}
+    entries = data.get(kind) or []
+    if kind == "grants":
+        entries = expand_grant_entries(entries)
+    return [(entry_key(kind, entry), entry) for entry in entries]
+
+def load_desired(root, files=None, suppress=None):
+    # {kind: {"present": {key: entry}, "deleted": {key: entry}}}. Later files
+    # override earlier ones, but an `action: delete` entry anywhere wins: the
+    # pages write deletes to a separate file next to the original. `files`
+    # limits parsing to a subset of yaml_files(root); `suppress` holds keys
+    # deleted in files that were not parsed.
+    files = files if files is not None else yaml_files(root)
+    desired = {kind: {"present": {}, "deleted": {}} for kind in OBJECT_KINDS}
+    for kind, paths in files.items():
+        for path in paths:
+            for key, entry in parse_file(kind, path):
+                if entry.get("action") == "delete":
+                    desired[kind]["deleted"][key] = entry
+                else:
+                    desired[kind]["present"][key] = entry
+    for kind in OBJECT_KINDS:
+        deleted = set(desired[kind]["deleted"]) | set((suppress or {}).get(kind, ()))
+        for key in deleted:
+            desired[kind]["present"].pop(key, None)
+    return desired
+
+def load_actual(conn, desired, scoped=False):
+    # One SHOW per object type, plus per-warehouse parameters, per-role
+    # grants and object counts behind ALL grants for what the YAML actually
+    # mentions. With scoped=True the object SHOWs are narrowed to the names
+    # in `desired`, which is what an incremental run wants.
+    def names(kind):
+        if not scoped:
+            return None
+        return set(desired[kind]["present"]) | set(desired[kind]["deleted"])
+
+    warehouse_names = list(desired["warehouses"]["present"])
+    grant_keys = set(desired["grants"]["present"]) | set(desired["grants"]["deleted"])
+    grant_roles = {key[0] for key in grant_keys}
+    future_containers, bulk_containers = set(), set()
+    for key in grant_keys:
+        bulk = parse_bulk(key[2])
+        if bulk and bulk[0] == "FUTURE":
+            future_containers.add((bulk[2], key[3]))
+        elif bulk and key in desired["grants"]["present"]:
+            bulk_containers.add((bulk[1], bulk[2], key[3]))
+    return {
+        "roles": load_roles(conn, names("roles")),
+        "warehouses": load_warehouses(conn, with_parameters=warehouse_names, names=names("warehouses")),
+        "users": load_users(conn, names("users")),
+        "grants": {**load_grants(conn, grant_roles), **load_future_grants(conn, future_containers)},
+        "objects": load_object_counts(conn, bulk_containers),
+    }
+
+# ------------------------ SQL Rendering ------------------------
+
+def literal(value) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def _render(value, style: str) -> str:
+    if style == "ident":
+        return object_key(value)
+    if style == "word":
+        return str(value).upper()
+    if style == "roles":
+        return "(" + ", ".join(literal(ident_key(r)) for r in str(value).split(",") if r.strip()) + ")"
+    return literal(value)
+
+def _normalise(value, style: str):
+    if value is None or value == "":
+        return None
+    if style == "ident":
+        return object_key(value)
+    if style == "word":
+        return str(value).upper()
+    if style == "roles":
+        return ",".join(ident_key(r) for r in str(value).split(",") if r.strip())
+    if style == "login":
+        # Snowflake upper-cases login names on write
+        return str(value).upper()
+    if style == "int":
+        return int(value)
+    if style == "bool":
+        return bool(value)
+    return str(value)
+
+def _assignments(entry, properties, keys=None):
+    keys = keys if keys is not None else [k for k in properties if entry.get(k) not in (None, "")]
+    return " ".join(f"{k.upper()} = {_render(entry[k], properties[k])}" for k in keys)
+
+# ------------------------ Object Diffs ------------------------
+
+# yaml key -> rendering style. Keys in CREATE_ONLY cannot be read back from
+# SHOW output, so they are only written when the object is created.
+USER_PROPERTIES = {
+    "login_name": "login", "display_name": "str", "first_name": "str", "middle_name": "str",
+    "last_name": "str", "email": "str", "comment": "str", "disabled": "bool",
+    "must_change_password": "bool", "default_warehouse": "ident", "default_namespace": "ident",
+    "default_role": "ident", "default_secondary_roles": "roles", "network_policy": "ident",
+    "rsa_public_key": "str", "type": "word", "password": "str",
+}
+USER_CREATE_ONLY = {"middle_name", "network_policy", "rsa_public_key", "password", "must_change_password"}
+# Re-sent on every changed entry in incremental runs, where a content-hash
+# change is the only signal we have for them.
+USER_REFRESHABLE = {"middle_name", "network_policy", "rsa_public_key"}
+USER_UNSETTABLE = {"display_name", "first_name", "last_name", "email", "comment", "default_warehouse",
+                   "default_namespace", "default_role", "default_secondary_roles"}
+
+ROLE_PROPERTIES = {"comment": "str"}
+
+WAREHOUSE_PROPERTIES = {
+    "warehouse_size": "word", "warehouse_type": "str", "scaling_policy": "word",
+    "auto_suspend": "int", "auto_resume": "bool", "enable_query_acceleration": "bool",
+    "query_acceleration_max_scale_factor": "int", "min_cluster_count": "int",
+    "max_cluster_count": "int", "max_concurrency_level": "int",
+    "statement_timeout_in_seconds": "int", "statement_queued_timeout_in_seconds": "int",
+    "resource_monitor": "ident", "comment": "str",
+}
+WAREHOUSE_UNSETTABLE = {"resource_monitor", "comment"}
+
+SQL_TYPES = {"users": "USER", "roles": "ROLE", "warehouses": "WAREHOUSE"}
+STATEMENT_KINDS = {"users": "user", "roles": "role", "warehouses": "warehouse", "grants": "grant"}
+
+def _changed(entry, current, properties, skip=()):
+    changed, unset = [], []
+    for key, style in properties.items():
+        if key in skip:
+            continue
+        want = _normalise(entry.get(key), style)
+        have = _normalise(current.get(key), style)
+        if key == "auto_suspend":
+            want, have = want or 0, have or 0
+        if want == have:
+            continue
+        if want is None:
+            unset.append(key)
+        else:
+            changed.append(key)
+    return changed, unset
+
+# yaml key -> statement kind it references, for execution ordering
+REFERENCES = {
+    "default_role": "role",
+    "default_warehouse": "warehouse",
+    "resource_monitor": "resource_monitor",
+}
+
+def _refs(entry):
+    return frozenset((kind, ident_key(entry[key])) for key, kind in REFERENCES.items() if entry.get(key))
+
+def plan_objects(kind: str, desired, actual, properties, create_only=(), unsettable=(), refresh=()):
+    statements = []
+    sql_type = SQL_TYPES[kind]
+    stmt_kind = STATEMENT_KINDS[kind]
+    for key, entry in desired[kind]["present"].items():
+        name = quote_ident(key)
+        current = actual[kind].get(key)
+        refs = _refs(entry)
+        if current is None:
+            props = _assignments(entry, properties)
+            statements.append(Statement(stmt_kind, key, "create", f"CREATE {sql_type} {name} {props}".rstrip(), refs))
+        else:
+            changed, unset = _changed(entry, current, properties, skip=create_only)
+            changed += [k for k in refresh if entry.get(k) not in (None, "")]
+            if changed:
+                statements.append(Statement(stmt_kind, key, "alter",
+                                            f"ALTER {sql_type} {name} SET {_assignments(entry, properties, changed)}", refs))
+            unset = [k for k in unset if k in unsettable]
+            if unset:
+                statements.append(Statement(stmt_kind, key, "unset",
+                                            f"ALTER {sql_type} {name} UNSET {', '.join(k.upper() for k in unset)}"))
+        owner = entry.get("owner")
+        if owner and (current is None or ident_key(owner) != ident_key(current.get("owner") or "")):
+            statements.append(Statement(stmt_kind, key, "ownership",
+                                        f"GRANT OWNERSHIP ON {sql_type} {name} TO ROLE {quote_ident(ident_key(owner))} COPY CURRENT GRANTS",
+                                        frozenset({("role", ident_key(owner))})))
+    return statements
+
+def plan_drops(kind: str, desired, actual):
+    return [
+        Statement(STATEMENT_KINDS[kind], key, "drop", f"DROP {SQL_TYPES[kind]} {quote_ident(key)}")
+        for key in desired[kind]["deleted"]
+        if key in actual[kind]
+    ]
+
+def _grant_refs(key):
+    role, _, object_type, object_name = key
+    refs = {("role", role)}
+    if object_type in ("ROLE", "WAREHOUSE", "USER"):
+        refs.add((object_type.lower(), ident_key(object_name)))
+    return frozenset(refs)
+
+def plan_grants(desired, actual, managed=None):
+    # Work out what each (role, privilege, object) needs, then emit one
+    # GRANT/REVOKE per role, object and option with all its privileges.
+    # `managed` is every grant the repo keeps (default: the present ones in
+    # `desired`), for re-granting what a bulk revoke takes with it.
+    managed = managed if managed is not None else desired["grants"]["present"]
+    groups = {}
+    def need(key, action, option, after=None):
+        role, privilege, object_type, object_name = key
+        groups.setdefault((action, option, role, object_type, object_name, after), []).append(privilege)
+
+    # ALL <type>S IN ... grants don't exist as such in the account, only the
+    # per-object grants they made. One is issued when fewer of those exist
+    # than there are objects in the container (new objects since, or a new
+    # entry), and revoked while any remain that no single-object entry keeps.
+    def bulk_all(key):
+        bulk = parse_bulk(key[2])
+        return bulk if bulk and bulk[0] == "ALL" else None
+
+    def per_object(key):
+        # (grant key, with_grant_option) of the per-object grants under key's container
+        role, privilege, object_type, container = key
+        _, single, _ = bulk_all(key)
+        prefix = split_name(container)
+        for (r, p, t, name), option in actual["grants"].items():
+            if (r, p, t) == (role, privilege, single):
+                parts = split_name(name)
+                if len(parts) > len(prefix) and parts[:len(prefix)] == prefix:
+                    yield (r, p, t, name), option
+
+    def bulk_grant_needed(key, want_option):
+        _, single, container_type = bulk_all(key)
+        objects = actual.get("objects", {}).get((single, container_type, key[3]))
+        if objects is None:
+            return True  # not counted: issue it as the entry asks
+        covered = sum(1 for _, option in per_object(key) if option or not want_option)
+        return covered < objects
+
+    def bulk_revoke_needed(key):
+        return any(k not in managed for k, _ in per_object(key))
+
+    # Revoking ALL <type>S IN <container> also strips the privilege from
+    # objects the repo grants one by one, so those are granted again after
+    # the revoke even when their own entries haven't changed.
+    bulk_revokes = {}
+    for key in desired["grants"]["deleted"]:
+        if bulk_all(key) and bulk_revoke_needed(key):
+            role, privilege, object_type, container = key
+            single = bulk_all(key)[1]
+            bulk_revokes.setdefault((role, privilege, single), []).append((split_name(container), object_type, container))
+
+    def revoked_by(key):
+        role, privilege, object_type, object_name = key
+        parts = split_name(object_name)
+        for container_parts, bulk_type, container in bulk_revokes.get((role, privilege, object_type), ()):
+            if len(parts) > len(container_parts) and parts[:len(container_parts)] == container_parts:
+                return (role, bulk_type, container)
+        return None
+
+    for key, entry in desired["grants"]["present"].items():
+        want_option = bool(entry.get("with_grant_option"))
+        have_option = actual["grants"].get(key)
+        after = revoked_by(key)
+        if after:
+            need(key, "grant", want_option, after)
+        elif bulk_all(key):
+            if bulk_grant_needed(key, want_option):
+                need(key, "grant", want_option)
+        elif have_option is None or (want_option and not have_option):
+            need(key, "grant", want_option)
+        elif have_option and not want_option:
+            need(key, "revoke_option", False)
+    for key, entry in managed.items():
+        if key in desired["grants"]["present"] or key in desired["grants"]["deleted"]:
+            continue
+        after = revoked_by(key)
+        if after:
+            need(key, "grant", bool(entry.get("with_grant_option")), after)
+    for key in desired["grants"]["deleted"]:
+        if bulk_all(key):
+            if bulk_revoke_needed(key):
+                need(key, "revoke", False)
+        elif key in actual["grants"]:
+            need(key, "revoke", False)
+
+    statements, regrants = [], []
+    for (action, option, role, object_type, object_name, after), privileges in groups.items():
+        on = f"{', '.join(privileges)} ON {object_type} {object_name}"
+        to = quote_ident(role)
+        refs = _grant_refs((role, None, object_type, object_name))
+        if action == "grant":
+            sql = f"GRANT {on} TO ROLE {to}" + (" WITH GRANT OPTION" if option else "")
+        elif action == "revoke_option":
+            sql = f"REVOKE GRANT OPTION FOR {on} FROM ROLE {to}"
+        else:
+            sql = f"REVOKE {on} FROM ROLE {to}"
+        stmt = Statement("grant", (role, object_type, object_name), "revoke" if action != "grant" else "grant", sql,
+                         refs | {("grant", after)} if after else refs)
+        (regrants if after else statements).append(stmt)
+    return statements + regrants
+
+def build_plan(desired, actual, incremental=False, managed=None):
+    # Creates and alters run parents first (roles, warehouses, users), then
+    # grants; drops run last in the reverse order. In incremental runs every
+    # entry in `desired` is known to have changed, and `managed` carries the
+    # repo's other grants (see plan_grants).
+    user_refresh = USER_REFRESHABLE if incremental else ()
+    return (
+        plan_objects("roles", desired, actual, ROLE_PROPERTIES, unsettable={"comment"})
+        + plan_objects("warehouses", desired, actual, WAREHOUSE_PROPERTIES, unsettable=WAREHOUSE_UNSETTABLE)
+        + plan_objects("users", desired, actual, USER_PROPERTIES, USER_CREATE_ONLY, USER_UNSETTABLE, user_refresh)
+        + plan_grants(desired, actual, managed)
+        + plan_drops("users", desired, actual)
+        + plan_drops("warehouses", desired, actual)
+        + plan_drops("roles", desired, actual)
+    )
@@ -0,0 +1,249 @@
+import json
+from utils.grant_entries import BULK_OBJECT_TYPES
+
+# ------------------------ Helpers ------------------------
+
+# Snowflake's "does not exist or not authorized" error code
+DOES_NOT_EXIST_ERRNO = 2003
+
+def does_not_exist(error) -> bool:
+    return getattr(error, "errno", None) == DOES_NOT_EXIST_ERRNO or "does not exist" in str(error)
+
+def query(conn, sql: str):
+    # Rows as dicts keyed by lower-case column name.
+    cur = conn.cursor()
+    try:
+        cur.execute(sql)
+        columns = [c[0].lower() for c in cur.description or []]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+def ident_key(name) -> str:
+    # The name as Snowflake stores it: unquoted identifiers resolve to upper
+    # case, quoted ones keep their case.
+    name = str(name).strip()
+    if len(name) > 1 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.upper() if _is_simple(name) else name
+
+def split_name(name) -> list:
+    # DB."my.schema".T -> ['DB', '"my.schema"', 'T']: dots inside quotes
+    # belong to the identifier.
+    parts, current, quoted = [], "", False
+    for c in str(name).strip():
+        if c == '"':
+            quoted = not quoted
+        if c == "." and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += c
+    return parts + [current]
+
+def object_key(name) -> str:
+    # A dotted object path in one canonical SQL spelling, so SHOW output and
+    # YAML compare equal and the key can be used in statements as it is.
+    if not str(name).strip():
+        return ""
+    return ".".join(quote_ident(ident_key(part)) for part in split_name(name))
+
+def _none(value):
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().lower() in ("", "null"):
+        return None
+    return value
+
+def _bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+def _int(value):
+    value = _none(value)
+    return None if value is None else int(value)
+
+def _size(value):
+    value = _none(value)
+    return None if value is None else str(value).replace("-", "").upper()
+
+def _secondary_roles(value):
+    value = _none(value)
+    if value is None:
+        return None
+    try:
+        roles = json.loads(value)
+    except (TypeError, ValueError):
+        roles = str(value).strip("()[]").split(",")
+    return ",".join(ident_key(r) for r in roles if str(r).strip())
+
+# ------------------------ Account State ------------------------
+
+# Above this many names a full SHOW is cheaper than one SHOW ... LIKE each.
+SCOPED_SHOW_LIMIT = 50
+
+def show(conn, object_type: str, names=None):
+    # SHOW <object_type>, or, for a short list of names, one SHOW ... LIKE per
+    # name so small incremental runs don't list the whole account.
+    if names is None or len(names) > SCOPED_SHOW_LIMIT:
+        return query(conn, f"SHOW {object_type}")
+    rows = []
+    for name in sorted(names):
+        # "_" and "%" stay wildcards; the exact-name filter below drops extras.
+        pattern = str(name).replace("\\", "\\\\").replace("'", "\\'")
+        rows += [r for r in query(conn, f"SHOW {object_type} LIKE '{pattern}'") if r["name"] == name]
+    return rows
+
+# The loaders take `rows` when the caller already has SHOW output.
+
+def load_users(conn, names=None, rows=None):
+    users = {}
+    for row in rows if rows is not None else show(conn, "USERS", names):
+        if row["name"] == "SNOWFLAKE":
+            continue
+        users[row["name"]] = {
+            "login_name": _none(row.get("login_name")),
+            "display_name": _none(row.get("display_name")),
+            "first_name": _none(row.get("first_name")),
+            "last_name": _none(row.get("last_name")),
+            "email": _none(row.get("email")),
+            "comment": _none(row.get("comment")),
+            "disabled": _bool(row.get("disabled")),
+            "must_change_password": _bool(row.get("must_change_password")),
+            "default_warehouse": _none(row.get("default_warehouse")),
+            "default_namespace": _none(row.get("default_namespace")),
+            "default_role": _none(row.get("default_role")),
+            "default_secondary_roles": _secondary_roles(row.get("default_secondary_roles")),
+            "owner": _none(row.get("owner")),
+            "type": _none(row.get("type")),
+        }
+    return users
+
+def load_roles(conn, names=None, rows=None):
+    return {
+        row["name"]: {
+            "owner": _none(row.get("owner")),
+            "comment": _none(row.get("comment")),
+        }
+        for row in (rows if rows is not None else show(conn, "ROLES", names))
+    }
+
+WAREHOUSE_PARAMETERS = [
+    "max_concurrency_level",
+    "statement_timeout_in_seconds",
+    "statement_queued_timeout_in_seconds",
+]
+
+def load_warehouses(conn, with_parameters=(), names=None, rows=None):
+    # Concurrency and timeouts are parameters rather than SHOW columns, so they
+    # are only looked up for the warehouses named in with_parameters.
+    warehouses = {}
+    for row in rows if rows is not None else show(conn, "WAREHOUSES", names):
+        warehouses[row["name"]] = {
+            "warehouse_size": _size(row.get("size")),
+            "warehouse_type": _none(row.get("type")),
+            "scaling_policy": _none(row.get("scaling_policy")),
+            "auto_suspend": _int(row.get("auto_suspend")),
+            "auto_resume": _bool(row.get("auto_resume")),
+            "enable_query_acceleration": _bool(row.get("enable_query_acceleration")),
+            "query_acceleration_max_scale_factor": _int(row.get("query_acceleration_max_scale_factor")),
+            "min_cluster_count": _int(row.get("min_cluster_count")),
+            "max_cluster_count": _int(row.get("max_cluster_count")),
+            "resource_monitor": _none(row.get("resource_monitor")),
+            "owner": _none(row.get("owner")),
+            "comment": _none(row.get("comment")),
+        }
+    parameters = load_warehouse_parameters(conn, [n for n in with_parameters if ident_key(n) in warehouses])
+    for key, values in parameters.items():
+        warehouses[key].update(values)
+    return warehouses
+
+def load_warehouse_parameters(conn, names):
+    # {warehouse: {parameter: value}} for WAREHOUSE_PARAMETERS, one SHOW
+    # PARAMETERS per warehouse.
+    parameters = {}
+    for name in names:
+        key = ident_key(name)
+        values = parameters.setdefault(key, {})
+        for row in query(conn, f"SHOW PARAMETERS IN WAREHOUSE {quote_ident(key)}"):
+            if row["key"].lower() in WAREHOUSE_PARAMETERS:
+                values[row["key"].lower()] = _int(row["value"])
+    return parameters
+
+def load_grants(conn, roles):
+    # {(role, privilege, object_type, object_name): with_grant_option} for the
+    # given roles only; the planner ignores keys it does not manage.
+    grants = {}
+    for role in sorted({ident_key(r) for r in roles}):
+        try:
+            rows = query(conn, f"SHOW GRANTS TO ROLE {quote_ident(role)}")
+        except Exception as e:
+            if not does_not_exist(e):
+                raise
+            continue  # role will be created by this plan
+        for row in rows:
+            key = (
+                role,
+                str(row["privilege"]).upper(),
+                str(row["granted_on"]).upper().replace("_", " "),
+                object_key(row["name"]),
+            )
+            grants[key] = _bool(row.get("grant_option"))
+    return grants
+
+def load_future_grants(conn, containers):
+    # The same shape for FUTURE grants, which SHOW GRANTS TO ROLE leaves out:
+    # (role, privilege, "FUTURE TABLES IN SCHEMA", schema) for each
+    # (container_type, container_name) in containers.
+    grants = {}
+    for container_type, name in sorted(containers):
+        try:
+            rows = query(conn, f"SHOW FUTURE GRANTS IN {container_type} {name}")
+        except Exception as e:
+            if not does_not_exist(e):
+                raise
+            continue  # container does not exist (yet)
+        for row in rows:
+            if str(row.get("grant_to", "ROLE")).upper() != "ROLE":
+                continue
+            plural = str(row["grant_on"]).upper().replace("_", " ") + "S"
+            key = (
+                ident_key(row["grantee_name"]),
+                str(row["privilege"]).upper(),
+                f"FUTURE {plural} IN {container_type}",
+                name,
+            )
+            grants[key] = _bool(row.get("grant_option"))
+    return grants
+
+# object type -> what SHOW calls it, where that isn't the bulk plural
+SHOW_PLURALS = {"FUNCTION": "USER FUNCTIONS", "PROCEDURE": "USER PROCEDURES"}
+
+def load_object_counts(conn, containers):
+    # {(object_type, container_type, container): number of objects} for the
+    # objects an ALL <type>S IN <container> grant reaches, so the planner can
+    # tell whether the per-object grants it made still cover them. Objects in
+    # INFORMATION_SCHEMA are left out, as the grant leaves them out.
+    counts = {}
+    for object_type, container_type, name in sorted(containers):
+        plural = SHOW_PLURALS.get(object_type) or BULK_OBJECT_TYPES[object_type][0]
+        try:
+            rows = query(conn, f"SHOW {plural} IN {container_type} {name}")
+        except Exception as e:
+            if not does_not_exist(e):
+                raise
+            rows = []  # container does not exist (yet)
+        skip = "name" if object_type == "SCHEMA" else "schema_name"
+        counts[(object_type, container_type, name)] = sum(
+            1 for row in rows if str(row.get(skip) or "").upper() != "INFORMATION_SCHEMA")
+    return counts
+
+def quote_ident(key) -> str:
+    # Inverse of ident_key: render a stored name as SQL. Dotted paths are
+    # already SQL once they are an object_key.
+    key = str(key)
+    return key if _is_simple(key) and key == key.upper() else '"' + key.replace('"', '""') + '"'
+
+def _is_simple(part: str) -> bool:
+    return bool(part) and (part[0].isalpha() or part[0] == "_") and all(c.isalnum() or c in "_$" for c in part)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+from pathlib import Path
+from scripts.snowflake_plan import OBJECT_KINDS, yaml_files, parse_file
+from scripts.snowflake_state import does_not_exist
+
+# A ledger maps each YAML file (repo-relative path) to what was last applied
+# from it successfully:
+#   {"file_hash": str, "entries": {entry_id: entry_hash}, "deleted": {kind: [entry_id]}}
+# entry_id is the JSON form of the planner's object key.
+
+def content_hash(data) -> str:
+    if not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+def entry_id(key) -> str:
+    return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+def _key(entry_id_: str):
+    key = json.loads(entry_id_)
+    return tuple(key) if isinstance(key, list) else key
+
+# ------------------------ Ledger Stores ------------------------
+
+class FileLedger:
+    # Local JSON stand-in for the Snowflake table, for dry runs and dev.
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists():
+            return {}
+        return json.loads(self.path.read_text())
+
+    def save(self, records, changed_paths):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(records, indent=2, sort_keys=True))
+
+class SnowflakeLedger:
+    # With dry_run the table is only read: it is not created, and a missing
+    # table reads as an empty ledger.
+
+    def __init__(self, conn, table: str = "IAC_APPLY_LEDGER", dry_run: bool = False):
+        self.conn = conn
+        self.table = table
+        self.dry_run = dry_run
+
+    def _execute(self, sql: str, params=None):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def load(self):
+        if not self.dry_run:
+            self._execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    PATH STRING, FILE_HASH STRING, RECORD STRING, APPLIED_AT TIMESTAMP_LTZ
+                )
+            """)
+        try:
+            rows = self._execute(f"SELECT PATH, RECORD FROM {self.table}")
+        except Exception as e:
+            if self.dry_run and does_not_exist(e):
+                return {}
+            raise
+        return {path: json.loads(record) for path, record in rows}
+
+    def save(self, records, changed_paths):
+        # Only rows for files that changed or disappeared are rewritten, in
+        # one transaction so a failure part way leaves the previous ledger.
+        if not changed_paths:
+            return
+        self._execute("BEGIN")
+        try:
+            for path in changed_paths:
+                self._execute(f"DELETE FROM {self.table} WHERE PATH = %s", (path,))
+                if path in records:
+                    self._execute(
+                        f"INSERT INTO {self.table} (PATH, FILE_HASH, RECORD, APPLIED_AT) "
+                        f"SELECT %s, %s, %s, CURRENT_TIMESTAMP()",
+                        (path, records[path]["file_hash"], json.dumps(records[path], sort_keys=True)),
+                    )
+        except Exception:
+            self._execute("ROLLBACK")
+            raise
+        self._execute("COMMIT")
+
+# ------------------------ Change Detection ------------------------
+
+def diff_against_ledger(root, previous):
+    # Returns (desired, records, changed_paths). `desired` has the same shape
+    # as snowflake_plan.load_desired, but holds only the entries whose content
+    # hash differs from the ledger; files whose bytes are unchanged are not
+    # parsed at all. `suppress` keys deleted in unparsed files so a changed
+    # create elsewhere can't resurrect them.
+    root = Path(root)
+    desired = {kind: {"present": {}, "deleted": {}} for kind in OBJECT_KINDS}
+    records = {}
+    changed_paths = []
+    suppress = {kind: set() for kind in OBJECT_KINDS}
+
+    for kind, paths in yaml_files(root).items():
+        for path in paths:
+            rel = path.relative_to(root).as_posix()
+            file_hash = content_hash(path.read_bytes())
+            old = previous.get(rel)
+            if old and old["file_hash"] == file_hash:
+                records[rel] = old
+                for deleted in old.get("deleted", {}).get(kind, []):
+                    suppress[kind].add(_key(deleted))
+                continue
+
+            changed_paths.append(rel)
+            old_entries = (old or {}).get("entries", {})
+            record = {"file_hash": file_hash, "entries": {}, "deleted": {kind: []}}
+            for key, entry in parse_file(kind, path):
+                eid = entry_id(key)
+                ehash = content_hash(entry)
+                record["entries"][eid] = ehash
+                bucket = "deleted" if entry.get("action") == "delete" else "present"
+                if bucket == "deleted":
+                    record["deleted"][kind].append(eid)
+                if old_entries.get(eid) != ehash:
+                    desired[kind][bucket][key] = entry
+                elif bucket == "deleted":
+                    suppress[kind].add(key)
+            records[rel] = record
+
+    changed_paths += [rel for rel in previous if rel not in records]
+
+    for kind in OBJECT_KINDS:
+        for key in set(desired[kind]["deleted"]) | suppress[kind]:
+            desired[kind]["present"].pop(key, None)
+    return desired, records, changed_paths
@@ -0,0 +1,123 @@
+import base64
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+# ------------------------ Fake GitHub Server ------------------------
+# Just enough of the REST API for utils.github, served over real HTTP so
+# PyGithub's requester is exercised as it is against api.github.com.
+
+class FakeGitHub:
+    def __init__(self, files: dict):
+        self.files = dict(files)
+        self.head = "commit0"
+        self.requests = []   # (method, path, json body)
+        self.failures = []   # (method, path suffix, (status, headers, body)), each served once
+        self.pulls = []
+        self.trees = {}
+        self.url = None
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next(self, prefix: str) -> str:
+        self._ids += 1
+        return f"{prefix}{self._ids}"
+
+    def posts(self, suffix: str):
+        return [body for method, path, body in self.requests if method == "POST" and path.endswith(suffix)]
+
+    def handle(self, method: str, path: str, query: dict, body):
+        with self._lock:
+            self.requests.append((method, path, body))
+            for failure in self.failures:
+                if method == failure[0] and path.endswith(failure[1]):
+                    self.failures.remove(failure)
+                    return failure[2]
+            repo = f"{self.url}/repos/owner/repo"
+            route = path[len("/repos/owner/repo"):] if path.startswith("/repos/owner/repo") else None
+            if route is None:
+                return 404, {}, {"message": "Not Found"}
+            if method == "GET" and route == "":
+                return 200, {}, {"url": repo, "full_name": "owner/repo", "name": "repo", "default_branch": "main"}
+            if method == "GET" and route == "/branches/main":
+                # As GitHub sends it: commit.commit has a url but no sha
+                return 200, {}, {"name": "main", "commit": {
+                    "sha": self.head, "url": f"{repo}/commits/{self.head}",
+                    "commit": {"url": f"{repo}/git/commits/{self.head}", "message": "seed",
+                               "tree": {"sha": "tree0", "url": f"{repo}/git/trees/tree0"}}}}
+            if method == "GET" and route.startswith("/git/commits/"):
+                sha = route.rsplit("/", 1)[1]
+                return 200, {}, {"sha": sha, "url": f"{repo}/git/commits/{sha}", "message": "seed",
+                                 "tree": {"sha": "tree0", "url": f"{repo}/git/trees/tree0"}, "parents": []}
+            if method == "GET" and route.startswith("/contents/"):
+                name = route[len("/contents/"):]
+                if name not in self.files:
+                    return 404, {}, {"message": "Not Found"}
+                content = self.files[name].encode()
+                return 200, {"ETag": f'"{hash(content)}"'}, {
+                    "type": "file", "path": name, "name": name, "sha": "blob", "encoding": "base64",
+                    "content": base64.b64encode(content).decode(), "url": f"{repo}/contents/{name}"}
+            if method == "POST" and route == "/git/trees":
+                sha = self._next("tree")
+                self.trees[sha] = body["tree"]
+                return 201, {}, {"sha": sha, "url": f"{repo}/git/trees/{sha}", "tree": []}
+            if method == "POST" and route == "/git/commits":
+                sha = self._next("commit")
+                return 201, {}, {"sha": sha, "url": f"{repo}/git/commits/{sha}", "message": body["message"],
+                                 "tree": {"sha": body["tree"], "url": f"{repo}/git/trees/{body['tree']}"}}
+            if method == "POST" and route == "/git/refs":
+                return 201, {}, {"ref": body["ref"], "url": f"{repo}/git/{body['ref']}",
+                                 "object": {"sha": body["sha"], "type": "commit", "url": f"{repo}/git/commits/{body['sha']}"}}
+            if method == "POST" and route == "/pulls":
+                number = len(self.pulls) + 1
+                self.pulls.append(body)
+                return 201, {}, {"number": number, "state": "open", "title": body["title"], "url": f"{repo}/pulls/{number}",
+                                 "html_url": f"https://github.test/owner/repo/pull/{number}"}
+            return 404, {}, {"message": "Not Found"}
+
+def _handler(fake: FakeGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        def _serve(self):
+            parts = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            status, headers, data = fake.handle(self.command, parts.path, parse_qs(parts.query), body)
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PATCH = _serve
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+@pytest.fixture
+def github_server(monkeypatch):
+    # A FakeGitHub on localhost that utils.github talks to as owner/repo
+    import utils.github
+    import utils.vcs
+    fake = FakeGitHub({"users.yaml": "users:\n  - name: ALICE\n    email: alice@example.com\n"})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(fake))
+    fake.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setattr(utils.github, "GITHUB_API_URL", fake.url)
+    monkeypatch.setattr(utils.vcs, "get_current_user", lambda: "TEST_USER")
+    utils.github.clear_github_cache()
+    yield fake
+    utils.github.clear_github_cache()
+    server.shutdown()
+    server.server_close()
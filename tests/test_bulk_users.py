@@ -0,0 +1,117 @@
+import io
+import pandas as pd
+import pytest
+from ruamel.yaml import YAML
+from utils.bulk_users import read_user_file, users_to_records, users_to_yaml, validate_users
+
+PERSON = {
+    "name": "alice", "type": "", "email": "alice@example.com", "first_name": "Alice", "last_name": "Smith",
+    "password": "Secret1!", "default_role": "ANALYST", "default_warehouse": "ANALYST_WH",
+}
+SERVICE = {"name": "etl_bot", "type": "service", "default_role": "LOADER", "default_warehouse": "LOAD_WH"}
+
+def frame(*rows):
+    return pd.DataFrame(list(rows)).fillna("")
+
+def errors_for(row, **kwargs):
+    _, errors = validate_users(frame(row), **kwargs)
+    return list(errors["error"])
+
+class References:
+    def __init__(self, missing):
+        self._missing = missing
+
+    def missing(self, kind, names):
+        return {n for n in names if (kind, n) in self._missing}
+
+# ------------------------ Validation ------------------------
+
+def test_valid_rows_get_defaults():
+    valid, errors = validate_users(frame(PERSON, SERVICE))
+
+    assert errors.empty
+    alice, bot = valid.to_dict("records")
+    assert (alice["name"], alice["type"], alice["owner"], alice["login_name"]) == ("ALICE", "PERSON", "ACCOUNTADMIN", "ALICE")
+    assert alice["display_name"] == "Alice Smith"
+    assert bot["type"] == "SERVICE"
+
+@pytest.mark.parametrize("change, error", [
+    ({"name": ""}, "Name is required."),
+    ({"default_role": ""}, "Default role is required."),
+    ({"default_warehouse": ""}, "Default warehouse is required."),
+    ({"type": "robot"}, "Type must be PERSON or SERVICE."),
+    ({"email": ""}, "Email is required for PERSON users."),
+    ({"email": "alice@example"}, "Email is not a valid address."),
+    ({"last_name": ""}, "First and last name are required for PERSON users."),
+    ({"password": ""}, "Password is required for PERSON users."),
+    ({"disabled": "maybe"}, "disabled must be true or false."),
+    ({"must_change_password": "sometimes"}, "must_change_password must be true or false."),
+])
+def test_each_rule_reports_its_error(change, error):
+    assert errors_for({**PERSON, **change}) == [error]
+
+def test_service_users_cannot_carry_person_fields():
+    assert errors_for({**SERVICE, "password": "x"}) == ["SERVICE users cannot have a password or first/middle/last name."]
+    assert errors_for({**SERVICE, "middle_name": "Q"}) == ["SERVICE users cannot have a password or first/middle/last name."]
+
+def test_duplicates_existing_users_and_missing_references():
+    assert errors_for(PERSON, existing_users=["Alice"]) == ["User already exists in Snowflake."]
+    assert errors_for(PERSON, references=References({("warehouse", "ANALYST_WH")})) == \
+        ["Default warehouse `ANALYST_WH` does not exist."]
+    _, errors = validate_users(frame(PERSON, {**PERSON, "name": "ALICE"}))
+    assert list(errors["error"]) == ["Name appears more than once in the file."] * 2
+
+def test_error_rows_match_the_spreadsheet():
+    _, errors = validate_users(frame(PERSON, {**PERSON, "name": "bob", "email": ""}, SERVICE, {**SERVICE, "name": ""}))
+
+    # Header is row 1, so the second and fourth data rows are 3 and 5
+    assert list(errors["row"]) == [3, 5]
+    assert list(errors["name"]) == ["BOB", ""]
+
+def test_bools_parse_and_must_change_password_defaults_to_true():
+    valid, errors = validate_users(frame(
+        PERSON,
+        {**PERSON, "name": "bob", "must_change_password": "No", "disabled": "YES"},
+        {**PERSON, "name": "carol", "must_change_password": "false", "disabled": "0"},
+        {**PERSON, "name": "dave", "must_change_password": "y"},
+    ))
+
+    assert errors.empty
+    assert list(valid["must_change_password"]) == [True, False, False, True]
+    assert list(valid["disabled"]) == [False, True, False, False]
+
+# ------------------------ YAML Output ------------------------
+
+def test_service_users_drop_person_fields_and_blanks():
+    valid, _ = validate_users(frame(PERSON, SERVICE))
+    alice, bot = users_to_records(valid)
+
+    assert alice["password"] == "Secret1!" and alice["must_change_password"] is True
+    assert "comment" not in alice
+    assert not {"first_name", "last_name", "middle_name", "password", "must_change_password"} & set(bot)
+
+@pytest.mark.parametrize("value", [
+    "Reads: marts", "team #3", 'say "hi"', "it's", "yes", "null", "No", "42", "1e3", "0x1F",
+    "007 agent", " padded", "trailing ", "- dash", "[list]", "{map}", "&anchor", "*alias", "ünïcode",
+])
+def test_yaml_round_trips_awkward_values(value):
+    valid, errors = validate_users(frame({**PERSON, "comment": value, "display_name": value}))
+    assert errors.empty
+    text = users_to_yaml(valid)
+
+    (user,) = YAML(typ="safe").load(text)["users"]
+    assert user["comment"] == value.strip()
+    assert user["display_name"] == value.strip()
+    assert user == users_to_records(valid)[0]
+
+def test_empty_upload_is_an_empty_list():
+    valid, _ = validate_users(frame({**PERSON, "name": ""}))
+    assert YAML(typ="safe").load(users_to_yaml(valid)) == {"users": []}
+
+def test_read_user_file_normalises_headers_and_keeps_text():
+    upload = io.BytesIO(b"Name, Default Role,Disabled\nalice, 007,\n")
+    upload.name = "users.csv"
+    df = read_user_file(upload)
+
+    assert list(df.columns) == ["name", "default_role", "disabled"]
+    assert df.iloc[0].to_dict() == {"name": "alice", "default_role": "007", "disabled": ""}
@@ -0,0 +1,124 @@
+import threading
+import time
+from scripts.ddl_executor import execute_plan
+from scripts.snowflake_plan import Statement
+
+# ------------------------ Fake Connections ------------------------
+# Each statement takes DELAY seconds; any whose SQL mentions FAIL raises.
+
+DELAY = 0.02
+
+class FakeAccount:
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+        self.executed = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            self.opened += 1
+        return FakeConnection(self)
+
+class FakeConnection:
+    def __init__(self, account):
+        self.account = account
+
+    def cursor(self):
+        return FakeCursor(self.account)
+
+    def close(self):
+        self.account.closed += 1
+
+class FakeCursor:
+    def __init__(self, account):
+        self.account = account
+
+    def execute(self, sql):
+        account = self.account
+        with account._lock:
+            account.executed.append(sql)
+            account.active += 1
+            account.max_active = max(account.max_active, account.active)
+        try:
+            time.sleep(DELAY)
+            if "FAIL" in sql:
+                raise RuntimeError(f"SQL compilation error: {sql}")
+        finally:
+            with account._lock:
+                account.active -= 1
+
+    def close(self):
+        pass
+
+def statuses(results):
+    return {r["statement"].sql: r["status"] for r in results}
+
+def quiet(*args):
+    pass
+
+# ------------------------ Execution ------------------------
+
+def test_fail_fast_leaves_unstarted_statements_cancelled():
+    account = FakeAccount()
+    plan = [Statement("role", f"R{i}", "create", f"CREATE ROLE R{i}") for i in range(4)]
+    plan.append(Statement("role", "BAD", "create", "CREATE ROLE FAIL"))
+
+    results = execute_plan(plan, account.connect, parallel=1, log=quiet)
+
+    # Ready statements are taken last first, so the failure runs first
+    assert account.executed == ["CREATE ROLE FAIL"]
+    assert statuses(results) == {"CREATE ROLE FAIL": "failed", **{f"CREATE ROLE R{i}": "cancelled" for i in range(4)}}
+    assert "SQL compilation error" in results[-1]["error"]
+
+def test_continue_on_error_skips_only_what_depends_on_the_failure():
+    account = FakeAccount()
+    plan = [
+        Statement("role", "ANALYST", "create", "CREATE ROLE ANALYST FAIL"),
+        Statement("warehouse", "WH", "create", "CREATE WAREHOUSE WH"),
+        Statement("role", "ANALYST", "alter", "ALTER ROLE ANALYST SET COMMENT = 'x'"),
+        Statement("grant", ("ANALYST", "WAREHOUSE", "WH"), "grant", "GRANT USAGE ON WAREHOUSE WH TO ROLE ANALYST",
+                  frozenset({("role", "ANALYST"), ("warehouse", "WH")})),
+        Statement("user", "BOB", "create", "CREATE USER BOB DEFAULT_ROLE = ANALYST", frozenset({("role", "ANALYST")})),
+        Statement("user", "BOB", "alter", "ALTER USER BOB SET DISABLED = FALSE"),
+        Statement("user", "CAROL", "create", "CREATE USER CAROL"),
+    ]
+
+    results = execute_plan(plan, account.connect, parallel=4, continue_on_error=True, log=quiet)
+
+    assert statuses(results) == {
+        "CREATE ROLE ANALYST FAIL": "failed",
+        "CREATE WAREHOUSE WH": "ok",
+        "ALTER ROLE ANALYST SET COMMENT = 'x'": "skipped",
+        "GRANT USAGE ON WAREHOUSE WH TO ROLE ANALYST": "skipped",
+        "CREATE USER BOB DEFAULT_ROLE = ANALYST": "skipped",
+        # Only through the skipped CREATE USER
+        "ALTER USER BOB SET DISABLED = FALSE": "skipped",
+        "CREATE USER CAROL": "ok",
+    }
+    assert sorted(account.executed) == ["CREATE ROLE ANALYST FAIL", "CREATE USER CAROL", "CREATE WAREHOUSE WH"]
+
+def test_connections_are_bounded_by_parallel_and_closed():
+    account = FakeAccount()
+    seed = FakeConnection(account)
+    plan = [Statement("role", f"R{i}", "create", f"CREATE ROLE R{i}") for i in range(12)]
+
+    results = execute_plan(plan, account.connect, parallel=3, seed=seed, log=quiet)
+
+    assert all(r["status"] == "ok" for r in results)
+    assert account.max_active == 3
+    # The seed is one of the three and isn't closed by the pool
+    assert account.opened == 2 and account.closed == 2
+
+def test_each_statement_is_timed_and_summarised():
+    account = FakeAccount()
+    lines = []
+    plan = [Statement("role", "A", "create", "CREATE ROLE A"), Statement("role", "A", "alter", "ALTER ROLE A SET COMMENT = 'x'")]
+
+    results = execute_plan(plan, account.connect, parallel=2, log=lines.append)
+
+    assert [r["seconds"] >= DELAY for r in results] == [True, True]
+    assert lines[0].startswith("  ok ") and lines[0].endswith("CREATE ROLE A")
+    assert lines[-1].startswith("2 statement(s) in ") and lines[-1].endswith("2 ok")
@@ -0,0 +1,86 @@
+import pytest
+from scripts.detect_drift import SnowflakeDriftStore, detect_drift
+
+class ProbeConnection:
+    # SHOW <kind> followed by RESULT_SCAN reads, as detect_drift issues them.
+    def __init__(self, warehouses, parameters):
+        self.warehouses = warehouses
+        self.parameters = parameters
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            description, rows, sfqid = None, [], "q1"
+
+            def execute(self, sql, params=None):
+                if "HASH(" in sql:
+                    rows = [{"NAME": n, "FINGERPRINT": hash(tuple(sorted(w.items()))), "CHANGED_AT": 1}
+                            for n, w in conn.warehouses.items()] if "q-wh" in sql else []
+                elif "SELECT *" in sql:
+                    rows = [{"name": n, **w} for n, w in conn.warehouses.items() if f"'{n}'" in sql]
+                elif sql.startswith("SHOW PARAMETERS IN WAREHOUSE"):
+                    rows = [{"key": k.upper(), "value": v} for k, v in conn.parameters[sql.split()[-1]].items()]
+                else:
+                    self.sfqid = "q-wh" if sql == "SHOW WAREHOUSES" else "q-other"
+                    rows = []
+                columns = sorted({k for row in rows for k in row})
+                self.description = [(c,) for c in columns]
+                self.rows = [tuple(row.get(c) for c in columns) for row in rows]
+
+            def fetchall(self):
+                return self.rows
+
+            def close(self):
+                pass
+        return Cursor()
+
+def test_warehouse_parameter_drift_is_detected(tmp_path):
+    (tmp_path / "warehouses").mkdir()
+    (tmp_path / "warehouses" / "wh.yaml").write_text(
+        "warehouses:\n  - name: ANALYST_WH\n    warehouse_size: XSMALL\n    max_concurrency_level: 8\n")
+    conn = ProbeConnection({"ANALYST_WH": {"size": "X-Small", "auto_suspend": 0}},
+                           {"ANALYST_WH": {"max_concurrency_level": 8}})
+
+    state, reports, _ = detect_drift(conn, tmp_path, {})
+    assert reports["warehouses"] == {"ANALYST_WH": None}
+
+    # Only the parameter moves: no SHOW column, no timestamp
+    conn.parameters["ANALYST_WH"]["max_concurrency_level"] = 4
+    state, reports, rechecked = detect_drift(conn, tmp_path, state)
+    assert rechecked["warehouses"] == {"ANALYST_WH"}
+    assert reports["warehouses"]["ANALYST_WH"]["fields"] == [
+        {"field": "max_concurrency_level", "change": "changed", "repo": 8, "live": 4}]
+
+class RecordingConnection:
+    # Records each statement; the first INSERT into the state table raises.
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                conn.executed.append(" ".join(sql.split()))
+                if sql.startswith("INSERT INTO IAC_DRIFT_STATE"):
+                    raise RuntimeError("network")
+
+            def executemany(self, sql, params):
+                conn.executed.append(" ".join(sql.split()))
+
+            def fetchall(self):
+                return []
+
+            def close(self):
+                pass
+        return Cursor()
+
+def test_store_save_rolls_back_as_one_transaction():
+    conn = RecordingConnection()
+    state = {"watermarks": {"warehouses": 1}, "live": {"warehouses": {}}, "desired": {"warehouses": {}}}
+    reports = {"warehouses": {"ANALYST_WH": {"status": "missing", "fields": []}}}
+    with pytest.raises(RuntimeError):
+        SnowflakeDriftStore(conn).save(state, reports, {"warehouses": ["ANALYST_WH"]})
+
+    assert [sql.split()[0] for sql in conn.executed] == ["BEGIN", "DELETE", "INSERT", "DELETE", "INSERT", "ROLLBACK"]
@@ -0,0 +1,53 @@
+from ruamel.yaml import YAML
+from utils.github import raise_github_pr, raise_github_pr_multi
+
+def test_multi_file_upsert_is_one_tree_commit_ref_and_pr(github_server):
+    url = raise_github_pr_multi(
+        {
+            "users.yaml": "users:\n  - name: BOB\n    email: bob@example.com\n",
+            "roles/analyst.yaml": "roles:\n  - name: ANALYST\n",
+        },
+        token="token-upsert",
+        repo_name="owner/repo",
+    )
+
+    assert url == "https://github.test/owner/repo/pull/1"
+    assert len(github_server.posts("/git/trees")) == 1
+    assert len(github_server.posts("/git/commits")) == 1
+    assert len(github_server.posts("/git/refs")) == 1
+    assert len(github_server.posts("/pulls")) == 1
+
+    tree = github_server.posts("/git/trees")[0]
+    assert tree["base_tree"] == "tree0"
+    elements = {e["path"]: e for e in tree["tree"]}
+    assert set(elements) == {"users.yaml", "roles/analyst.yaml"}
+    # The submitted entry is upserted into the file on the default branch
+    users = [u["name"] for u in YAML(typ="safe").load(elements["users.yaml"]["content"])["users"]]
+    assert users == ["ALICE", "BOB"]
+    assert elements["roles/analyst.yaml"]["content"] == "roles:\n  - name: ANALYST\n"
+
+    commit = github_server.posts("/git/commits")[0]
+    assert commit["parents"] == ["commit0"]
+    assert "- roles/analyst.yaml" in commit["message"] and "- users.yaml" in commit["message"]
+    ref = github_server.posts("/git/refs")[0]
+    assert ref["ref"].startswith("refs/heads/iac-update-2_files-") and ref["sha"] == "commit2"
+    pull = github_server.posts("/pulls")[0]
+    assert pull["base"] == "main" and pull["head"] == ref["ref"][len("refs/heads/"):]
+    assert "`TEST_USER`" in pull["body"]
+
+def test_none_deletes_the_path_with_a_null_sha(github_server):
+    raise_github_pr_multi({"users.yaml": None, "roles/old.yaml": None}, token="token-delete", repo_name="owner/repo")
+
+    (tree,) = github_server.posts("/git/trees")
+    for element in tree["tree"]:
+        assert element["sha"] is None
+        assert "content" not in element
+    assert sorted(e["path"] for e in tree["tree"]) == ["roles/old.yaml", "users.yaml"]
+    assert len(github_server.posts("/pulls")) == 1
+
+def test_single_file_wrapper_raises_one_pr(github_server):
+    url = raise_github_pr("roles/analyst.yaml", "roles:\n  - name: ANALYST\n", "token-single", "owner/repo")
+
+    assert url.endswith("/pull/1")
+    assert [len(github_server.posts(p)) for p in ("/git/trees", "/git/commits", "/git/refs", "/pulls")] == [1, 1, 1, 1]
+    assert github_server.posts("/pulls")[0]["title"] == "[IaC] Update: roles/analyst.yaml"
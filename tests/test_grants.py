@@ -0,0 +1,14 @@
+from utils.grants import GrantSet
+
+def test_readding_a_grant_with_grant_option_upgrades_it():
+    grants = GrantSet()
+    assert grants.add("ANALYST", "USAGE", "DATABASE", "MARTS")
+    assert grants.add("ANALYST", "SELECT", "DATABASE", "MARTS")
+    assert not grants.add("analyst", "usage", "database", "marts")
+
+    assert grants.add("ANALYST", "USAGE", "DATABASE", "MARTS", with_grant_option=True)
+    assert len(grants) == 2
+    assert [(e["privileges"], e["with_grant_option"]) for e in grants.entries()] == [(["SELECT"], False), (["USAGE"], True)]
+
+    assert grants.add("ANALYST", "SELECT", "DATABASE", "MARTS", with_grant_option=True)
+    assert [(e["privileges"], e["with_grant_option"]) for e in grants.entries()] == [(["USAGE", "SELECT"], True)]
@@ -0,0 +1,46 @@
+import threading
+import pytest
+import utils.history
+import utils.vcs
+from utils.history import history_frame, parse_change, refresh_history
+
+def change(number, body, updated_at="2026-01-01T00:00:00Z"):
+    return {"number": number, "title": "[IaC] Pending users changes", "body": body, "state": "open",
+            "created_at": "2026-01-01T00:00:00Z", "updated_at": updated_at, "url": f"https://github.test/pull/{number}"}
+
+@pytest.fixture
+def histories(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.history, "HISTORY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(utils.history, "_histories", {})
+
+def test_rolling_body_lists_every_submitter_and_object():
+    body = utils.vcs._rolling_body("users", ["ALICE", "BOB"], ["ALICE_USER", "BOB_USER"])
+    record = parse_change(change(1, body))
+
+    assert record["users"] == ["ALICE", "BOB"]
+    assert record["objects"] == ["ALICE_USER", "BOB_USER"]
+    assert parse_change(change(2, "Generated by Snowflake user: `CAROL` via the IaC Assistant."))["users"] == ["CAROL"]
+
+def test_other_sessions_keep_the_loaded_history_while_one_refreshes(histories, monkeypatch):
+    listing, release = threading.Event(), threading.Event()
+
+    class Backend:
+        def list_changes(self, since=None):
+            yield change(1, "Generated by Snowflake user: `ALICE` via the IaC Assistant.")
+            if since:
+                listing.set()
+                release.wait(5)
+
+    monkeypatch.setattr(utils.vcs, "get_backend", lambda token, repo_name: Backend())
+    history = refresh_history("token", "owner/repo")
+    assert history["cursor"] == "2026-01-01T00:00:00Z"
+
+    slow = threading.Thread(target=refresh_history, args=("token", "owner/repo", True))
+    slow.start()
+    assert listing.wait(5)
+    # Neither a second refresh nor building the frame waits on the listing
+    assert refresh_history("token", "owner/repo", force=True) is history
+    assert list(history_frame(history)["users"]) == [["ALICE"]]
+    release.set()
+    slow.join(5)
+    assert not slow.is_alive()
@@ -0,0 +1,55 @@
+import time
+import utils.jobs as jobs
+
+def _wait(job_id):
+    while jobs.get_job(job_id)["status"] in jobs.PENDING_STATUSES:
+        time.sleep(0.01)
+    return jobs.get_job(job_id)
+
+def test_settled_job_stops_deduping_after_the_window(monkeypatch):
+    raised = []
+    monkeypatch.setattr(jobs, "get_current_user", lambda: "TEST_USER")
+    monkeypatch.setattr(jobs, "raise_change", lambda files, *a, **k: raised.append(files) or f"pr/{len(raised)}")
+    files = {"users.yaml": "users:\n  - name: DEDUPE_ME\n"}
+
+    first = jobs.submit_pr(files, "token", "owner/repo")
+    assert jobs.submit_pr(files, "token", "owner/repo") == first
+    assert _wait(first)["status"] == "done"
+    assert jobs.submit_pr(files, "token", "owner/repo") == first
+
+    # Once the job is older than the dedupe window (e.g. its PR was closed
+    # unmerged) the same change can be raised again
+    jobs.get_job(first)["finished_at"] -= jobs.DEDUPE_SECONDS
+    second = jobs.submit_pr(files, "token", "owner/repo")
+    assert second != first
+    assert _wait(second)["pr_url"] == "pr/2"
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(jobs, "get_current_user", lambda: "TEST_USER")
+    monkeypatch.setattr(jobs, "raise_change", lambda *a, **k: "pr")
+    ids = [jobs.submit_pr({"users.yaml": f"users:\n  - name: PRUNE_{i}\n"}, "token", "owner/repo") for i in range(4)]
+    for job_id in ids:
+        _wait(job_id)
+    jobs.get_job(ids[0])["finished_at"] -= jobs.JOB_RETENTION_SECONDS
+    # Lowered only now: the submits above would otherwise prune as jobs finish
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 2)
+
+    jobs.submit_pr({"users.yaml": "users:\n  - name: PRUNE_NEXT\n"}, "token", "owner/repo")
+    assert jobs.get_job(ids[0]) is None
+    assert sum(1 for job in jobs._jobs.values() if job.get("finished_at")) <= 2
+    assert all(job_id in jobs._jobs for job_id in jobs._jobs_by_key.values())
+
+def test_pending_batches_are_flushed_on_shutdown(monkeypatch):
+    raised = []
+    monkeypatch.setattr(jobs, "get_current_user", lambda: "TEST_USER")
+    monkeypatch.setattr(jobs, "raise_rolling_change", lambda files, *a, **k: raised.append(files) or "pr/rolling")
+    monkeypatch.setattr(jobs, "PR_BATCH_WINDOW_SECONDS", 60)
+
+    first = jobs.submit_pr({"roles/a.yaml": "roles:\n  - name: A\n"}, "token", "owner/repo")
+    second = jobs.submit_pr({"roles/b.yaml": "roles:\n  - name: B\n"}, "token", "owner/repo")
+    assert jobs.get_job(first)["status"] == "batched"
+
+    jobs.flush_pending_batches()
+    assert raised == [{"roles/a.yaml": "roles:\n  - name: A\n", "roles/b.yaml": "roles:\n  - name: B\n"}]
+    assert jobs.get_job(first)["status"] == jobs.get_job(second)["status"] == "done"
+    assert not jobs._batches
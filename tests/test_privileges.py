@@ -0,0 +1,23 @@
+from utils.privileges import PrivilegeIndex, qualified_name
+
+def test_quoted_mixed_case_names_do_not_collide():
+    index = PrivilegeIndex()
+    index.add_grant("OWNER", "USAGE", "SCHEMA", 'MARTS."MySchema"')
+    index.add_grant("ANALYST", "USAGE", "SCHEMA", "marts.myschema")
+
+    assert index.who_can("USAGE", "SCHEMA", 'marts."MySchema"')[0] == ["OWNER"]
+    assert index.who_can("USAGE", "SCHEMA", "MARTS.MYSCHEMA")[0] == ["ANALYST"]
+    # ACCOUNT_USAGE stores the resolved names; both spellings meet
+    assert qualified_name("SCHEMA", "MySchema", catalog="MARTS") == 'MARTS."MySchema"'
+    assert qualified_name("SCHEMA", "MYSCHEMA", catalog="MARTS") == "MARTS.MYSCHEMA"
+
+def test_grants_to_public_reach_every_role():
+    index = PrivilegeIndex()
+    index.add_user_grant("BOB", "ANALYST")
+    index.add_role_grant("ANALYST", "REPORTING")
+    index.add_grant("PUBLIC", "USAGE", "WAREHOUSE", "SHARED_WH")
+
+    roles, users = index.who_can("USAGE", "WAREHOUSE", "shared_wh")
+    assert roles == ["ANALYST", "PUBLIC", "REPORTING"]
+    assert users == ["BOB"]
+    assert "PUBLIC" in index.inherited_roles("REPORTING")
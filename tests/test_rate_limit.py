@@ -0,0 +1,47 @@
+import pytest
+from github import GithubException
+import utils.rate_limit as rate_limit
+from utils.github import clear_github_cache, get_repo, raise_github_pr
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE_SECONDS", 0.001)
+
+def stats(token):
+    return rate_limit.governor(token).stats
+
+def test_transient_errors_on_reads_are_retried(github_server):
+    github_server.failures += [("GET", "/branches/main", (502, {}, {"message": "Bad Gateway"}))] * 2
+
+    assert raise_github_pr("users.yaml", "users:\n  - name: BOB\n", "token-502", "owner/repo").endswith("/pull/1")
+    assert stats("token-502")["retries"] == 2
+
+def test_transient_errors_on_writes_are_not_retried(github_server):
+    github_server.failures.append(("POST", "/pulls", (502, {}, {"message": "Bad Gateway"})))
+
+    with pytest.raises(GithubException):
+        raise_github_pr("users.yaml", "users:\n  - name: BOB\n", "token-502-write", "owner/repo")
+    assert len(github_server.posts("/pulls")) == 1
+    assert stats("token-502-write")["retries"] == 0
+
+def test_rate_limited_writes_wait_and_retry(github_server):
+    github_server.failures.append(
+        ("POST", "/pulls", (429, {"Retry-After": "0"}, {"message": "You have exceeded a secondary rate limit"})))
+
+    assert raise_github_pr("users.yaml", "users:\n  - name: BOB\n", "token-429", "owner/repo").endswith("/pull/1")
+    assert len(github_server.posts("/pulls")) == 2
+    assert stats("token-429")["rate_limited"] == 1
+
+def test_permission_errors_are_not_retried(github_server):
+    github_server.failures.append(("POST", "/git/trees", (403, {}, {"message": "Resource not accessible by integration"})))
+
+    with pytest.raises(GithubException):
+        raise_github_pr("users.yaml", "users:\n  - name: BOB\n", "token-403", "owner/repo")
+    assert stats("token-403")["retries"] == 0 and stats("token-403")["rate_limited"] == 0
+
+def test_repo_keeps_its_governor_after_the_cache_is_cleared(github_server):
+    repo = get_repo("token-held", "owner/repo")
+    clear_github_cache()
+
+    from utils.github import get_branch
+    assert get_branch(repo, "main").commit.sha == "commit0"
@@ -0,0 +1,127 @@
+import pandas as pd
+import utils.catalog as catalog
+from utils.references import ReferenceIndex, grant_references, name_parts
+
+# ------------------------ Fake Session ------------------------
+# Answers the SQL ReferenceIndex sends from canned results, with the async
+# job shapes Snowpark returns. SHOW ... LIKE answers are looked up by the
+# exact statement, so a test can "create" an object after the load.
+
+class FakeJob:
+    def __init__(self, result, query_id=None):
+        self._result = result
+        self.query_id = query_id
+
+    def result(self):
+        return self._result
+
+class FakeDataFrame:
+    def __init__(self, rows=(), frame=None):
+        self.rows = rows
+        self.frame = frame
+
+    def collect_nowait(self):
+        return FakeJob(self.rows, query_id="show")
+
+    def to_pandas(self, block=True):
+        return self.frame if block else FakeJob(self.frame)
+
+class FakeSession:
+    def __init__(self, databases=(), schemas=(), tables=(), shows=None):
+        self.executed = []
+        self.shows = dict(shows or {})
+        self.databases = pd.DataFrame({"NAME": list(databases)})
+        self.schemas = pd.DataFrame(list(schemas), columns=["CATALOG_NAME", "SCHEMA_NAME"])
+        self.tables = pd.DataFrame(list(tables), columns=["TABLE_CATALOG", "TABLE_SCHEMA", "TABLE_NAME", "IS_VIEW"])
+
+    def sql(self, sql):
+        sql = " ".join(sql.split())
+        self.executed.append(sql)
+        if "RESULT_SCAN" in sql:
+            return FakeDataFrame(frame=self.databases)
+        if "ACCOUNT_USAGE.SCHEMATA" in sql:
+            return FakeDataFrame(frame=self.schemas)
+        if "ACCOUNT_USAGE.TABLES" in sql:
+            return FakeDataFrame(frame=self.tables)
+        return FakeDataFrame(rows=self.shows.get(sql, []))
+
+def index(session=None, **names):
+    names = {"role": ["ANALYST", "Mixed Case"], "warehouse": ["ANALYST_WH"], **names}
+    return ReferenceIndex(session or FakeSession(), names)
+
+def errors(refs, references):
+    return [e["error"] for e in references.check(refs)]
+
+# ------------------------ Checks ------------------------
+
+def test_unquoted_names_fold_to_upper_case_and_quoted_names_keep_theirs():
+    references = index()
+
+    assert name_parts('db."My Schema".t') == ("DB", "My Schema", "T")
+    assert errors([("x", "role", "analyst"), ("x", "role", '"Mixed Case"'), ("x", "warehouse", '"ANALYST_WH"')],
+                  references) == []
+    assert errors([("x", "role", '"analyst"')], references) == ['Role `"analyst"` does not exist.']
+    assert errors([("x", "role", "mixed case")], references) == ['Role `"MIXED CASE"` does not exist.']
+
+def test_missing_returns_the_names_as_passed_in():
+    session = FakeSession()
+    references = index(session)
+
+    assert references.missing("role", ["analyst", "GHOST", "ghost", "", "ANALYST"]) == {"GHOST", "ghost"}
+    # Both spellings of the miss are the one object, looked up live once
+    assert session.executed == ["SHOW ROLES LIKE 'GHOST'"]
+
+def test_objects_created_after_the_load_pass_the_live_recheck():
+    session = FakeSession(
+        databases=["MARTS"],
+        schemas=[("MARTS", "SALES")],
+        tables=[("MARTS", "SALES", "ORDERS", False)],
+        shows={"SHOW TABLES LIKE 'REFUNDS' IN SCHEMA MARTS.SALES": [{"name": "REFUNDS"}]},
+    )
+    references = index(session)
+
+    assert errors([("x", "table", "marts.sales.orders"), ("x", "table", "marts.sales.refunds")], references) == []
+    # Once confirmed the name is in the set and isn't looked up again
+    assert errors([("x", "table", "marts.sales.refunds")], references) == []
+    assert session.executed.count("SHOW TABLES LIKE 'REFUNDS' IN SCHEMA MARTS.SALES") == 1
+    assert errors([("x", "table", "marts.other.orders")], references) == ["Schema `MARTS.OTHER` does not exist."]
+    assert errors([("x", "table", "marts.sales")], references) == ["Table `marts.sales` must be written as DATABASE.SCHEMA.NAME."]
+
+def test_unloaded_network_policies_do_not_block():
+    references = index(network_policy=None)
+    assert references.missing("network_policy", ["ANY_POLICY"]) == set()
+    assert index(network_policy=["CORP"]).missing("network_policy", ["corp", "home"]) == {"home"}
+
+def test_check_references_blocks_on_errors(monkeypatch):
+    shown = []
+    references = index()
+    monkeypatch.setattr(catalog, "get_catalog", lambda: type("Catalog", (), {"references": references})())
+    monkeypatch.setattr(catalog.st, "error", shown.append)
+
+    entries = [{"role": "ANALYST", "privilege": "USAGE", "on": {"object_type": "WAREHOUSE", "name": "analyst_wh"}}]
+    assert catalog.check_references(grant_references(entries))
+    assert shown == []
+
+    entries[0]["on"]["name"] = "MISSING_WH"
+    assert not catalog.check_references(grant_references(entries))
+    assert shown == ["Grant 1 (ANALYST on MISSING_WH): Warehouse `MISSING_WH` does not exist."]
+
+def test_warehouse_parameters_quote_the_name_and_skip_non_integers():
+    class Session:
+        executed = []
+
+        def sql(self, sql):
+            self.executed.append(sql)
+            return type("Rows", (), {"collect": lambda _: [
+                {"key": "MAX_CONCURRENCY_LEVEL", "value": "8"},
+                {"key": "STATEMENT_TIMEOUT_IN_SECONDS", "value": ""},
+                {"key": "STATEMENT_QUEUED_TIMEOUT_IN_SECONDS", "value": "n/a"},
+                {"key": "OTHER", "value": "1"},
+            ]})()
+
+    session = Session()
+    cat = catalog.Catalog(session)
+    cat.warehouses = {'Team "A" WH': {"warehouse_size": "XSMALL", "comment": None}}
+
+    assert cat.warehouse('Team "A" WH') == {"warehouse_size": "XSMALL", "max_concurrency_level": 8}
+    assert session.executed == ['SHOW PARAMETERS IN WAREHOUSE "Team ""A"" WH"']
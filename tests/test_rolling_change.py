@@ -0,0 +1,28 @@
+import subprocess
+import utils.vcs as vcs
+
+def test_rolling_body_covers_every_batch(tmp_path, monkeypatch):
+    repo = tmp_path / "repo.git"
+    subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=main", str(repo)], check=True)
+    users = iter(["ALICE", "BOB", "ALICE"])
+    monkeypatch.setattr(vcs, "get_current_user", lambda: next(users))
+
+    url = vcs.raise_rolling_change({"roles/a.yaml": "roles:\n  - name: ANALYST\n"}, None, str(repo), "roles")
+    assert vcs.raise_rolling_change({"roles/b.yaml": "roles:\n  - name: LOADER\n"}, None, str(repo), "roles") == url
+    vcs.raise_rolling_change({"roles/a.yaml": "roles:\n  - name: ANALYST\n    comment: x\n"}, None, str(repo), "roles")
+
+    (change,) = vcs.get_backend(None, str(repo)).list_changes()
+    assert "Opened by Snowflake user: `ALICE`" in change["body"]
+    assert "Submitted by Snowflake users: `ALICE`, `BOB`" in change["body"]
+    assert change["body"].endswith("Objects: `ANALYST`, `LOADER`")
+
+def test_every_page_resolves_the_same_token_and_repo(monkeypatch):
+    import streamlit as st
+    monkeypatch.setattr(st, "secrets", {"GITHUB_TOKEN": "secret-token", "GITHUB_REPO": "owner/from-secrets"})
+    monkeypatch.delenv("GITHUB_PAT", raising=False)
+    monkeypatch.delenv("GITHUB_REPO", raising=False)
+    assert vcs.vcs_settings() == ("secret-token", "owner/from-secrets")
+
+    monkeypatch.setenv("GITHUB_PAT", "env-token")
+    monkeypatch.setenv("GITHUB_REPO", "owner/from-env")
+    assert vcs.vcs_settings() == ("env-token", "owner/from-env")
@@ -0,0 +1,80 @@
+import random
+import time
+from utils.search import NameIndex
+
+NAMES = ["ANALYST", "analyst_ro", "DATA_ANALYST", "Ops_Analyst", "ADMIN", "SYSADMIN", "ACCOUNTADMIN", "LOADER"]
+
+def brute_force(names, query):
+    # Prefix matches first, then other names containing the query, each in
+    # case-folded sorted order
+    folded = sorted(names, key=lambda n: (n.casefold(), n))
+    q = query.strip().casefold()
+    prefix = [n for n in folded if n.casefold().startswith(q)]
+    return prefix + [n for n in folded if q in n.casefold() and n not in prefix]
+
+def all_pages(index, query, limit):
+    names, page = [], 0
+    while True:
+        found, has_more = index.search(query, limit=limit, page=page)
+        names += found
+        if not has_more:
+            return names, page
+        assert len(found) == limit
+        page += 1
+
+def test_prefix_matches_come_before_substring_matches():
+    index = NameIndex(NAMES)
+
+    assert index.search("analyst")[0] == ["ANALYST", "analyst_ro", "DATA_ANALYST", "Ops_Analyst"]
+    assert index.search("  AdMiN ")[0] == ["ADMIN", "ACCOUNTADMIN", "SYSADMIN"]
+    assert index.search("")[0] == sorted(NAMES, key=str.casefold)
+    assert index.search("nothing") == ([], False)
+
+def test_names_repeating_the_query_are_listed_once():
+    index = NameIndex(["AA_AA_AA", "BAA", "AAB", "C"])
+
+    assert index.search("aa")[0] == ["AA_AA_AA", "AAB", "BAA"]
+    assert index.search("a", limit=1, page=2) == (["BAA"], False)
+
+def test_pages_cover_every_match_once_with_has_more():
+    index = NameIndex(NAMES)
+
+    assert index.search("a", limit=3, page=0) == (["ACCOUNTADMIN", "ADMIN", "ANALYST"], True)
+    assert index.search("a", limit=3, page=1) == (["analyst_ro", "DATA_ANALYST", "LOADER"], True)
+    assert index.search("a", limit=3, page=2) == (["Ops_Analyst", "SYSADMIN"], False)
+    assert index.search("analyst", limit=2, page=1) == (["DATA_ANALYST", "Ops_Analyst"], False)
+    assert index.search("a", limit=3, page=5) == ([], False)
+
+def test_paging_matches_a_brute_force_search():
+    rng = random.Random(7)
+    names = {"".join(rng.choice("abAB_") for _ in range(rng.randint(1, 6))) for _ in range(300)}
+    index = NameIndex(names)
+    for query in ["a", "B", "ab", "_a", "ba_", "aaa", "x"]:
+        for limit in (1, 7, 50):
+            found, _ = all_pages(index, query, limit)
+            assert found == brute_force(names, query), (query, limit)
+
+def test_membership_is_exact():
+    index = NameIndex(NAMES)
+    assert "Ops_Analyst" in index
+    assert "OPS_ANALYST" not in index
+
+def test_keystrokes_stay_under_a_millisecond_at_60k_names():
+    index = NameIndex(f"{kind}_{i:05d}_{team}" for i in range(20000)
+                      for kind, team in (("ROLE", "SALES"), ("USER", "FINANCE"), ("WH", "OPS")))
+    assert len(index) == 60000
+    typed = [query[:n] for query in ("role_01234", "sales", "finance", "_ops") for n in range(1, len(query) + 1)]
+    # Best of a few runs per keystroke, so a scheduler hiccup doesn't fail
+    # the test. A query that few names contain scans most of the joined
+    # blob, so single keystrokes may run over; the average may not.
+    times = {query: _best(index.search, query) for query in typed + ["zzz"]}
+    assert sum(times.values()) / len(times) < 0.001, times
+    assert max(times.values()) < 0.002, times
+
+def _best(fn, *args):
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
@@ -0,0 +1,201 @@
+import pytest
+from scripts.ddl_executor import build_graph
+from scripts.snowflake_plan import build_plan, load_actual, load_desired
+from scripts.snowflake_state import load_grants, object_key
+
+# ------------------------ Fake Connection ------------------------
+# Answers SHOW statements from canned rows the way the connector's cursor
+# does, so the planner runs end to end without Snowflake.
+
+class FakeError(Exception):
+    def __init__(self, msg, errno):
+        super().__init__(msg)
+        self.errno = errno
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+        result = self.conn.results.get(sql, [])
+        if isinstance(result, Exception):
+            raise result
+        columns = sorted({k for row in result for k in row})
+        self.description = [(c,) for c in columns]
+        self._rows = [tuple(row.get(c) for c in columns) for row in result]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+def write(root, path, text):
+    target = root / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+
+def plan_sql(root, conn):
+    desired = load_desired(root)
+    return [stmt.sql for stmt in build_plan(desired, load_actual(conn, desired))]
+
+# ------------------------ Planner ------------------------
+
+def test_creates_what_the_account_lacks(tmp_path):
+    write(tmp_path, "roles/analyst.yaml", "roles:\n  - name: ANALYST\n    comment: Reads marts\n")
+    write(tmp_path, "warehouses/wh.yaml", "warehouses:\n  - name: ANALYST_WH\n    warehouse_size: XSMALL\n")
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n  - role: ANALYST\n    privilege: USAGE\n    on:\n      object_type: WAREHOUSE\n      name: analyst_wh\n")
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": FakeError("Role 'ANALYST' does not exist or not authorized.", 2003)})
+
+    assert plan_sql(tmp_path, conn) == [
+        "CREATE ROLE ANALYST COMMENT = 'Reads marts'",
+        "CREATE WAREHOUSE ANALYST_WH WAREHOUSE_SIZE = XSMALL",
+        "GRANT USAGE ON WAREHOUSE ANALYST_WH TO ROLE ANALYST",
+    ]
+
+def test_converged_account_plans_nothing(tmp_path):
+    write(tmp_path, "roles/analyst.yaml", "roles:\n  - name: ANALYST\n    comment: Reads marts\n")
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n  - role: ANALYST\n    privilege: USAGE\n    on:\n      object_type: DATABASE\n      name: MARTS\n")
+    conn = FakeConnection({
+        "SHOW ROLES": [{"name": "ANALYST", "comment": "Reads marts", "owner": "SYSADMIN"}],
+        "SHOW GRANTS TO ROLE ANALYST": [{"privilege": "USAGE", "granted_on": "DATABASE", "name": "MARTS", "grant_option": "false"}],
+    })
+
+    assert plan_sql(tmp_path, conn) == []
+
+def test_alters_changed_fields_and_drops_deleted_objects(tmp_path):
+    write(tmp_path, "warehouses/wh.yaml",
+          "warehouses:\n  - name: ANALYST_WH\n    warehouse_size: SMALL\n    auto_suspend: 60\n"
+          "  - name: OLD_WH\n    action: delete\n")
+    conn = FakeConnection({"SHOW WAREHOUSES": [
+        {"name": "ANALYST_WH", "size": "X-Small", "auto_suspend": 60, "auto_resume": "true"},
+        {"name": "OLD_WH", "size": "X-Small"},
+    ]})
+
+    assert plan_sql(tmp_path, conn) == [
+        "ALTER WAREHOUSE ANALYST_WH SET WAREHOUSE_SIZE = SMALL",
+        "DROP WAREHOUSE OLD_WH",
+    ]
+
+def test_grant_option_and_revokes(tmp_path):
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n"
+          "  - role: ANALYST\n    privilege: USAGE\n    with_grant_option: true\n    on:\n      object_type: DATABASE\n      name: MARTS\n"
+          "  - role: ANALYST\n    privilege: USAGE\n    action: delete\n    on:\n      object_type: SCHEMA\n      name: MARTS.OLD\n")
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": [
+        {"privilege": "USAGE", "granted_on": "DATABASE", "name": "MARTS", "grant_option": "false"},
+        {"privilege": "USAGE", "granted_on": "SCHEMA", "name": "MARTS.OLD", "grant_option": "false"},
+    ]})
+
+    assert plan_sql(tmp_path, conn) == [
+        "GRANT USAGE ON DATABASE MARTS TO ROLE ANALYST WITH GRANT OPTION",
+        "REVOKE USAGE ON SCHEMA MARTS.OLD FROM ROLE ANALYST",
+    ]
+
+def test_deleting_an_all_grant_regrants_managed_objects_under_it(tmp_path):
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    action: delete\n    on:\n      object_type: ALL TABLES IN SCHEMA\n      name: MARTS.SALES\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    on:\n      object_type: TABLE\n      name: MARTS.SALES.ORDERS\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    on:\n      object_type: TABLE\n      name: MARTS.OTHER.ORDERS\n")
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": [
+        {"privilege": "SELECT", "granted_on": "TABLE", "name": "MARTS.SALES.ORDERS", "grant_option": "false"},
+        {"privilege": "SELECT", "granted_on": "TABLE", "name": "MARTS.SALES.REFUNDS", "grant_option": "false"},
+        {"privilege": "SELECT", "granted_on": "TABLE", "name": "MARTS.OTHER.ORDERS", "grant_option": "false"},
+    ]})
+    desired = load_desired(tmp_path)
+    plan = build_plan(desired, load_actual(conn, desired))
+
+    assert [stmt.sql for stmt in plan] == [
+        "REVOKE SELECT ON ALL TABLES IN SCHEMA MARTS.SALES FROM ROLE ANALYST",
+        "GRANT SELECT ON TABLE MARTS.SALES.ORDERS TO ROLE ANALYST",
+    ]
+    assert build_graph(plan) == [set(), {0}]
+
+def test_ledger_runs_regrant_unchanged_entries_after_an_all_revoke(tmp_path):
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n  - role: ANALYST\n    privilege: SELECT\n    with_grant_option: true\n"
+          "    on:\n      object_type: TABLE\n      name: MARTS.SALES.ORDERS\n")
+    write(tmp_path, "grants/bulk.yaml",
+          "grants:\n  - role: ANALYST\n    privilege: SELECT\n    action: delete\n"
+          "    on:\n      object_type: ALL TABLES IN DATABASE\n      name: MARTS\n")
+    managed = load_desired(tmp_path)["grants"]["present"]
+    desired = load_desired(tmp_path, files={"grants": [tmp_path / "grants/bulk.yaml"]})
+    actual = {"roles": {}, "warehouses": {}, "users": {}, "grants": {
+        ("ANALYST", "SELECT", "TABLE", "MARTS.SALES.ORDERS"): True,
+        ("ANALYST", "SELECT", "TABLE", "MARTS.SALES.REFUNDS"): False,
+    }}
+
+    assert [stmt.sql for stmt in build_plan(desired, actual, incremental=True, managed=managed)] == [
+        "REVOKE SELECT ON ALL TABLES IN DATABASE MARTS FROM ROLE ANALYST",
+        "GRANT SELECT ON TABLE MARTS.SALES.ORDERS TO ROLE ANALYST WITH GRANT OPTION",
+    ]
+
+def test_all_grants_converge_to_an_empty_plan(tmp_path):
+    write(tmp_path, "grants/analyst.yaml",
+          "grants:\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    on:\n      object_type: ALL TABLES IN SCHEMA\n      name: MARTS.SALES\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    action: delete\n    on:\n      object_type: ALL VIEWS IN SCHEMA\n      name: MARTS.SALES\n"
+          "  - role: ANALYST\n    privilege: SELECT\n    on:\n      object_type: VIEW\n      name: MARTS.SALES.V1\n")
+    tables = {"SHOW TABLES IN SCHEMA MARTS.SALES": [
+        {"name": "T1", "schema_name": "SALES"}, {"name": "T2", "schema_name": "SALES"}]}
+    conn = FakeConnection({**tables, "SHOW GRANTS TO ROLE ANALYST": [
+        {"privilege": "SELECT", "granted_on": "VIEW", "name": "MARTS.SALES.V1", "grant_option": "false"},
+        {"privilege": "SELECT", "granted_on": "VIEW", "name": "MARTS.SALES.V2", "grant_option": "false"},
+    ]})
+
+    assert plan_sql(tmp_path, conn) == [
+        "GRANT SELECT ON ALL TABLES IN SCHEMA MARTS.SALES TO ROLE ANALYST",
+        "REVOKE SELECT ON ALL VIEWS IN SCHEMA MARTS.SALES FROM ROLE ANALYST",
+        "GRANT SELECT ON VIEW MARTS.SALES.V1 TO ROLE ANALYST",
+    ]
+
+    # The account as the first plan left it: the second run has nothing to do
+    conn = FakeConnection({**tables, "SHOW GRANTS TO ROLE ANALYST": [
+        {"privilege": "SELECT", "granted_on": "TABLE", "name": "MARTS.SALES.T1", "grant_option": "false"},
+        {"privilege": "SELECT", "granted_on": "TABLE", "name": "MARTS.SALES.T2", "grant_option": "false"},
+        {"privilege": "SELECT", "granted_on": "VIEW", "name": "MARTS.SALES.V1", "grant_option": "false"},
+    ]})
+    assert plan_sql(tmp_path, conn) == []
+
+    # A table created since is picked up by the ALL grant again
+    tables["SHOW TABLES IN SCHEMA MARTS.SALES"].append({"name": "T3", "schema_name": "SALES"})
+    conn.results.update(tables)
+    assert plan_sql(tmp_path, conn) == ["GRANT SELECT ON ALL TABLES IN SCHEMA MARTS.SALES TO ROLE ANALYST"]
+
+# ------------------------ Account State ------------------------
+
+def test_load_grants_reraises_errors_other_than_missing_role():
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": FakeError("Insufficient privileges to operate on role", 3001)})
+    with pytest.raises(FakeError):
+        load_grants(conn, ["ANALYST"])
+
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": FakeError("Role 'ANALYST' does not exist or not authorized.", 2003)})
+    assert load_grants(conn, ["ANALYST"]) == {}
+
+def test_object_key_keeps_dots_inside_quoted_identifiers():
+    assert object_key('marts."my.schema".orders') == 'MARTS."my.schema".ORDERS'
+    assert object_key('"Marts".PUBLIC') == '"Marts".PUBLIC'
+    assert object_key('"MARTS".public') == "MARTS.PUBLIC"
+
+def test_quoted_names_from_show_match_yaml(tmp_path):
+    write(tmp_path, "grants/analyst.yaml",
+          'grants:\n  - role: ANALYST\n    privilege: USAGE\n    on:\n      object_type: SCHEMA\n      name: \'MARTS."my.schema"\'\n')
+    conn = FakeConnection({"SHOW GRANTS TO ROLE ANALYST": [
+        {"privilege": "USAGE", "granted_on": "SCHEMA", "name": 'MARTS."my.schema"', "grant_option": "false"},
+    ]})
+
+    assert plan_sql(tmp_path, conn) == []
@@ -0,0 +1,50 @@
+import pytest
+from scripts.state_ledger import SnowflakeLedger
+
+class RecordingConnection:
+    # Records each statement; raises `fail` for statements starting with `fail_on`.
+    def __init__(self, rows=(), fail_on=None, fail=None):
+        self.executed = []
+        self.rows = list(rows)
+        self.fail_on, self.fail = fail_on, fail
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                sql = " ".join(sql.split())
+                conn.executed.append(sql)
+                if conn.fail_on and sql.startswith(conn.fail_on):
+                    raise conn.fail
+
+            def fetchall(self):
+                return conn.rows if conn.executed[-1].startswith("SELECT") else []
+
+            def close(self):
+                pass
+        return Cursor()
+
+RECORD = {"file_hash": "abc", "entries": {}, "deleted": {}}
+
+def test_save_is_one_transaction():
+    conn = RecordingConnection()
+    SnowflakeLedger(conn).save({"roles/a.yaml": RECORD}, ["roles/a.yaml", "roles/gone.yaml"])
+
+    assert [sql.split()[0] for sql in conn.executed] == ["BEGIN", "DELETE", "INSERT", "DELETE", "COMMIT"]
+
+def test_failed_save_rolls_back():
+    conn = RecordingConnection(fail_on="INSERT", fail=RuntimeError("network"))
+    with pytest.raises(RuntimeError):
+        SnowflakeLedger(conn).save({"roles/a.yaml": RECORD}, ["roles/a.yaml"])
+
+    assert conn.executed[-1] == "ROLLBACK"
+    assert "COMMIT" not in conn.executed
+
+def test_dry_run_load_runs_no_ddl():
+    conn = RecordingConnection(rows=[("roles/a.yaml", '{"file_hash": "abc"}')])
+    assert SnowflakeLedger(conn, dry_run=True).load() == {"roles/a.yaml": {"file_hash": "abc"}}
+    assert not any(sql.startswith("CREATE") for sql in conn.executed)
+
+    missing = RecordingConnection(fail_on="SELECT", fail=Exception("Table 'IAC_APPLY_LEDGER' does not exist or not authorized."))
+    assert SnowflakeLedger(missing, dry_run=True).load() == {}
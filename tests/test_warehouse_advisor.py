@@ -0,0 +1,33 @@
+import pandas as pd
+from utils.warehouse_advisor import recommend
+
+def metrics(**overrides):
+    row = {"credits_per_day": 10.0, "idle_share": 0.0, "utilisation": 0.1, "queued_share": 0.0,
+           "peak_load_p95": 1.0, "spill_share": 0.0, "remote_spill_gb": 0.0,
+           "mean_exec_seconds": 1.0, "mean_queued_seconds": 0.0}
+    row.update(overrides)
+    return row
+
+def test_large_sizes_step_from_their_own_size():
+    current = pd.DataFrame({"warehouse_size": ["4XLARGE", "X2LARGE"], "auto_suspend": [60, 60]},
+                           index=["BIG_WH", "ALIAS_WH"])
+    usage = pd.DataFrame([metrics(), metrics()], index=["BIG_WH", "ALIAS_WH"])
+
+    rec = recommend(usage, current)
+    assert rec.loc["BIG_WH", "warehouse_size"] == "3XLARGE"
+    assert rec.loc["ALIAS_WH", "warehouse_size"] == "XLARGE"
+    # Underused: one size down halves the rate
+    assert rec.loc["BIG_WH", "expected_credits_per_day"] == 5.0
+
+def test_unknown_sizes_get_no_recommendation():
+    current = pd.DataFrame({"warehouse_size": ["HUGE", "SMALL"], "auto_suspend": [60, 60]}, index=["ODD_WH", "WH"])
+    usage = pd.DataFrame([metrics(), metrics()], index=["ODD_WH", "WH"])
+
+    rec = recommend(usage, current)
+    assert list(rec.index) == ["WH"]
+
+def test_snowpark_optimized_stays_at_medium_or_above():
+    current = pd.DataFrame({"warehouse_size": ["MEDIUM"], "warehouse_type": ["SNOWPARK-OPTIMIZED"], "auto_suspend": [60]},
+                           index=["SP_WH"])
+    rec = recommend(pd.DataFrame([metrics()], index=["SP_WH"]), current)
+    assert rec.loc["SP_WH", "warehouse_size"] == "MEDIUM"
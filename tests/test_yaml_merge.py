@@ -0,0 +1,81 @@
+import re
+import time
+from ruamel.yaml import YAML
+from utils.yaml_merge import merge_entries, merge_yaml
+
+USERS = """\
+# Managed by the IaC Assistant
+users:
+  # the first analyst
+  - name: ALICE
+    email: alice@example.com  # work address
+    comment: Analyst
+
+  - name: "bob"
+    email: bob@example.com
+"""
+
+def load(text):
+    return YAML(typ="safe").load(text)
+
+def comments_aligned(text):
+    # ruamel may re-pad an end-of-line comment it re-emits
+    return re.sub(r" +#", " #", text)
+
+def test_upsert_replaces_the_entry_in_place_ignoring_case():
+    merged = merge_yaml(USERS, "users:\n  - name: alice\n    email: alice@new.example.com\n    comment: Analyst\n")
+
+    assert comments_aligned(merged) == comments_aligned(
+        USERS.replace("alice@example.com", "alice@new.example.com").replace("- name: ALICE", "- name: alice"))
+
+def test_quoted_names_match_and_other_bytes_are_untouched():
+    merged = merge_yaml(USERS, "users:\n  - name: BOB\n    email: bob@example.com\n    disabled: true\n")
+
+    assert merged.startswith(USERS.split('  - name: "bob"')[0])
+    assert load(merged)["users"][1] == {"name": "BOB", "email": "bob@example.com", "disabled": True}
+
+def test_new_entries_are_appended_after_the_last_item():
+    merged = merge_yaml(USERS, "users:\n  - name: CAROL\n    email: carol@example.com\n")
+
+    assert merged == USERS + "  - name: CAROL\n    email: carol@example.com\n"
+
+def test_delete_entries_replace_the_original():
+    merged = merge_yaml(USERS, "users:\n  - name: ALICE\n    action: delete\n")
+
+    assert [u["name"] for u in load(merged)["users"]] == ["ALICE", "bob"]
+    assert load(merged)["users"][0] == {"name": "ALICE", "action": "delete"}
+    assert "# the first analyst" in merged and "# Managed by the IaC Assistant" in merged
+
+def test_comments_on_kept_keys_survive_the_update():
+    merged = merge_yaml(USERS, "users:\n  - name: ALICE\n    email: alice@example.com\n    comment: Lead\n")
+
+    assert "email: alice@example.com # work address" in comments_aligned(merged)
+    assert "comment: Lead\n\n  - name: \"bob\"" in merged
+
+def test_indent_zero_and_flow_style_empty_lists():
+    assert merge_yaml("roles:\n- name: A\n- name: B\n", "roles:\n  - name: b\n    comment: x\n") == \
+        "roles:\n- name: A\n- name: b\n  comment: x\n"
+    assert load(merge_yaml("users: []\n", "users:\n  - name: A\n")) == {"users": [{"name": "A"}]}
+    assert merge_yaml("", "users:\n  - name: A\n") == "users:\n  - name: A\n"
+
+def test_grants_merge_privileges_into_the_matching_group():
+    existing = ("grants:\n"
+                "  - role: ANALYST\n    privileges:\n      - USAGE\n    on:\n      object_type: DATABASE\n      name: MARTS\n"
+                "  - role: ANALYST\n    privilege: USAGE\n    on:\n      object_type: WAREHOUSE\n      name: WH\n")
+    merged = merge_entries(existing, "grants", [
+        {"role": "analyst", "privilege": "MONITOR", "on": {"object_type": "database", "name": "marts"}},
+        {"role": "ANALYST", "privilege": "USAGE", "on": {"object_type": "SCHEMA", "name": "MARTS.PUBLIC"}},
+    ])
+
+    grants = load(merged)["grants"]
+    assert grants[0]["privileges"] == ["USAGE", "MONITOR"]
+    assert grants[1] == {"role": "ANALYST", "privilege": "USAGE", "on": {"object_type": "WAREHOUSE", "name": "WH"}}
+    assert grants[2]["on"] == {"object_type": "SCHEMA", "name": "MARTS.PUBLIC"}
+
+def test_merge_is_linear_in_the_file_size():
+    existing = "users:\n" + "".join(f"  - name: USER_{i:05d}\n    email: u{i}@example.com\n" for i in range(40000))
+    start = time.perf_counter()
+    merged = merge_yaml(existing, "users:\n  - name: user_39999\n    email: new@example.com\n")
+
+    assert time.perf_counter() - start < 2
+    assert merged.endswith("  - name: user_39999\n    email: new@example.com\n")
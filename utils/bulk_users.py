@@ -0,0 +1,146 @@
+import json
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# ------------------------ Columns ------------------------
+
+# Same key order as the single-user form in pages/1_Users.py
+USER_FIELDS = [
+    "name", "comment", "default_namespace", "default_role", "default_secondary_roles",
+    "default_warehouse", "disabled", "display_name", "email", "network_policy", "owner",
+    "rsa_public_key", "type", "login_name",
+]
+PERSON_FIELDS = ["first_name", "last_name", "middle_name", "must_change_password", "password"]
+BOOL_FIELDS = ["disabled", "must_change_password"]
+TEXT_FIELDS = [f for f in USER_FIELDS + PERSON_FIELDS if f not in BOOL_FIELDS]
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+TRUE_VALUES = {"true", "yes", "y", "1"}
+FALSE_VALUES = {"false", "no", "n", "0", ""}
+
+def read_user_file(uploaded_file):
+    # Everything is read as text so validation sees exactly what was typed.
+    name = getattr(uploaded_file, "name", "").lower()
+    if name.endswith(".xlsx"):
+        df = pd.read_excel(uploaded_file, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False, skipinitialspace=True)
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+# ------------------------ Validation ------------------------
+
+# Columns holding names of other objects -> (reference kind, label)
+REFERENCE_FIELDS = {
+    "default_role": ("role", "Default role"),
+    "default_warehouse": ("warehouse", "Default warehouse"),
+    "network_policy": ("network_policy", "Network policy"),
+}
+
+def validate_users(df, existing_users=(), references=None):
+    # Returns (valid_df, errors_df). Every rule is a column-wise mask, so the
+    # cost is a handful of vector passes regardless of row count. Row numbers
+    # in errors_df match the spreadsheet (header is row 1). With a
+    # ReferenceIndex, each distinct referenced name is checked once.
+    df = df.copy()
+    for col in TEXT_FIELDS + BOOL_FIELDS:
+        if col not in df.columns:
+            df[col] = ""
+        df[col] = df[col].fillna("").astype(str).str.strip()
+
+    df["name"] = df["name"].str.upper()
+    df["type"] = df["type"].str.upper().replace("", "PERSON")
+    df["owner"] = df["owner"].replace("", "ACCOUNTADMIN")
+    df["login_name"] = df["login_name"].where(df["login_name"] != "", df["name"])
+    derived = (df["first_name"] + " " + df["last_name"]).str.strip()
+    df["display_name"] = df["display_name"].where(df["display_name"] != "", derived)
+
+    is_person = df["type"] == "PERSON"
+    is_service = df["type"] == "SERVICE"
+    bools = {col: df[col].str.lower() for col in BOOL_FIELDS}
+
+    existing = {str(u).upper() for u in existing_users}
+    rules = [
+        (df["name"] == "", "Name is required."),
+        (df["default_role"] == "", "Default role is required."),
+        (df["default_warehouse"] == "", "Default warehouse is required."),
+        (~(is_person | is_service), "Type must be PERSON or SERVICE."),
+        (is_person & (df["email"] == ""), "Email is required for PERSON users."),
+        ((df["email"] != "") & ~df["email"].str.match(EMAIL_PATTERN), "Email is not a valid address."),
+        (is_person & ((df["first_name"] == "") | (df["last_name"] == "")), "First and last name are required for PERSON users."),
+        (is_person & (df["password"] == ""), "Password is required for PERSON users."),
+        (is_service & (df[["first_name", "last_name", "middle_name", "password"]] != "").any(axis=1),
+         "SERVICE users cannot have a password or first/middle/last name."),
+        ((df["name"] != "") & df["name"].duplicated(keep=False), "Name appears more than once in the file."),
+        (df["name"].isin(existing), "User already exists in Snowflake."),
+    ]
+    rules += [
+        (~bools[col].isin(TRUE_VALUES | FALSE_VALUES), f"{col} must be true or false.")
+        for col in BOOL_FIELDS
+    ]
+    if references is not None:
+        # Message is per row here, so it can name the missing object
+        for col, (kind, label) in REFERENCE_FIELDS.items():
+            missing = references.missing(kind, df[col].unique())
+            rules.append((df[col].isin(missing), label + " `" + df[col] + "` does not exist."))
+
+    masks = np.column_stack([mask.to_numpy(dtype=bool) for mask, _ in rules])
+    bad_rows, bad_rules = np.nonzero(masks)
+    messages = np.empty(len(bad_rows), dtype=object)
+    for i, (_, message) in enumerate(rules):
+        hit = bad_rules == i
+        messages[hit] = message if isinstance(message, str) else message.to_numpy()[bad_rows[hit]]
+    errors = pd.DataFrame({
+        "row": df.index.to_numpy()[bad_rows] + 2,
+        "name": df["name"].to_numpy()[bad_rows],
+        "error": messages,
+    })
+
+    valid = df[~masks.any(axis=1)].copy()
+    for col in BOOL_FIELDS:
+        valid[col] = valid[col].str.lower().isin(TRUE_VALUES)
+    valid["must_change_password"] = valid["must_change_password"] | (
+        bools["must_change_password"][valid.index] == ""
+    )
+    return valid, errors
+
+# ------------------------ YAML Output ------------------------
+
+def users_to_records(valid_df):
+    # Blank optional fields are dropped, and PERSON-only fields only appear
+    # on PERSON users, matching the single-user form output.
+    records = []
+    person_cols = USER_FIELDS + PERSON_FIELDS
+    columns = [valid_df[c].to_numpy(dtype=object) for c in person_cols]
+    for row in zip(*columns):
+        entry = dict(zip(person_cols, row))
+        fields = person_cols if entry["type"] == "PERSON" else USER_FIELDS
+        records.append({k: entry[k] for k in fields if entry[k] != ""})
+    return records
+
+PLAIN_SCALAR = re.compile(r"^[A-Za-z_][A-Za-z0-9_.@/\- ]*(?<! )$")
+RESERVED_SCALARS = {"true", "false", "yes", "no", "on", "off", "y", "n", "null"}
+
+@lru_cache(maxsize=65536)
+def _scalar(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if PLAIN_SCALAR.match(value) and value.lower() not in RESERVED_SCALARS:
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+def users_to_yaml(valid_df):
+    # Emits the same layout as the page's ruamel dumper (mapping=2,
+    # sequence=4, offset=2). Writing the lines directly keeps 100k-row
+    # uploads to a few seconds; the generic emitter takes close to a minute.
+    lines = ["users:"]
+    for record in users_to_records(valid_df):
+        prefix = "  - "
+        for key, value in record.items():
+            lines.append(f"{prefix}{key}: {_scalar(value)}")
+            prefix = "    "
+    if len(lines) == 1:
+        return "users: []\n"
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,218 @@
+import time
+import streamlit as st
+from utils.search import NameIndex
+from utils.references import ReferenceIndex, GRANT_OBJECT_KINDS, quote_ident
+from utils.tracing import span, frame_size
+from utils.session import get_session
+
+# ------------------------ SHOW Projections ------------------------
+# SHOW is served from the metadata layer, so it is fast and reflects objects
+# the moment they are created (ACCOUNT_USAGE lags by up to a few hours).
+# RESULT_SCAN then lets us project and type the columns in SQL.
+
+CATALOG_TTL_SECONDS = 300
+SHOW_PAGE_SIZE = 10000
+
+USER_COLUMNS = """
+    "name" AS NAME, "login_name" AS LOGIN_NAME, "display_name" AS DISPLAY_NAME,
+    "first_name" AS FIRST_NAME, "last_name" AS LAST_NAME, "email" AS EMAIL,
+    "comment" AS COMMENT, "disabled" = 'true' AS DISABLED,
+    "must_change_password" = 'true' AS MUST_CHANGE_PASSWORD,
+    "default_warehouse" AS DEFAULT_WAREHOUSE, "default_namespace" AS DEFAULT_NAMESPACE,
+    "default_role" AS DEFAULT_ROLE, "default_secondary_roles" AS DEFAULT_SECONDARY_ROLES,
+    "owner" AS OWNER, "type" AS TYPE, "created_on" AS CREATED_ON
+"""
+
+ROLE_COLUMNS = """
+    "name" AS NAME, "owner" AS OWNER, "comment" AS COMMENT, "created_on" AS CREATED_ON
+"""
+
+WAREHOUSE_COLUMNS = """
+    "name" AS NAME, UPPER(REPLACE("size", '-', '')) AS WAREHOUSE_SIZE, "type" AS WAREHOUSE_TYPE,
+    "scaling_policy" AS SCALING_POLICY, "auto_suspend" AS AUTO_SUSPEND,
+    "auto_resume" = 'true' AS AUTO_RESUME,
+    "enable_query_acceleration" = 'true' AS ENABLE_QUERY_ACCELERATION,
+    "query_acceleration_max_scale_factor" AS QUERY_ACCELERATION_MAX_SCALE_FACTOR,
+    "min_cluster_count" AS MIN_CLUSTER_COUNT, "max_cluster_count" AS MAX_CLUSTER_COUNT,
+    "resource_monitor" AS RESOURCE_MONITOR, "owner" AS OWNER, "comment" AS COMMENT,
+    "created_on" AS CREATED_ON, "updated_on" AS UPDATED_ON
+"""
+
+WAREHOUSE_PARAMETERS = [
+    "MAX_CONCURRENCY_LEVEL",
+    "STATEMENT_TIMEOUT_IN_SECONDS",
+    "STATEMENT_QUEUED_TIMEOUT_IN_SECONDS",
+]
+
+def _records(df):
+    df.columns = [c.lower() for c in df.columns]
+    df = df.astype(object).where(df.notna(), None)
+    # SHOW reports "null"/empty strings for unset references
+    df = df.replace({"null": None, "": None})
+    return {row["name"]: row for row in df.to_dict("records")}
+
+POLICY_COLUMNS = """
+    "name" AS NAME, "comment" AS COMMENT, "created_on" AS CREATED_ON
+"""
+
+def _scan_sql(query_id: str, columns: str, exclude: str = None):
+    where = f"WHERE \"name\" NOT IN ({exclude})" if exclude else ""
+    return f"""
+        SELECT {columns}
+        FROM TABLE(RESULT_SCAN('{query_id}'))
+        {where}
+        ORDER BY "name"
+    """
+
+def _scan(session, query_id: str, columns: str, exclude: str = None):
+    with span("snowflake.result_scan") as s:
+        df = session.sql(_scan_sql(query_id, columns, exclude)).to_pandas()
+        s["rows"], s["bytes"] = len(df), frame_size(df)
+    return df
+
+def _start_scan(session, show_job, columns: str, exclude: str = None):
+    # Wait for a SHOW and start reading its result set without blocking.
+    show_job.result()
+    return session.sql(_scan_sql(show_job.query_id, columns, exclude)).to_pandas(block=False)
+
+def _finish_scan(scan_job):
+    with span("snowflake.result_scan") as s:
+        df = scan_job.result()
+        s["rows"], s["bytes"] = len(df), frame_size(df)
+    return df
+
+def _more_users(session, first_page):
+    # SHOW USERS caps each page at SHOW_PAGE_SIZE rows; page with FROM '<name>'.
+    frames = [first_page]
+    while len(frames[-1]) >= SHOW_PAGE_SIZE - 1:
+        last = str(frames[-1]["NAME"].iloc[-1]).replace("'", "''")
+        with span("snowflake.show_users"):
+            job = session.sql(f"SHOW USERS LIMIT {SHOW_PAGE_SIZE} FROM '{last}'").collect_nowait()
+            job.result()
+        frames.append(_scan(session, job.query_id, USER_COLUMNS, exclude="'SNOWFLAKE'"))
+    users = {}
+    for df in frames:
+        users.update(_records(df))
+    return users
+
+class Catalog:
+    # Users, roles, warehouses and network policies with their detail
+    # columns, loaded in one batch. List and detail lookups are served from memory.
+
+    def __init__(self, session):
+        self.session = session
+        self.loaded_at = None
+        self.users = {}
+        self.roles = {}
+        self.warehouses = {}
+        self.network_policies = None  # None when the role can't list them
+        self._warehouse_params = {}
+        self.user_index = NameIndex(())
+        self.role_index = NameIndex(())
+        self.warehouse_index = NameIndex(())
+        self.network_policy_index = NameIndex(())
+        self.references = ReferenceIndex(session, {})
+
+    def load(self):
+        # Every SHOW is submitted before any is waited on, and each one's
+        # RESULT_SCAN starts as soon as it returns, so the load takes about
+        # as long as the slowest SHOW + scan rather than the sum of them.
+        session = self.session
+        shows = {
+            "users": (f"SHOW USERS LIMIT {SHOW_PAGE_SIZE}", USER_COLUMNS, "'SNOWFLAKE'"),
+            "roles": ("SHOW ROLES", ROLE_COLUMNS, None),
+            "warehouses": ("SHOW WAREHOUSES", WAREHOUSE_COLUMNS, None),
+        }
+        with span("snowflake.show_all"):
+            jobs = {name: session.sql(sql).collect_nowait() for name, (sql, _, _) in shows.items()}
+            try:
+                policy_job = session.sql("SHOW NETWORK POLICIES").collect_nowait()
+            except Exception:
+                policy_job = None  # listing policies needs a grant many app roles lack
+            scans = {name: _start_scan(session, jobs[name], columns, exclude)
+                     for name, (_, columns, exclude) in shows.items()}
+            try:
+                policy_scan = policy_job and _start_scan(session, policy_job, POLICY_COLUMNS)
+            except Exception:
+                policy_scan = None
+
+        self.users = _more_users(session, _finish_scan(scans["users"]))
+        self.roles = _records(_finish_scan(scans["roles"]))
+        self.warehouses = _records(_finish_scan(scans["warehouses"]))
+        self.network_policies = _records(_finish_scan(policy_scan)) if policy_scan else None
+        self._warehouse_params = {}
+        # Search indexes for the edit pickers, rebuilt with each load
+        self.user_index = NameIndex(self.users)
+        self.role_index = NameIndex(self.roles)
+        self.warehouse_index = NameIndex(self.warehouses)
+        self.network_policy_index = NameIndex(self.network_policies or ())
+        # Name sets for pre-submit checks; objects load on first use
+        self.references = ReferenceIndex(session, {
+            "role": self.roles,
+            "warehouse": self.warehouses,
+            "network_policy": self.network_policies,
+        })
+        self.loaded_at = time.time()
+        return self
+
+    # ── Lists ──
+    def user_names(self):
+        return list(self.users)
+
+    def role_names(self):
+        return list(self.roles)
+
+    def warehouse_names(self):
+        return list(self.warehouses)
+
+    def network_policy_names(self):
+        return None if self.network_policies is None else list(self.network_policies)
+
+    # ── Details ──
+    # Unset columns are dropped so callers can use .get(key, default).
+    def user(self, name: str):
+        return {k: v for k, v in (self.users.get(name) or {}).items() if v is not None}
+
+    def role(self, name: str):
+        return {k: v for k, v in (self.roles.get(name) or {}).items() if v is not None}
+
+    def warehouse(self, name: str):
+        info = self.warehouses.get(name)
+        if not info:
+            return {}
+        # Concurrency/timeout settings are parameters, not SHOW columns; fetch
+        # them the first time a warehouse is opened and keep them.
+        if name not in self._warehouse_params:
+            with span("snowflake.show_parameters") as s:
+                rows = self.session.sql(f"SHOW PARAMETERS IN WAREHOUSE {quote_ident(name)}").collect()
+                s["rows"] = len(rows)
+            # A value that isn't an integer (unset shows as "") is left out,
+            # so the form falls back to its default
+            self._warehouse_params[name] = {
+                r["key"].lower(): int(r["value"]) for r in rows
+                if r["key"] in WAREHOUSE_PARAMETERS and str(r["value"]).strip().lstrip("-").isdigit()
+            }
+        info = {k: v for k, v in info.items() if v is not None}
+        return {**info, **self._warehouse_params[name]}
+
+@st.cache_resource(ttl=CATALOG_TTL_SECONDS, show_spinner="Loading account metadata…")
+def get_catalog():
+    with span("catalog.load"):
+        return Catalog(get_session()).load()
+
+def refresh_catalog():
+    get_catalog.clear()
+
+def check_references(refs):
+    # Shows an error per (where, kind, name) that doesn't exist; False
+    # blocks the PR.
+    errors = get_catalog().references.check(refs)
+    for e in errors:
+        st.error(f"{e['where']}: {e['error']}")
+    return not errors
+
+def object_count(object_type, container):
+    # How many objects of object_type a schema or database holds, from the
+    # catalog's cached names; None where they aren't known.
+    kind = GRANT_OBJECT_KINDS.get(object_type)
+    return get_catalog().references.count(kind, container) if kind else None
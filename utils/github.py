@@ -1,43 +1,238 @@
-from github import Github
-from datetime import datetime
-from snowflake.snowpark.context import get_active_session
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from utils.session import get_session
+from utils.tracing import span
+from utils.rate_limit import governor
 
-def raise_github_pr(filename: str, file_contents: str, token: str, repo_name: str):
-    session = get_active_session()
-    snowflake_user = session.sql("SELECT CURRENT_USER()").collect()[0][0]
+# PyGithub is imported where it is used: pages import this module through
+# utils.jobs, and most reruns never talk to GitHub.
+
+# ------------------------ Client & Metadata Cache ------------------------
+
+_lock = threading.Lock()
+_repos = {}
+_users_lock = threading.Lock()
+_current_users = weakref.WeakKeyDictionary()  # session -> CURRENT_USER(), dropped with the session
+_etag_lock = threading.Lock()
+_etag_cache = OrderedDict()  # (token digest, url, params) -> (etag, headers, data), least recent first
+
+ETAG_CACHE_SIZE = 256
+LIST_PAGE_SIZE = 100  # GitHub's maximum
+# GitHub Enterprise (or a test server) instead of github.com
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+def get_repo(token: str, repo_name: str):
+    # One Github client per token/repo for the life of the process. The client
+    # keeps its HTTP connection alive, and the repo object (default branch,
+    # urls) is fetched once instead of on every submission.
+    key = (token, repo_name)
+    with _lock:
+        repo = _repos.get(key)
+        if repo is None:
+            from github import Github
+            # Pacing and retries are left to the governor, not PyGithub
+            client = Github(token, base_url=GITHUB_API_URL, retry=None,
+                            seconds_between_requests=None, seconds_between_writes=None)
+            limits = governor(token)
+            with span("github.get_repo"):
+                repo = limits.call("github.get_repo", lambda: client.get_repo(repo_name))
+            # Cached responses are keyed per token, so one token's view of a
+            # repo is never served to a caller using another
+            repo.iac_token_id = hashlib.sha256(token.encode()).hexdigest()
+            # Carried by the repo itself, so a job still holding it after
+            # clear_github_cache keeps its governor
+            repo.iac_governor = limits
+            _repos[key] = repo
+    return repo
+
+def _call(repo, operation: str, fn, write: bool = False, idempotent: bool = True):
+    # Runs one GitHub request under the rate-limit governor for repo's token.
+    return repo.iac_governor.call(operation, fn, write=write, idempotent=idempotent,
+                                  requester=repo._requester)
 
-    g = Github(token)
-    repo = g.get_repo(repo_name)
+def get_current_user(session=None):
+    session = session or get_session()
+    with _users_lock:
+        user = _current_users.get(session)
+    if user is None:
+        with span("snowflake.current_user"):
+            user = session.sql("SELECT CURRENT_USER()").collect()[0][0]
+        with _users_lock:
+            _current_users[session] = user
+    return user
 
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    branch_name = f"iac-update-{filename.replace('/', '_').replace('.', '_')}-{timestamp}"
-    commit_message = f"update: {filename}"
+def clear_github_cache():
+    with _lock:
+        _repos.clear()
+    with _users_lock:
+        _current_users.clear()
+    with _etag_lock:
+        _etag_cache.clear()
 
-    default_branch = repo.default_branch
-    source = repo.get_branch(default_branch)
-    repo.create_git_ref(ref=f"refs/heads/{branch_name}", sha=source.commit.sha)
+def _conditional_get(repo, url: str, params: dict = None, unkeyed=()):
+    # GET with If-None-Match. A 304 comes back with an empty body and does not
+    # count against the rate limit; we then serve the cached payload. Params
+    # named in `unkeyed` (a moving cursor) are left out of the cache key, so
+    # each new value replaces the entry instead of adding one; the ETag still
+    # decides whether the cached payload is the answer.
+    key = (repo.iac_token_id, url, tuple(sorted((k, v) for k, v in (params or {}).items() if k not in unkeyed)))
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+        if cached:
+            _etag_cache.move_to_end(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    with span("github.get") as s:
+        resp_headers, data = _call(repo, "github.get", lambda: repo._requester.requestJsonAndCheck(
+            "GET", url, parameters=params, headers=headers))
+        s["cached"] = data is None and cached is not None
+    if data is None and cached:
+        repo.iac_governor.refund()
+        return cached[1], cached[2]
+    etag = resp_headers.get("etag")
+    if etag:
+        with _etag_lock:
+            _etag_cache[key] = (etag, resp_headers, data)
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return resp_headers, data
 
+def get_branch(repo, branch: str):
+    from github.Branch import Branch
+    headers, data = _conditional_get(repo, f"{repo.url}/branches/{branch}")
+    return Branch(repo._requester, headers, data, completed=True)
+
+def get_file_contents(repo, path: str, ref: str):
+    # Returns the ContentFile at ref, or None if the path doesn't exist yet.
+    from github.ContentFile import ContentFile
     try:
-        contents = repo.get_contents(filename, ref=default_branch)
-        repo.update_file(
-            path=filename,
-            message=commit_message,
-            content=file_contents,
-            sha=contents.sha,
-            branch=branch_name,
-        )
-    except Exception:
-        repo.create_file(
-            path=filename,
-            message=f"add: {filename}",
-            content=file_contents,
-            branch=branch_name,
-        )
-
-    pr = repo.create_pull(
-        title=f"[IaC] Update: {filename}",
-        body=f"Generated by Snowflake user: `{snowflake_user}` via the IaC Assistant.",
-        head=branch_name,
-        base=default_branch,
-    )
-    return pr.html_url
+        headers, data = _conditional_get(repo, f"{repo.url}/contents/{path}", {"ref": ref})
+    except Exception as e:
+        if getattr(e, "status", None) == 404:
+            return None
+        raise
+    return ContentFile(repo._requester, headers, data, completed=True)
+
+# ------------------------ Backend ------------------------
+# The GitHub implementation of the backend interface in utils.vcs. Files go
+# into one tree/commit via the Git Data API, so the number of round trips
+# is the same for one file or a hundred; change requests are pull requests.
+
+class GitHubBackend:
+    name = "github"
+
+    def __init__(self, token: str, repo_name: str):
+        self.repo = get_repo(token, repo_name)
+        self.default_branch = self.repo.default_branch
+
+    def head(self, branch: str):
+        return get_branch(self.repo, branch).commit.commit
+
+    def read_file(self, path: str, ref: str):
+        current = get_file_contents(self.repo, path, ref)
+        return None if current is None else current.decoded_content.decode("utf-8")
+
+    def commit(self, files: dict, base, message: str):
+        # files maps repo path -> new contents; a value of None deletes the path.
+        from github import InputGitTreeElement
+        repo = self.repo
+        paths = sorted(files)
+        tree_elements = [
+            InputGitTreeElement(path=p, mode="100644", type="blob", content=files[p])
+            if files[p] is not None
+            else InputGitTreeElement(path=p, mode="100644", type="blob", sha=None)
+            for p in paths
+        ]
+        with span("github.create_tree") as s:
+            # Git objects are content-addressed, so creating one twice is harmless
+            tree = _call(repo, "github.create_tree", lambda: repo.create_git_tree(tree_elements, base_tree=base.tree),
+                         write=True)
+            s["rows"], s["bytes"] = len(paths), sum(len(c) for c in files.values() if c)
+        with span("github.create_commit"):
+            return _call(repo, "github.create_commit", lambda: repo.create_git_commit(message, tree, [base]),
+                         write=True)
+
+    def create_branch(self, branch: str, commit, replace: bool = False):
+        from github import GithubException
+        repo = self.repo
+        try:
+            with span("github.create_ref"):
+                _call(repo, "github.create_ref", lambda: repo.create_git_ref(ref=f"refs/heads/{branch}", sha=commit.sha),
+                      write=True, idempotent=False)
+        except GithubException as e:
+            if not replace or e.status != 422:
+                raise
+            self.move_branch(branch, commit, force=True)
+
+    def move_branch(self, branch: str, commit, force: bool = False):
+        repo = self.repo
+        with span("github.update_ref"):
+            _call(repo, "github.update_ref", lambda: repo._requester.requestJsonAndCheck(
+                "PATCH", f"{repo.url}/git/refs/heads/{branch}", input={"sha": commit.sha, "force": force}
+            ), write=True)
+
+    def find_change(self, branch: str):
+        # The open PR from branch, or None
+        owner = self.repo.full_name.split("/")[0]
+        _, pulls = _conditional_get(self.repo, f"{self.repo.url}/pulls", {"state": "open", "head": f"{owner}:{branch}"})
+        return pulls[0] if pulls else None
+
+    def change_is_open(self, change) -> bool:
+        _, current = _conditional_get(self.repo, change["url"])
+        return current["state"] == "open"
+
+    def open_change(self, branch: str, title: str, body: str) -> str:
+        repo = self.repo
+        with span("github.create_pull"):
+            pr = _call(repo, "github.create_pull", lambda: repo.create_pull(
+                title=title,
+                body=body,
+                head=branch,
+                base=self.default_branch,
+            ), write=True, idempotent=False)
+        return pr.html_url
+
+    def update_change(self, change, body: str):
+        repo = self.repo
+        with span("github.update_pull"):
+            _call(repo, "github.update_pull", lambda: repo._requester.requestJsonAndCheck(
+                "PATCH", change["url"], input={"body": body}), write=True)
+
+    def list_changes(self, since: str = None):
+        # Pull requests updated at or after since, oldest first. The issues
+        # endpoint is the one with a `since` filter, and it lists PRs too;
+        # pages come back as 304s (free) while nothing has changed.
+        params = {"state": "all", "sort": "updated", "direction": "asc", "per_page": LIST_PAGE_SIZE}
+        if since:
+            params["since"] = since
+        page = 1
+        while True:
+            _, items = _conditional_get(self.repo, f"{self.repo.url}/issues", {**params, "page": page}, unkeyed=("since",))
+            for item in items:
+                pull = item.get("pull_request")
+                if pull:
+                    yield {
+                        "number": item["number"],
+                        "title": item["title"],
+                        "body": item.get("body") or "",
+                        "state": "merged" if pull.get("merged_at") else item["state"],
+                        "created_at": item["created_at"],
+                        "updated_at": item["updated_at"],
+                        "url": item["html_url"],
+                    }
+            if len(items) < LIST_PAGE_SIZE:
+                return
+            page += 1
+
+# ------------------------ Pull Requests ------------------------
+# Kept for callers of the original API; the flows live in utils.vcs.
+
+def raise_github_pr(filename: str, file_contents: str, token: str, repo_name: str):
+    return raise_github_pr_multi({filename: file_contents}, token, repo_name)
+
+def raise_github_pr_multi(files: dict, token: str, repo_name: str, title: str = None):
+    from utils.vcs import raise_change
+    return raise_change(files, token, repo_name, title=title)
@@ -0,0 +1,52 @@
+# Grant entries in the repo YAML come in two shapes:
+#   flat:    {role, privilege, on: {object_type, name}, with_grant_option}
+#   grouped: {role, privileges: [p1, p2, ...], on: {...}, with_grant_option}
+# The pages write the grouped form; apply expands either form back to flat.
+
+# Bulk grants name a container instead of one object, in Snowflake's words:
+#   on: {object_type: ALL TABLES IN SCHEMA, name: DB.SCH}      existing tables
+#   on: {object_type: FUTURE VIEWS IN DATABASE, name: DB}      ones created later
+# so they key, merge and render (GRANT ... ON <object_type> <name>) exactly
+# like single-object grants.
+
+BULK_SCOPES = ("ALL", "FUTURE")
+# object type -> plural -> containers it can be granted in
+BULK_OBJECT_TYPES = {
+    "TABLE": ("TABLES", ("SCHEMA", "DATABASE")),
+    "VIEW": ("VIEWS", ("SCHEMA", "DATABASE")),
+    "MATERIALIZED VIEW": ("MATERIALIZED VIEWS", ("SCHEMA", "DATABASE")),
+    "SCHEMA": ("SCHEMAS", ("DATABASE",)),
+    "STAGE": ("STAGES", ("SCHEMA", "DATABASE")),
+    "SEQUENCE": ("SEQUENCES", ("SCHEMA", "DATABASE")),
+    "FUNCTION": ("FUNCTIONS", ("SCHEMA", "DATABASE")),
+    "PROCEDURE": ("PROCEDURES", ("SCHEMA", "DATABASE")),
+}
+_PLURALS = {plural: object_type for object_type, (plural, _) in BULK_OBJECT_TYPES.items()}
+
+def bulk_object_type(scope: str, object_type: str, container: str) -> str:
+    # ("FUTURE", "TABLE", "SCHEMA") -> "FUTURE TABLES IN SCHEMA"
+    return f"{scope} {BULK_OBJECT_TYPES[object_type][0]} IN {container}"
+
+def parse_bulk(object_type):
+    # "ALL TABLES IN SCHEMA" -> ("ALL", "TABLE", "SCHEMA"); None for a
+    # single-object grant.
+    words = str(object_type).strip().upper().split()
+    if len(words) < 4 or words[0] not in BULK_SCOPES or words[-2] != "IN":
+        return None
+    single = _PLURALS.get(" ".join(words[1:-2]))
+    if single is None or words[-1] not in BULK_OBJECT_TYPES[single][1]:
+        return None
+    return words[0], single, words[-1]
+
+def expand_grant_entries(entries):
+    # Grouped entries become one flat entry per privilege; everything else on
+    # the entry (action, with_grant_option, ...) is carried over unchanged.
+    flat = []
+    for entry in entries or []:
+        if "privileges" not in entry:
+            flat.append(entry)
+            continue
+        base = {k: v for k, v in entry.items() if k != "privileges"}
+        for privilege in entry["privileges"]:
+            flat.append({**base, "privilege": privilege})
+    return flat
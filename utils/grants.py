@@ -0,0 +1,90 @@
+# Grant entries in the repo YAML come in two shapes:
+#   flat:    {role, privilege, on: {object_type, name}, with_grant_option}
+#   grouped: {role, privileges: [p1, p2, ...], on: {...}, with_grant_option}
+# The pages write the grouped form; apply expands either form back to flat.
+
+# The format itself (bulk object types, expansion) is shared with the apply
+# scripts in utils.grant_entries, which imports nothing beyond the stdlib.
+from utils.grant_entries import (
+    BULK_SCOPES, BULK_OBJECT_TYPES, bulk_object_type, parse_bulk, expand_grant_entries,
+)
+
+def _norm(value) -> str:
+    value = " ".join(str(value).split())
+    return value if '"' in value else value.upper()
+
+def grant_id(role, privilege, object_type, name):
+    return (_norm(role), _norm(privilege), _norm(object_type), _norm(name))
+
+class GrantSet:
+    # Pending grants keyed on (role, privilege, object_type, name), so adding
+    # a duplicate is a dict lookup. Privileges on the same role/object/option
+    # are folded into one grouped entry.
+
+    def __init__(self, entries=()):
+        self._ids = {}  # grant id -> with_grant_option
+        self._groups = {}
+        for entry in expand_grant_entries(entries):
+            on = entry.get("on") or {}
+            self.add(entry["role"], entry["privilege"], on.get("object_type"), on.get("name"),
+                     entry.get("with_grant_option", False))
+
+    def add(self, role, privilege, object_type, name, with_grant_option=False) -> bool:
+        # Re-adding a grant with a different with_grant_option replaces the
+        # option; an identical grant is rejected.
+        gid = grant_id(role, privilege, object_type, name)
+        option = bool(with_grant_option)
+        if gid in self._ids:
+            if self._ids[gid] == option:
+                return False
+            old_key = (gid[0], gid[2], gid[3], self._ids[gid])
+            self._groups[old_key].remove(gid[1])
+            if not self._groups[old_key]:
+                del self._groups[old_key]
+        self._ids[gid] = option
+        group_key = (gid[0], gid[2], gid[3], option)
+        self._groups.setdefault(group_key, []).append(gid[1])
+        return True
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def __contains__(self, gid):
+        return grant_id(*gid) in self._ids
+
+    def entries(self):
+        # Grouped form, in insertion order, for the YAML files.
+        return [
+            {
+                "role": role,
+                "privileges": list(privileges),
+                "on": {"object_type": object_type, "name": name},
+                "with_grant_option": option,
+            }
+            for (role, object_type, name, option), privileges in self._groups.items()
+        ]
+
+    def expanded(self):
+        return expand_grant_entries(self.entries())
+
+def grant_group_key(entry):
+    # Entries with the same key merge into one grouped entry.
+    on = entry.get("on") or {}
+    return (_norm(entry.get("role")), _norm(on.get("object_type")), _norm(on.get("name")),
+            bool(entry.get("with_grant_option", False)))
+
+def combine_grant_entries(old, new):
+    # Union of the privileges on two entries with the same group key, keeping
+    # the order they were first seen in.
+    privileges = []
+    for entry in (old, new):
+        for p in entry.get("privileges") or [entry.get("privilege")]:
+            if p is not None and _norm(p) not in privileges:
+                privileges.append(_norm(p))
+    merged = {k: v for k, v in new.items() if k not in ("privilege", "privileges")}
+    merged.update({k: old[k] for k in ("role", "on") if k in old})
+    merged["privileges"] = privileges
+    return merged
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import pandas as pd
+from utils.jobs import object_type
+from utils.tracing import span
+
+# ------------------------ Change History ------------------------
+# Change requests raised by the app (titles starting "[IaC] "), kept in a
+# JSON file per repo and topped up from the backend's list_changes with the
+# newest updated_at seen as the cursor. Opening the history page therefore
+# costs one delta request (a 304 when nothing changed) rather than a listing
+# of every PR, and at most one every HISTORY_REFRESH_SECONDS.
+
+HISTORY_CACHE_DIR = os.getenv("IAC_HISTORY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "iac-assistant"))
+HISTORY_REFRESH_SECONDS = 30
+TITLE_PREFIX = "[IaC] "
+HISTORY_FORMAT = 2  # bumped when records change shape; older caches are rebuilt
+
+_USER = re.compile(r"Snowflake user: `([^`]+)`")
+_SUBMITTERS = re.compile(r"^Submitted by Snowflake users: (.+)$", re.M)
+_FILE = re.compile(r"^- `([^`]+)`$", re.M)
+_OBJECTS = re.compile(r"^Objects: (.+)$", re.M)
+_PENDING = re.compile(r"^\[IaC\] Pending (\S+) changes$")
+
+_lock = threading.Lock()  # guards _histories and the records in each history
+_histories = {}
+
+def parse_change(change: dict) -> dict:
+    # Backend change dict -> history record: who submitted it and which
+    # object types, objects and files it touched, as far as the title and
+    # body (written by utils.vcs) say. Rolling PR bodies list every
+    # submitter and object, and are rewritten on each push.
+    title, body = change["title"], change["body"] or ""
+    files = _FILE.findall(body)
+    if not files and title.startswith(f"{TITLE_PREFIX}Update: ") and not title.endswith(" files"):
+        files = [title[len(f"{TITLE_PREFIX}Update: "):]]
+    kinds = sorted({object_type(f) for f in files})
+    pending = _PENDING.match(title)
+    if pending and not kinds:
+        kinds = [pending.group(1)]
+    objects = _OBJECTS.search(body)
+    submitters = _SUBMITTERS.search(body)
+    if submitters:
+        users = re.findall(r"`([^`]+)`", submitters.group(1))
+    else:
+        users = _USER.findall(body)[:1]
+    return {
+        "number": change["number"],
+        "title": title,
+        "state": change["state"],
+        "users": users,
+        "object_types": kinds,
+        "objects": re.findall(r"`([^`]+)`", objects.group(1)) if objects else [],
+        "files": files,
+        "created_at": change["created_at"],
+        "updated_at": change["updated_at"],
+        "url": change["url"],
+    }
+
+def _cache_file(repo_name: str) -> str:
+    digest = hashlib.sha256(repo_name.encode()).hexdigest()[:12]
+    return os.path.join(HISTORY_CACHE_DIR, f"history-{digest}.json")
+
+def _load(repo_name: str) -> dict:
+    try:
+        with open(_cache_file(repo_name), encoding="utf-8") as f:
+            history = json.load(f)
+        if history.get("repo") == repo_name and history.get("format") == HISTORY_FORMAT:
+            return history
+    except (OSError, ValueError):
+        pass
+    return {"repo": repo_name, "format": HISTORY_FORMAT, "cursor": None, "changes": {}}
+
+def _save(history: dict):
+    path = _cache_file(history["repo"])
+    try:
+        os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({k: v for k, v in history.items() if not k.startswith("_")}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # read-only filesystem: the history is rebuilt once per process
+
+def _history(repo_name: str) -> dict:
+    with _lock:
+        history = _histories.get(repo_name)
+        if history is None:
+            history = _histories[repo_name] = _load(repo_name)
+            history["_refreshed_at"] = 0.0
+            history["_refreshing"] = threading.Lock()
+        return history
+
+def refresh_history(token: str, repo_name: str, force: bool = False) -> dict:
+    # The repo's history, fetching changes since the cursor if it was last
+    # refreshed more than HISTORY_REFRESH_SECONDS ago (or force). One session
+    # per repo talks to the backend at a time; the others carry on with what
+    # is already loaded rather than queueing behind it, unless there is
+    # nothing loaded yet.
+    from utils.vcs import get_backend
+    history = _history(repo_name)
+    def fresh():
+        return not force and time.time() - history["_refreshed_at"] < HISTORY_REFRESH_SECONDS
+    if fresh():
+        return history
+    refreshing = history["_refreshing"]
+    if not refreshing.acquire(blocking=history["cursor"] is None):
+        return history
+    try:
+        if not fresh():
+            _refresh(history, get_backend(token, repo_name))
+    finally:
+        refreshing.release()
+    return history
+
+def _refresh(history: dict, backend):
+    # The listing runs without _lock held; only merging the records takes it.
+    with span("vcs.list_changes") as s:
+        cursor, seen, records = history["cursor"], 0, []
+        for change in backend.list_changes(since=cursor):
+            seen += 1
+            cursor = max(cursor or "", change["updated_at"])
+            if change["title"].startswith(TITLE_PREFIX):
+                records.append(parse_change(change))
+        s["rows"] = seen
+    with _lock:
+        updated = 0
+        for record in records:
+            if history["changes"].get(str(record["number"])) != record:
+                history["changes"][str(record["number"])] = record
+                updated += 1
+        history["_refreshed_at"] = time.time()
+        if updated or cursor != history["cursor"]:
+            history["cursor"] = cursor
+            history.pop("_frame", None)
+            _save(history)
+
+def history_frame(history: dict) -> pd.DataFrame:
+    # One row per change request, newest first; built once per change to the
+    # history rather than on every rerun.
+    with _lock:
+        frame = history.get("_frame")
+        if frame is None:
+            columns = ["number", "title", "state", "users", "object_types", "objects", "files",
+                       "created_at", "updated_at", "url"]
+            frame = pd.DataFrame(list(history["changes"].values()), columns=columns)
+            frame["created_at"] = pd.to_datetime(frame["created_at"], utc=True)
+            frame["updated_at"] = pd.to_datetime(frame["updated_at"], utc=True)
+            # Lower-cased names (and file stems, for bodies that predate the
+            # Objects line) to match the object filter against
+            frame["search"] = [
+                " ".join(list(objects) + [os.path.basename(f).rsplit(".", 1)[0] for f in files]).lower()
+                for objects, files in zip(frame["objects"], frame["files"])
+            ]
+            frame = frame.sort_values("created_at", ascending=False, ignore_index=True)
+            history["_frame"] = frame
+        return frame
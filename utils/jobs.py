@@ -0,0 +1,226 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from utils.github import get_current_user
+from utils.vcs import raise_change, raise_rolling_change
+from utils.tracing import span
+
+# ------------------------ Job Queue ------------------------
+
+MAX_WORKERS = 4
+
+# Seconds to hold submissions before raising them as one batch on the rolling
+# PR for their object type (see raise_rolling_change). 0 gives every submission
+# its own PR. Pending batches live in this process: a normal shutdown
+# (Ctrl-C, SIGTERM, redeploy) flushes them first, but a process that is killed
+# outright loses up to this many seconds of batched submissions.
+PR_BATCH_WINDOW_SECONDS = float(os.getenv("IAC_PR_BATCH_WINDOW_SECONDS", "0"))
+
+# A settled job still absorbs identical submissions for this long (a double
+# click landing after a fast PR), then the same change can be raised again.
+DEDUPE_SECONDS = 10
+# Finished jobs are kept for status display for this long, and at most
+# MAX_FINISHED_JOBS of them.
+JOB_RETENTION_SECONDS = 3600
+MAX_FINISHED_JOBS = 500
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="iac-pr")
+_lock = threading.Lock()
+_jobs = {}
+_jobs_by_key = {}
+_batches = {}
+_batch_locks = {}
+
+def _job_key(files: dict, repo_name: str, title: str):
+    payload = json.dumps([repo_name, title, sorted(files.items())], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _reusable(job: dict) -> bool:
+    if job["status"] == "error":
+        return False
+    finished_at = job.get("finished_at")
+    return finished_at is None or time.time() - finished_at < DEDUPE_SECONDS
+
+def _prune():
+    # Caller holds _lock. Forget finished jobs past their retention, oldest
+    # first beyond MAX_FINISHED_JOBS, along with their dedupe entries.
+    finished = sorted((job["finished_at"], job_id) for job_id, job in _jobs.items() if job.get("finished_at"))
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    excess = len(finished) - MAX_FINISHED_JOBS
+    for i, (finished_at, job_id) in enumerate(finished):
+        if finished_at < cutoff or i < excess:
+            del _jobs[job_id]
+    for key, job_id in list(_jobs_by_key.items()):
+        job = _jobs.get(job_id)
+        if job is None or not _reusable(job):
+            del _jobs_by_key[key]
+
+def _run(job_id: str, files: dict, token: str, repo_name: str, title: str):
+    job = _jobs[job_id]
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    try:
+        with span("github.raise_pr") as s:
+            s["rows"] = len(files)
+            job["pr_url"] = raise_change(files, token, repo_name, title=title)
+        job["status"] = "done"
+    except Exception as e:
+        job["error"] = str(e)
+        job["status"] = "error"
+    job["finished_at"] = time.time()
+
+def submit_pr(files: dict, token: str, repo_name: str, title: str = None, label: str = None):
+    # Queue a PR and return its job id straight away. Submitting the same
+    # files again (double-click, rerun mid-submit) returns the existing job
+    # while it is pending or within DEDUPE_SECONDS of finishing; a failed job
+    # is retried and an older one raised again. With a batching
+    # window, files of a single object type join that type's open batch.
+    key = _job_key(files, repo_name, title)
+    kinds = {object_type(path) for path in files}
+    batched = PR_BATCH_WINDOW_SECONDS > 0 and len(kinds) == 1 and title is None
+    # Resolve the Snowflake user on the script thread; workers reuse the cached value.
+    get_current_user()
+    with _lock:
+        _prune()
+        existing = _jobs_by_key.get(key)
+        if existing:
+            return existing
+        job_id = uuid.uuid4().hex[:12]
+        _jobs[job_id] = {
+            "id": job_id,
+            "label": label or ", ".join(sorted(files)),
+            "status": "queued",
+            "pr_url": None,
+            "error": None,
+            "queued_at": time.time(),
+        }
+        _jobs_by_key[key] = job_id
+        if batched:
+            _add_to_batch(job_id, files, token, repo_name, kinds.pop())
+            return job_id
+    _executor.submit(_run, job_id, files, token, repo_name, title)
+    return job_id
+
+def get_job(job_id: str):
+    return _jobs.get(job_id)
+
+# ------------------------ Batching ------------------------
+
+def object_type(path: str) -> str:
+    # "users.yaml" -> "users", "grants/analyst_select.yaml" -> "grants"
+    return path.split("/")[0].rsplit(".", 1)[0]
+
+def _add_to_batch(job_id: str, files: dict, token: str, repo_name: str, kind: str):
+    # Caller holds _lock. The first change for a type opens its batch and
+    # starts the window; later ones are upserted into the pending files.
+    from utils.yaml_merge import merge_yaml
+    key = (repo_name, kind)
+    batch = _batches.get(key)
+    if batch is None:
+        batch = {"kind": kind, "repo_name": repo_name, "files": {}, "jobs": [],
+                 "flush_at": time.time() + PR_BATCH_WINDOW_SECONDS}
+        _batches[key] = batch
+        timer = threading.Timer(PR_BATCH_WINDOW_SECONDS, _flush, (key,))
+        timer.daemon = True
+        timer.start()
+    for path, contents in files.items():
+        pending = batch["files"].get(path)
+        if pending is not None and contents is not None and path.endswith((".yaml", ".yml")):
+            contents = merge_yaml(pending, contents)
+        batch["files"][path] = contents
+    batch["token"] = token
+    batch["jobs"].append(job_id)
+    _jobs[job_id].update(status="batched", flush_at=batch["flush_at"])
+
+def _flush(key):
+    with _lock:
+        batch = _batches.pop(key, None)
+    if batch:
+        try:
+            _executor.submit(_run_batch, batch)
+        except RuntimeError:
+            _run_batch(batch)  # executor already shut down: exiting
+
+@atexit.register
+def flush_pending_batches():
+    # Raise every open batch now rather than dropping it with the process.
+    with _lock:
+        keys = list(_batches)
+    for key in keys:
+        with _lock:
+            batch = _batches.pop(key, None)
+        if batch:
+            _run_batch(batch)
+
+def _run_batch(batch: dict):
+    # One flush per type at a time, so pushes to a rolling branch never race.
+    key = (batch["repo_name"], batch["kind"])
+    with _lock:
+        batch_lock = _batch_locks.setdefault(key, threading.Lock())
+    jobs = [_jobs[job_id] for job_id in batch["jobs"]]
+    with batch_lock:
+        for job in jobs:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            with span("github.raise_pr") as s:
+                s["rows"] = len(batch["files"])
+                pr_url = raise_rolling_change(batch["files"], batch["token"], batch["repo_name"], batch["kind"],
+                                          changes=len(jobs))
+            for job in jobs:
+                job.update(pr_url=pr_url, status="done")
+        except Exception as e:
+            for job in jobs:
+                job.update(error=str(e), status="error")
+    for job in jobs:
+        job["finished_at"] = time.time()
+
+# ------------------------ Status Display ------------------------
+
+PENDING_STATUSES = ("queued", "batched", "running")
+
+def track_job(state_key: str, job_id: str):
+    jobs = st.session_state.setdefault(state_key, [])
+    if job_id not in jobs:
+        jobs.append(job_id)
+
+def _render_jobs(state_key: str):
+    for job_id in reversed(st.session_state.get(state_key, [])):
+        job = get_job(job_id)
+        if not job:
+            continue
+        if job["status"] == "queued":
+            st.info(f"`{job['label']}` — queued")
+        elif job["status"] == "batched":
+            wait = max(job["flush_at"] - time.time(), 0)
+            st.info(f"`{job['label']}` — batched, added to the pending PR in {wait:.0f}s")
+        elif job["status"] == "running":
+            st.info(f"`{job['label']}` — raising PR…")
+        elif job["status"] == "done":
+            done = "added to the pending PR" if "flush_at" in job else "PR created"
+            st.success(f"`{job['label']}` — {done}: [View PR]({job['pr_url']})")
+        else:
+            st.error(f"`{job['label']}` — Failed to raise PR: {job['error']}")
+
+def render_pr_jobs(state_key: str):
+    job_ids = st.session_state.get(state_key, [])
+    if not job_ids:
+        return
+    pending = any(get_job(j) and get_job(j)["status"] in PENDING_STATUSES for j in job_ids)
+
+    @st.fragment(run_every=2 if pending else None)
+    def _status():
+        _render_jobs(state_key)
+        still_pending = any(get_job(j) and get_job(j)["status"] in PENDING_STATUSES for j in job_ids)
+        if pending and not still_pending:
+            # Drop the auto-refresh once everything has settled.
+            st.rerun()
+
+    st.markdown('<h3 style="text-align: center;">Submissions</h3>', unsafe_allow_html=True)
+    _status()
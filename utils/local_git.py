@@ -0,0 +1,196 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from utils.tracing import span
+
+# ------------------------ Local Git Backend ------------------------
+# The utils.vcs backend for a local bare or working repository, through the
+# git CLI. Commits are built with plumbing in a temporary index, so neither
+# the working tree nor the repository's own index is touched and a checkout
+# can be in use while the app writes to it.
+#
+# Change requests are records in <git dir>/iac-changes.json, one per branch.
+# A record is open until its branch has been merged into the default branch
+# (or its state is edited to anything but "open").
+
+EMPTY_SHA = "0" * 40
+
+def _iso(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+# Used only when neither the environment nor the repo config sets an identity
+IDENTITY = {"name": "IaC Assistant", "email": "iac-assistant@localhost"}
+
+class LocalGitBackend:
+    name = "local"
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._env = None
+        self.git_dir = self._git("rev-parse", "--absolute-git-dir").strip()
+        self.default_branch = self._git("symbolic-ref", "--short", "HEAD").strip()
+        self._changes_file = os.path.join(self.git_dir, "iac-changes.json")
+        self._lock = threading.Lock()
+        self._env = dict(os.environ)
+        for role in ("AUTHOR", "COMMITTER"):
+            for key, value in IDENTITY.items():
+                if not self._env.get(f"GIT_{role}_{key.upper()}") and not self._config(f"user.{key}"):
+                    self._env[f"GIT_{role}_{key.upper()}"] = value
+
+    def _run(self, *args, input: str = None, env: dict = None):
+        return subprocess.run(["git", "-C", self.path, *args], input=input, capture_output=True, text=True,
+                              env=env or self._env)
+
+    def _git(self, *args, input: str = None, env: dict = None) -> str:
+        result = self._run(*args, input=input, env=env)
+        if result.returncode:
+            raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+    def _config(self, key: str) -> str:
+        return self._run("config", "--get", key).stdout.strip()
+
+    def head(self, branch: str):
+        result = self._run("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}^{{commit}}")
+        if result.returncode:
+            if branch == self.default_branch:
+                return SimpleNamespace(sha=None)  # empty repository: the first commit has no parent
+            raise RuntimeError(f"Branch `{branch}` does not exist in {self.path}.")
+        return SimpleNamespace(sha=result.stdout.strip())
+
+    def read_file(self, path: str, ref: str):
+        if ref is None:
+            return None
+        with span("git.read_file") as s:
+            result = self._run("cat-file", "blob", f"{ref}:{path}")
+            s["bytes"] = len(result.stdout)
+        return None if result.returncode else result.stdout
+
+    def commit(self, files: dict, base, message: str):
+        # files maps repo path -> new contents; a value of None deletes the path.
+        with span("git.commit") as s, tempfile.TemporaryDirectory() as tmp:
+            env = {**self._env, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+            if base.sha:
+                self._git("read-tree", base.sha, env=env)
+            else:
+                self._git("read-tree", "--empty", env=env)
+
+            paths = sorted(files)
+            written = [p for p in paths if files[p] is not None]
+            blobs = []
+            if written:
+                sources = []
+                for i, path in enumerate(written):
+                    source = os.path.join(tmp, f"blob{i}")
+                    with open(source, "w", encoding="utf-8", newline="") as f:
+                        f.write(files[path])
+                    sources.append(source)
+                blobs = self._git("hash-object", "-w", "--no-filters", "--stdin-paths",
+                                  input="\n".join(sources) + "\n").split()
+            blob_of = dict(zip(written, blobs))
+            index_info = "".join(
+                f"100644 {blob_of[p]}\t{p}\n" if p in blob_of else f"0 {EMPTY_SHA}\t{p}\n"
+                for p in paths
+            )
+            self._git("update-index", "--index-info", input=index_info, env=env)
+            tree = self._git("write-tree", env=env).strip()
+            parents = ["-p", base.sha] if base.sha else []
+            sha = self._git("commit-tree", tree, *parents, "-F", "-", input=message, env=env).strip()
+            s["rows"], s["bytes"] = len(paths), sum(len(c) for c in files.values() if c)
+        return SimpleNamespace(sha=sha)
+
+    def create_branch(self, branch: str, commit, replace: bool = False):
+        # Without replace, fails if the branch already exists.
+        with span("git.update_ref"):
+            self._git("update-ref", f"refs/heads/{branch}", commit.sha, *([] if replace else [EMPTY_SHA]))
+
+    def move_branch(self, branch: str, commit, force: bool = False):
+        current = self.head(branch).sha
+        if not force and self._run("merge-base", "--is-ancestor", current, commit.sha).returncode:
+            raise RuntimeError(f"Moving `{branch}` to {commit.sha[:8]} is not a fast-forward.")
+        with span("git.update_ref"):
+            # Compare-and-swap, so a concurrent push is not overwritten
+            self._git("update-ref", f"refs/heads/{branch}", commit.sha, current)
+
+    def _load_changes(self) -> dict:
+        try:
+            with open(self._changes_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_changes(self, changes: dict):
+        tmp = f"{self._changes_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(changes, f, indent=2)
+        os.replace(tmp, self._changes_file)
+
+    def _is_merged(self, branch: str) -> bool:
+        head = self._run("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}").stdout.strip()
+        return not head or not self._run("merge-base", "--is-ancestor", head, f"refs/heads/{self.default_branch}").returncode
+
+    def find_change(self, branch: str):
+        # The open change request from branch, or None
+        with self._lock:
+            changes = self._load_changes()
+            change = changes.get(branch)
+            if not change or change["state"] != "open":
+                return None
+            if self._is_merged(branch):
+                change.update(state="merged", updated_at=time.time())
+                self._save_changes(changes)
+                return None
+            return change
+
+    def change_is_open(self, change) -> bool:
+        return self.find_change(change["branch"]) is not None
+
+    def open_change(self, branch: str, title: str, body: str) -> str:
+        with self._lock:
+            changes = self._load_changes()
+            number = max((c["number"] for c in changes.values()), default=0) + 1
+            changes[branch] = {
+                "number": number,
+                "branch": branch,
+                "base": self.default_branch,
+                "title": title,
+                "body": body,
+                "state": "open",
+                "created_at": time.time(),
+                "updated_at": time.time(),
+                "html_url": f"file://{self.path}#{branch}",
+            }
+            self._save_changes(changes)
+        return changes[branch]["html_url"]
+
+    def update_change(self, change, body: str):
+        with self._lock:
+            changes = self._load_changes()
+            changes[change["branch"]].update(body=body, updated_at=time.time())
+            self._save_changes(changes)
+
+    def list_changes(self, since: str = None):
+        with self._lock:
+            changes = self._load_changes()
+            merged = [c for c in changes.values() if c["state"] == "open" and self._is_merged(c["branch"])]
+            for change in merged:
+                change.update(state="merged", updated_at=time.time())
+            if merged:
+                self._save_changes(changes)
+        for change in sorted(changes.values(), key=lambda c: c.get("updated_at", c["created_at"])):
+            updated_at = _iso(change.get("updated_at", change["created_at"]))
+            if since and updated_at < since:
+                continue
+            yield {
+                "number": change["number"],
+                "title": change["title"],
+                "body": change["body"],
+                "state": change["state"],
+                "created_at": _iso(change["created_at"]),
+                "updated_at": updated_at,
+                "url": change["html_url"],
+            }
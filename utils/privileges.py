@@ -0,0 +1,218 @@
+import time
+import streamlit as st
+from utils.tracing import span, frame_size
+from utils.session import get_session
+from utils.grants import BULK_OBJECT_TYPES, bulk_object_type
+from utils.references import name_parts, display
+
+# ------------------------ Bitset Helpers ------------------------
+# Role sets are Python ints used as bitsets over integer role ids, so a
+# transitive closure for thousands of roles is a few KB and set union is one
+# OR instruction per machine word.
+
+def _bits(value: int):
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+SINGLE_PART_TYPES = ("DATABASE", "WAREHOUSE", "ROLE", "USER", "ACCOUNT", "INTEGRATION")
+
+# Every role has PUBLIC's privileges
+PUBLIC_ROLE = "PUBLIC"
+
+def qualified_name(object_type: str, name: str, catalog: str = None, schema: str = None) -> str:
+    # Object key from the names ACCOUNT_USAGE stores (case already resolved),
+    # spelt as in a GRANT statement: quoted only where Snowflake needs it.
+    # Typed or YAML names go through name_parts first, so both meet.
+    if object_type in SINGLE_PART_TYPES:
+        parts = (name,)
+    elif object_type == "SCHEMA":
+        parts = (catalog, name)
+    else:
+        parts = (catalog, schema, name)
+    return display(str(p) for p in parts if p)
+
+def role_key(role: str) -> str:
+    # A typed role name as stored: quoted names keep their case
+    return name_parts(role)[0]
+
+def _bulk_keys(object_type: str, parts: tuple):
+    # Keys of the pending ALL grants that would cover the existing object,
+    # e.g. ("ALL TABLES IN SCHEMA", "DB.SCH") for TABLE DB.SCH.T. FUTURE
+    # grants only reach objects created after them, which the account
+    # already reports as per-object grants.
+    if object_type not in BULK_OBJECT_TYPES:
+        return []
+    containers = {"SCHEMA": display(parts[:2]) if len(parts) == 3 else None,
+                  "DATABASE": display(parts[:1]) if len(parts) > 1 else None}
+    return [(bulk_object_type("ALL", object_type, c), containers[c])
+            for c in BULK_OBJECT_TYPES[object_type][1] if containers[c]]
+
+# ------------------------ Index ------------------------
+
+class PrivilegeIndex:
+    # Role hierarchy closure plus object grants, answering
+    #   who_can(privilege, object_type, name) -> roles, users
+    #   role_privileges(role)                 -> every grant the role can use
+    # from memory. Mutations copy the inner structure they touch, so a fork()
+    # can take pending grants without disturbing the shared base snapshot.
+
+    def __init__(self):
+        self.roles = []
+        self.role_ids = {}
+        self.inherits = []      # bitset: roles whose privileges this role has (incl. itself)
+        self.inherited_by = []  # bitset: roles that have this role's privileges (incl. itself)
+        self.role_grants = []   # per role: tuple of (privilege, object_type, name, grant_option)
+        self.role_users = []    # per role: frozenset of users granted it directly
+        self.object_grants = {} # (object_type, name) -> {privilege: bitset of roles}
+        self.loaded_at = None
+
+    def _role_id(self, role: str) -> int:
+        # `role` as stored; role_key() turns typed names into that form
+        rid = self.role_ids.get(role)
+        if rid is None:
+            rid = len(self.roles)
+            self.roles.append(role)
+            self.role_ids[role] = rid
+            self.inherits.append(1 << rid)
+            self.inherited_by.append(1 << rid)
+            self.role_grants.append(())
+            self.role_users.append(frozenset())
+            if role != PUBLIC_ROLE:
+                self._link(self._role_id(PUBLIC_ROLE), rid)
+        return rid
+
+    # ── Building ──
+    def add_role_grant(self, child: str, parent: str):
+        # GRANT ROLE child TO ROLE parent
+        self._link(self._role_id(role_key(child)), self._role_id(role_key(parent)))
+
+    def _link(self, c: int, p: int):
+        # Role p and everything above it gain everything role c (and below)
+        # already has.
+        if self.inherits[p] >> c & 1:
+            return
+        gained = self.inherits[c]
+        above = self.inherited_by[p]
+        for a in _bits(above):
+            self.inherits[a] |= gained
+        for d in _bits(gained):
+            self.inherited_by[d] |= above
+
+    def add_grant(self, role: str, privilege: str, object_type: str, name: str, grant_option: bool = False):
+        object_type = str(object_type).upper()
+        privilege = str(privilege).upper()
+        if object_type == "ROLE" and privilege == "USAGE":
+            self.add_role_grant(name, role)
+            return
+        rid = self._role_id(role_key(role))
+        key = (object_type, display(name_parts(name)))
+        privileges = dict(self.object_grants.get(key, {}))
+        privileges[privilege] = privileges.get(privilege, 0) | (1 << rid)
+        self.object_grants[key] = privileges
+        self.role_grants[rid] = self.role_grants[rid] + ((privilege, key[0], key[1], bool(grant_option)),)
+
+    def add_user_grant(self, user: str, role: str):
+        rid = self._role_id(role_key(role))
+        self.role_users[rid] = self.role_users[rid] | {str(user).upper()}
+
+    def fork(self):
+        # Shallow copy: O(roles + objects) pointer copies, no inner data.
+        other = PrivilegeIndex()
+        other.roles = list(self.roles)
+        other.role_ids = dict(self.role_ids)
+        other.inherits = list(self.inherits)
+        other.inherited_by = list(self.inherited_by)
+        other.role_grants = list(self.role_grants)
+        other.role_users = list(self.role_users)
+        other.object_grants = dict(self.object_grants)
+        other.loaded_at = self.loaded_at
+        return other
+
+    # ── Queries ──
+    def who_can(self, privilege: str, object_type: str, name: str):
+        # Roles and users that can use `privilege` on the object, directly or
+        # through the hierarchy. OWNERSHIP implies every privilege; a pending
+        # ALL grant on its schema or database counts too. A grant to PUBLIC
+        # reaches every role, and so every user with any role.
+        object_type = str(object_type).upper()
+        parts = name_parts(name)
+        key = (object_type, display(parts))
+        holders = 0
+        for k in [key] + _bulk_keys(object_type, parts):
+            privileges = self.object_grants.get(k, {})
+            holders |= privileges.get(str(privilege).upper(), 0) | privileges.get("OWNERSHIP", 0)
+        reach = 0
+        for h in _bits(holders):
+            reach |= self.inherited_by[h]
+        roles = sorted(self.roles[r] for r in _bits(reach))
+        users = set()
+        for r in _bits(reach):
+            users |= self.role_users[r]
+        return roles, sorted(users)
+
+    def role_privileges(self, role: str):
+        # Every (privilege, object_type, name, via_role, grant_option) the role
+        # can use, including inherited grants.
+        rid = self.role_ids.get(role_key(role))
+        if rid is None:
+            return []
+        rows = []
+        for r in _bits(self.inherits[rid]):
+            via = self.roles[r]
+            rows += [(p, t, n, via, g) for p, t, n, g in self.role_grants[r]]
+        return rows
+
+    def inherited_roles(self, role: str):
+        rid = self.role_ids.get(role_key(role))
+        if rid is None:
+            return []
+        return sorted(self.roles[r] for r in _bits(self.inherits[rid]) if r != rid)
+
+# ------------------------ Loading ------------------------
+
+def load_privilege_index(session):
+    # Two bulk queries; the hierarchy and grants are assembled client-side.
+    # Grants are collected into mutable lists first and frozen once, rather
+    # than going through add_grant's copy-on-write path row by row.
+    index = PrivilegeIndex()
+    with span("snowflake.grants_to_roles") as s:
+        grants = session.sql("""
+            SELECT PRIVILEGE, GRANTED_ON, NAME, TABLE_CATALOG, TABLE_SCHEMA, GRANTEE_NAME, GRANT_OPTION
+            FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES
+            WHERE DELETED_ON IS NULL AND GRANTED_TO = 'ROLE'
+        """).to_pandas()
+        s["rows"], s["bytes"] = len(grants), frame_size(grants)
+    role_grants = {}
+    for privilege, granted_on, name, catalog, schema, grantee, option in grants.itertuples(index=False, name=None):
+        granted_on = str(granted_on).replace("_", " ")
+        if granted_on == "ROLE" and privilege == "USAGE":
+            index._link(index._role_id(name), index._role_id(grantee))
+            continue
+        rid = index._role_id(grantee)
+        key = (granted_on, qualified_name(granted_on, name, catalog, schema))
+        privileges = index.object_grants.setdefault(key, {})
+        privileges[privilege] = privileges.get(privilege, 0) | (1 << rid)
+        role_grants.setdefault(rid, []).append((privilege, key[0], key[1], str(option).lower() == "true"))
+    for rid, rows in role_grants.items():
+        index.role_grants[rid] = tuple(rows)
+
+    with span("snowflake.grants_to_users") as s:
+        users = session.sql("""
+            SELECT ROLE, GRANTEE_NAME
+            FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_USERS
+            WHERE DELETED_ON IS NULL
+        """).to_pandas()
+        s["rows"], s["bytes"] = len(users), frame_size(users)
+    role_users = {}
+    for role, user in users.itertuples(index=False, name=None):
+        role_users.setdefault(index._role_id(role), set()).add(str(user).upper())
+    for rid, members in role_users.items():
+        index.role_users[rid] = frozenset(members)
+    index.loaded_at = time.time()
+    return index
+
+@st.cache_resource(ttl=900, show_spinner="Loading grants…")
+def get_privilege_index():
+    return load_privilege_index(get_session())
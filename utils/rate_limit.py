@@ -0,0 +1,159 @@
+import hashlib
+import random
+import threading
+import time
+from utils.tracing import span
+
+# ------------------------ GitHub Rate Limits ------------------------
+# Every GitHub request goes through Governor.call for its token. Two token
+# buckets pace requests before they are sent:
+#   reads  - refilled at the primary limit's remaining quota spread over the
+#            time left until X-RateLimit-Reset, re-sized from every response
+#   writes - GitHub's secondary limit on content-creating requests
+# A rate-limit rejection (403/429 with Retry-After, or remaining = 0) holds
+# every call for that token until it may retry; the rejected request was not
+# processed, so it is retried whatever it was. 5xx and connection errors are
+# retried with jittered exponential backoff for idempotent steps only.
+
+READ_BURST = 20
+WRITE_BURST = 10
+WRITES_PER_MINUTE = 80
+SECONDARY_LIMIT_WAIT_SECONDS = 60  # GitHub's advice when there is no Retry-After
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+MAX_WAIT_SECONDS = 300  # longer than this fails the job rather than holding a worker
+
+class RateLimited(Exception):
+    pass
+
+class _Bucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        # Takes a token (going into debt if there is none) and returns how
+        # long to wait before using it. Caller holds the governor's lock.
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0.0)
+
+def _headers(e) -> dict:
+    return {k.lower(): v for k, v in (getattr(e, "headers", None) or {}).items()}
+
+def _status(e):
+    return getattr(e, "status", None)
+
+def _is_transient(e) -> bool:
+    status = _status(e)
+    if isinstance(status, int):
+        return status >= 500
+    # requests/urllib3 connection errors and timeouts carry no status
+    return isinstance(e, (ConnectionError, TimeoutError)) or type(e).__module__.startswith(("requests", "urllib3"))
+
+class Governor:
+    def __init__(self, label: str):
+        self.label = label
+        self._lock = threading.Lock()
+        self.reads = _Bucket(5000 / 3600, READ_BURST)
+        self.writes = _Bucket(WRITES_PER_MINUTE / 60, WRITE_BURST)
+        self.blocked_until = 0.0
+        self.stats = {"token": label, "limit": None, "remaining": None, "resets_at": None,
+                      "requests": 0, "rate_limited": 0, "retries": 0, "waited_s": 0.0}
+
+    def observe(self, limit, remaining, reset):
+        # From X-RateLimit-* (PyGithub keeps the latest on the requester).
+        if limit is None or remaining is None or int(limit) < 0:
+            return
+        with self._lock:
+            self.stats.update(limit=int(limit), remaining=int(remaining), resets_at=int(reset) if reset else None)
+            window = max((int(reset) - time.time()) if reset else 3600, 1)
+            self.reads.rate = max(int(remaining), 1) / window
+            if int(remaining) == 0 and reset:
+                self.blocked_until = max(self.blocked_until, float(reset))
+
+    def refund(self):
+        # For a read GitHub did not count against the limit (a 304)
+        with self._lock:
+            self.reads.tokens = min(self.reads.capacity, self.reads.tokens + 1)
+
+    def _retry_delay(self, e, attempt: int, idempotent: bool):
+        # -> seconds to wait before retrying e, or None to give up
+        headers = _headers(e)
+        status = _status(e)
+        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if status in (403, 429):
+            message = str(getattr(e, "data", "") or "").lower()
+            if "retry-after" in headers:
+                delay = float(headers["retry-after"])
+            elif headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                delay = float(headers["x-ratelimit-reset"]) - time.time() + 1
+            elif "rate limit" in message:
+                delay = SECONDARY_LIMIT_WAIT_SECONDS + backoff
+            else:
+                return None  # a real permission error
+            with self._lock:
+                self.stats["rate_limited"] += 1
+                self.blocked_until = max(self.blocked_until, time.time() + delay)
+            return max(delay, 0)
+        if idempotent and _is_transient(e):
+            return backoff
+        return None
+
+    def call(self, operation: str, fn, write: bool = False, idempotent: bool = True, requester=None):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            with self._lock:
+                wait = max(self.blocked_until - time.time(), 0) + (self.writes if write else self.reads).reserve()
+                self.stats["requests"] += 1
+            if wait > MAX_WAIT_SECONDS:
+                raise RateLimited(f"GitHub rate limit reached; try again after "
+                                  f"{time.strftime('%H:%M:%S', time.localtime(time.time() + wait))}.")
+            if wait > 0:
+                with span("github.rate_wait", target=operation):
+                    time.sleep(wait)
+                with self._lock:
+                    self.stats["waited_s"] += wait
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, idempotent)
+                if delay is None or attempt == MAX_ATTEMPTS:
+                    raise
+                if delay > MAX_WAIT_SECONDS:
+                    raise RateLimited(f"GitHub rate limit reached; try again in {delay / 60:.0f} minutes.") from e
+                with self._lock:
+                    self.stats["retries"] += 1
+                    self.stats["waited_s"] += delay
+                with span("github.retry_wait", target=operation, attempt=attempt):
+                    time.sleep(delay)
+            finally:
+                if requester is not None:
+                    remaining, limit = getattr(requester, "rate_limiting", (-1, -1))
+                    self.observe(limit, remaining, getattr(requester, "rate_limiting_resettime", None))
+
+_lock = threading.Lock()
+_governors = {}
+
+def governor(token: str) -> Governor:
+    # One per token: GitHub's limits are per user/app, not per repo.
+    with _lock:
+        if token not in _governors:
+            label = hashlib.sha256(str(token).encode()).hexdigest()[:8]
+            _governors[token] = Governor(label)
+        return _governors[token]
+
+def rate_limit_status():
+    # For the diagnostics page; tokens appear only as a short hash.
+    with _lock:
+        governors = list(_governors.values())
+    rows = []
+    for g in governors:
+        with g._lock:
+            rows.append({**g.stats, "waited_s": round(g.stats["waited_s"], 1),
+                         "blocked_s": round(max(g.blocked_until - time.time(), 0), 1)})
+    return rows
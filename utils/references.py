@@ -0,0 +1,226 @@
+import threading
+from collections import Counter
+from utils.grants import parse_bulk
+from utils.tracing import span, frame_size
+
+# ------------------------ Reference Checks ------------------------
+# Names a change refers to (a user's default role, a grant's object...) are
+# checked against in-memory sets before anything is sent to GitHub, so a typo
+# is reported on the page instead of by a failed apply after the merge.
+#
+# Roles, warehouses and network policies come from the catalog's SHOW load.
+# Databases come from SHOW DATABASES; schemas, tables and views from
+# ACCOUNT_USAGE, which can lag behind new objects, so a name that is missing
+# from the sets is looked up live with SHOW ... LIKE before it is reported.
+# Names are kept as tuples of identifier parts, as Snowflake stores them.
+
+REFERENCE_KINDS = {
+    "role": {"label": "Role", "parts": 1, "recheck": "SHOW ROLES LIKE {like}"},
+    "warehouse": {"label": "Warehouse", "parts": 1, "recheck": "SHOW WAREHOUSES LIKE {like}"},
+    "network_policy": {"label": "Network policy", "parts": 1, "recheck": None},
+    "database": {"label": "Database", "parts": 1, "recheck": "SHOW DATABASES LIKE {like}"},
+    "schema": {"label": "Schema", "parts": 2, "parent": "database",
+               "recheck": "SHOW SCHEMAS LIKE {like} IN DATABASE {parent}"},
+    "table": {"label": "Table", "parts": 3, "parent": "schema",
+              "recheck": "SHOW TABLES LIKE {like} IN SCHEMA {parent}"},
+    "view": {"label": "View", "parts": 3, "parent": "schema",
+             "recheck": "SHOW VIEWS LIKE {like} IN SCHEMA {parent}"},
+}
+OBJECT_KINDS = ("database", "schema", "table", "view")
+
+# Grant object types -> reference kind
+GRANT_OBJECT_KINDS = {
+    "TABLE": "table",
+    "VIEW": "view",
+    "SCHEMA": "schema",
+    "DATABASE": "database",
+    "WAREHOUSE": "warehouse",
+}
+
+# Live lookups per check; past this, misses are reported without one.
+MAX_RECHECKS = 50
+
+SCHEMATA_SQL = """
+    SELECT CATALOG_NAME, SCHEMA_NAME
+    FROM SNOWFLAKE.ACCOUNT_USAGE.SCHEMATA
+    WHERE DELETED IS NULL
+"""
+
+TABLES_SQL = """
+    SELECT TABLE_CATALOG, TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE = 'VIEW' AS IS_VIEW
+    FROM SNOWFLAKE.ACCOUNT_USAGE.TABLES
+    WHERE DELETED IS NULL
+"""
+
+def name_parts(name) -> tuple:
+    # 'db.sch."My Table"' -> ("DB", "SCH", "My Table"). Unquoted parts
+    # resolve to upper case, quoted parts keep their case.
+    parts, part, quoted, i = [], [], False, 0
+    text = str(name).strip()
+    while i < len(text):
+        c = text[i]
+        if c == '"':
+            if quoted and text[i + 1:i + 2] == '"':
+                part.append('"')
+                i += 1
+            else:
+                quoted = not quoted
+                part.append(c)
+        elif c == "." and not quoted:
+            parts.append("".join(part))
+            part = []
+        else:
+            part.append(c)
+        i += 1
+    parts.append("".join(part))
+    return tuple(
+        p.strip()[1:-1] if len(p.strip()) > 1 and p.strip().startswith('"') and p.strip().endswith('"')
+        else p.strip().upper()
+        for p in parts
+    )
+
+def quote_ident(part: str) -> str:
+    # One stored identifier as SQL, quoted (with embedded quotes doubled) when
+    # it is not a plain upper-case name.
+    simple = part and (part[0].isalpha() or part[0] == "_") and all(c.isalnum() or c in "_$" for c in part)
+    return part if simple and part == part.upper() else '"' + part.replace('"', '""') + '"'
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def display(parts) -> str:
+    return ".".join(quote_ident(p) for p in parts)
+
+class ReferenceIndex:
+    # One per catalog load. Object names are only loaded the first time a
+    # check needs them; the users page never does.
+
+    def __init__(self, session, names: dict):
+        self.session = session
+        self._sets = {kind: None if values is None else {(str(v),) for v in values}
+                      for kind, values in names.items()}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _load_objects(self):
+        session = self.session
+        with span("snowflake.reference_names") as s:
+            db_job = session.sql("SHOW DATABASES").collect_nowait()
+            schema_job = session.sql(SCHEMATA_SQL).to_pandas(block=False)
+            table_job = session.sql(TABLES_SQL).to_pandas(block=False)
+            db_job.result()
+            databases = session.sql(f"SELECT \"name\" AS NAME FROM TABLE(RESULT_SCAN('{db_job.query_id}'))").to_pandas()
+            self._sets["database"] = {(n,) for n in databases["NAME"]}
+            try:
+                schemas = schema_job.result()
+                tables = table_job.result()
+            except Exception:
+                # No access to ACCOUNT_USAGE: schemas/tables/views go unchecked
+                self._sets.update(schema=None, table=None, view=None)
+                return
+            self._sets["schema"] = set(zip(schemas["CATALOG_NAME"], schemas["SCHEMA_NAME"]))
+            is_view = tables["IS_VIEW"].astype(bool)
+            for kind, rows in (("table", tables[~is_view]), ("view", tables[is_view])):
+                self._sets[kind] = set(zip(rows["TABLE_CATALOG"], rows["TABLE_SCHEMA"], rows["TABLE_NAME"]))
+            s["rows"] = len(databases) + len(schemas) + len(tables)
+            s["bytes"] = frame_size(schemas) + frame_size(tables)
+
+    def _names(self, kind: str):
+        if kind in OBJECT_KINDS and kind not in self._sets:
+            with self._lock:
+                if kind not in self._sets:
+                    self._load_objects()
+        return self._sets.get(kind)
+
+    def count(self, kind: str, container) -> int:
+        # Objects of kind inside a database or schema (name or parts), or
+        # None if that kind isn't loaded. Counted once per catalog load.
+        counts = self._counts.get(kind)
+        if counts is None:
+            names = self._names(kind) if kind in OBJECT_KINDS else None
+            if names is None:
+                return None
+            counts = Counter()
+            for parts in names:
+                for depth in range(1, len(parts)):
+                    counts[parts[:depth]] += 1
+            self._counts[kind] = counts
+        return counts.get(container if isinstance(container, tuple) else name_parts(container), 0)
+
+    def _first_missing(self, kind: str, parts: tuple):
+        # -> (kind, parts) of the outermost level that isn't known, or None.
+        spec = REFERENCE_KINDS[kind]
+        if spec.get("parent"):
+            missing = self._first_missing(spec["parent"], parts[:-1])
+            if missing:
+                return missing
+        names = self._names(kind)
+        if names is None or parts in names:
+            return None
+        return kind, parts
+
+    def _recheck(self, misses):
+        # Look the misses up live, all queries in flight at once; any that
+        # exist are added to the sets.
+        jobs = []
+        for kind, parts in list(misses)[:MAX_RECHECKS]:
+            sql = REFERENCE_KINDS[kind]["recheck"]
+            if sql:
+                sql = sql.format(like=_literal(parts[-1]), parent=display(parts[:-1]))
+                jobs.append((kind, parts, self.session.sql(sql).collect_nowait()))
+        with span("snowflake.reference_recheck") as s:
+            s["rows"] = len(jobs)
+            for kind, parts, job in jobs:
+                try:
+                    rows = job.result()
+                except Exception:
+                    continue  # parent not visible to this role
+                if any(row["name"] == parts[-1] for row in rows):
+                    self._sets[kind].add(parts)
+
+    def check(self, refs):
+        # refs: iterable of (where, kind, name). Returns one error dict per
+        # reference that doesn't resolve, naming the level that is missing.
+        refs = list(refs)
+        parsed = []
+        errors = []
+        for where, kind, name in refs:
+            spec = REFERENCE_KINDS[kind]
+            parts = name_parts(name)
+            if len(parts) != spec["parts"] or not all(parts):
+                shape = ".".join(["DATABASE", "SCHEMA", "NAME"][-spec["parts"]:])
+                errors.append({"where": where, "name": name,
+                               "error": f"{spec['label']} `{name}` must be written as {shape}."})
+            else:
+                parsed.append((where, kind, name, parts))
+
+        misses = {self._first_missing(kind, parts) for _, kind, _, parts in parsed} - {None}
+        if misses:
+            self._recheck(misses)
+
+        for where, kind, name, parts in parsed:
+            missing = self._first_missing(kind, parts)
+            if missing:
+                label = REFERENCE_KINDS[missing[0]]["label"]
+                errors.append({"where": where, "name": name,
+                               "error": f"{label} `{display(missing[1])}` does not exist."})
+        return errors
+
+    def missing(self, kind: str, names):
+        # Set of the given names (as passed in) that don't resolve.
+        names = [n for n in set(names) if n]
+        return {e["name"] for e in self.check((None, kind, n) for n in names)}
+
+def grant_references(entries):
+    # (where, kind, name) for the role and object of each grant entry; for
+    # ALL/FUTURE grants the object is the schema or database.
+    refs = []
+    for i, entry in enumerate(entries, 1):
+        on = entry.get("on") or {}
+        where = f"Grant {i} ({entry.get('role')} on {on.get('name')})"
+        refs.append((where, "role", entry.get("role")))
+        bulk = parse_bulk(on.get("object_type"))
+        kind = GRANT_OBJECT_KINDS.get(bulk[2] if bulk else str(on.get("object_type")).upper())
+        if kind:
+            refs.append((where, kind, on.get("name")))
+    return refs
@@ -0,0 +1,142 @@
+from bisect import bisect_left, bisect_right
+import streamlit as st
+
+# ------------------------ Name Index ------------------------
+
+PICKER_PAGE_SIZE = 50
+
+class NameIndex:
+    # Case-insensitive search over a fixed set of names, built once per catalog
+    # load. Prefix matches are a bisect over the sorted, case-folded names.
+    # Substring matches use str.find over the same names joined into one
+    # string, so the scan runs in C and stops as soon as the page is full.
+
+    def __init__(self, names):
+        pairs = sorted((str(n).casefold(), n) for n in names)
+        self._folded = [f for f, _ in pairs]
+        self.names = [n for _, n in pairs]
+        self._blob = "\n".join(self._folded)
+        self._starts = []
+        offset = 0
+        for f in self._folded:
+            self._starts.append(offset)
+            offset += len(f) + 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        folded = str(name).casefold()
+        lo = bisect_left(self._folded, folded)
+        hi = bisect_right(self._folded, folded, lo)
+        return name in self.names[lo:hi]
+
+    def _prefix_range(self, folded: str):
+        lo = bisect_left(self._folded, folded)
+        hi = bisect_right(self._folded, folded + "\U0010ffff", lo)
+        return lo, hi
+
+    def _substring_matches(self, folded: str, skip):
+        # Yields indexes of names containing `folded` outside the prefix range.
+        lo, hi = skip
+        pos = self._blob.find(folded)
+        while pos != -1:
+            i = bisect_right(self._starts, pos) - 1
+            if not lo <= i < hi:
+                yield i
+            # Jump to the next name so each name is reported once.
+            pos = self._blob.find(folded, self._starts[i] + len(self._folded[i]) + 1)
+
+    def search(self, query: str, limit: int = PICKER_PAGE_SIZE, page: int = 0):
+        # -> (names, has_more). Prefix matches come first, then names that
+        # contain the query elsewhere, each group in sorted order.
+        folded = (query or "").strip().casefold()
+        start, stop = page * limit, (page + 1) * limit
+        if not folded:
+            return self.names[start:stop], stop < len(self.names)
+        lo, hi = self._prefix_range(folded)
+        matches = list(range(lo, hi)[start:stop + 1])
+        if len(matches) <= stop - start:
+            skip = max(0, start - (hi - lo))
+            for n, i in enumerate(self._substring_matches(folded, (lo, hi))):
+                if n < skip:
+                    continue
+                matches.append(i)
+                if len(matches) > stop - start:
+                    break
+        has_more = len(matches) > stop - start
+        return [self.names[i] for i in matches[:limit]], has_more
+
+# ------------------------ Picker ------------------------
+
+def object_picker(label: str, index: NameIndex, key: str):
+    # Search box plus a selectbox holding one page of matches, so only
+    # PICKER_PAGE_SIZE options are sent to the browser however large the
+    # account is. Returns the selected name or None.
+    query = st.text_input(label, key=f"{key}_query", placeholder=f"Search {len(index):,} names…")
+    if st.session_state.get(f"{key}_last_query") != query:
+        st.session_state[f"{key}_last_query"] = query
+        st.session_state[f"{key}_page"] = 0
+    page = st.session_state.get(f"{key}_page", 0)
+
+    names, has_more = index.search(query, page=page)
+    if not names:
+        st.caption("No matches.")
+        return None
+
+    if page or has_more:
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            if st.button("‹ Prev", key=f"{key}_prev", disabled=page == 0, use_container_width=True):
+                st.session_state[f"{key}_page"] = page - 1
+                st.rerun()
+        with col_info:
+            first = page * PICKER_PAGE_SIZE + 1
+            st.caption(f"Matches {first:,}–{first + len(names) - 1:,}" + (" (more available, refine the search)" if has_more else ""))
+        with col_next:
+            if st.button("Next ›", key=f"{key}_next", disabled=not has_more, use_container_width=True):
+                st.session_state[f"{key}_page"] = page + 1
+                st.rerun()
+
+    return st.selectbox(label, names, key=f"{key}_select", label_visibility="collapsed")
+
+def reference_select(label: str, load_index, value: str = None, optional: bool = False, key: str = None):
+    # Search box plus a selectbox of one page of matching names that exist in
+    # the account, like object_picker. `load_index` returns the NameIndex (or
+    # None when the names can't be listed, in which case the typed text is
+    # used as is) and is only called once there is something to look up, so
+    # an empty form never loads the catalog. A current value the account no
+    # longer has stays selected and is flagged, so opening an object never
+    # silently changes it. Returns "" when nothing is chosen.
+    key = key or f"ref_{label}"
+    if st.session_state.get(f"{key}_initial", "") != (value or ""):
+        st.session_state[f"{key}_initial"] = value or ""
+        st.session_state[f"{key}_chosen"] = value or ""
+    chosen = st.session_state.get(f"{key}_chosen", "")
+
+    query = st.text_input(label, key=f"{key}_query", placeholder=chosen or "Type to search…")
+    index = load_index() if query.strip() or chosen else None
+    if (query.strip() or chosen) and index is None:
+        return query.strip() or chosen
+
+    names, has_more = index.search(query) if query.strip() else ([], False)
+    options = ([chosen] if chosen else []) + [n for n in names if n != chosen]
+    if optional:
+        options.insert(0, "")
+    if not options:
+        if query.strip():
+            st.caption("No matches.")
+        return ""
+    choice = st.selectbox(
+        label, options,
+        index=options.index(chosen) if chosen or optional else None,
+        format_func=lambda name: name or "(none)",
+        placeholder="Choose…",
+        label_visibility="collapsed",
+    )
+    if has_more:
+        st.caption(f"First {len(names)} matches shown, refine the search.")
+    st.session_state[f"{key}_chosen"] = choice or ""
+    if choice and choice == value and value not in index:
+        st.caption(f"`{value}` no longer exists in the account.")
+    return choice or ""
@@ -0,0 +1,11 @@
+import streamlit as st
+
+# ------------------------ Snowpark Session ------------------------
+# snowflake.snowpark takes most of a second to import, so it is imported on
+# the first call rather than when a page loads; pages that are served from
+# warm caches never pay for it. The session is one per app process.
+
+@st.cache_resource(show_spinner=False)
+def get_session():
+    from snowflake.snowpark.context import get_active_session
+    return get_active_session()
@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.tracing import end_page
 
 def inject_shared_css():
     st.markdown("""
@@ -53,6 +54,12 @@ def inject_shared_css():
             border-radius: 12px;
         }
 
+        /* ───────────── Hidden Pages ───────────── */
+        /* Diagnostics is reachable by URL only */
+        [data-testid="stSidebarNav"] li:has(a[href$="/Diagnostics"]) {
+            display: none;
+        }
+
         /* ───────────── Page Containers ───────────── */
         .tool-container, .home-container {
             max-width: 800px;
@@ -64,4 +71,16 @@ def inject_shared_css():
         }
 
         </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+
+def render_footer():
+    st.markdown("---", unsafe_allow_html=True)
+    st.markdown("""
+        <div style='text-align: center; color: grey; font-size: 0.85rem; padding: 1rem 0;'>
+            © 2025 Created by Practiv
+        </div>
+    """, unsafe_allow_html=True)
+
+    st.image("logo_practiv.png", use_container_width=True)
+    end_page()
@@ -0,0 +1,108 @@
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import streamlit as st
+
+# ------------------------ Span Buffer ------------------------
+# Process-wide ring buffer of finished spans. Each span is a small dict, so
+# the default 20k spans stay around a few MB however long the app runs.
+
+SPAN_BUFFER_SIZE = 20000
+
+_lock = threading.Lock()
+_spans = deque(maxlen=SPAN_BUFFER_SIZE)
+_page = contextvars.ContextVar("trace_page", default=None)
+
+def _record(span: dict):
+    with _lock:
+        _spans.append(span)
+
+@contextmanager
+def span(operation: str, **attrs):
+    # with span("snowflake.show_users") as s:
+    #     df = ...
+    #     s["rows"] = len(df)
+    # Callers fill in rows/bytes when they know them; errors are recorded
+    # and re-raised.
+    s = {"operation": operation, "page": _page.get() or "background", "rows": None, "bytes": None,
+         "error": None, **attrs}
+    start = time.perf_counter()
+    s["started_at"] = time.time()
+    try:
+        yield s
+    except BaseException as e:
+        # st.stop()/st.rerun() unwind through spans as exceptions too.
+        if isinstance(e, Exception):
+            s["error"] = type(e).__name__
+        raise
+    finally:
+        s["ms"] = (time.perf_counter() - start) * 1000
+        _record(s)
+
+def frame_size(df) -> int:
+    return int(df.memory_usage(index=False).sum())
+
+# ------------------------ Page Reruns ------------------------
+
+def begin_page(name: str):
+    # Called at the top of a page; the matching end_page() runs from the
+    # footer, so every rerun that reaches the footer records one span.
+    _page.set(name)
+    st.session_state["_trace_page"] = name
+    st.session_state["_trace_rerun"] = (name, time.perf_counter(), time.time())
+
+def end_page():
+    started = st.session_state.pop("_trace_rerun", None)
+    if not started:
+        return
+    name, start, wall = started
+    _record({"operation": "page.rerun", "page": name, "rows": None, "bytes": None, "error": None,
+             "started_at": wall, "ms": (time.perf_counter() - start) * 1000})
+
+def page_fragment(fn):
+    # st.fragment that records each rerun of its own as a "page.fragment"
+    # span, next to the page.rerun spans of full reruns.
+    @st.fragment
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # A fragment rerun skips begin_page, so the page comes from the session
+        _page.set(st.session_state.get("_trace_page"))
+        with span("page.fragment", target=fn.__name__):
+            return fn(*args, **kwargs)
+    return run
+
+# ------------------------ Summaries ------------------------
+
+def get_spans():
+    with _lock:
+        return list(_spans)
+
+def clear_spans():
+    with _lock:
+        _spans.clear()
+
+def summarise(spans, by=("operation",)):
+    # One row per group: count, p50/p95/p99/max ms, errors, rows and bytes.
+    import numpy as np
+    groups = {}
+    for s in spans:
+        groups.setdefault(tuple(s.get(k) for k in by), []).append(s)
+    rows = []
+    for key, items in sorted(groups.items(), key=lambda kv: [str(k) for k in kv[0]]):
+        ms = np.fromiter((s["ms"] for s in items), dtype=float, count=len(items))
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        rows.append({
+            **dict(zip(by, key)),
+            "count": len(items),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(ms.max()), 1),
+            "errors": sum(1 for s in items if s["error"]),
+            "rows": sum(s["rows"] or 0 for s in items),
+            "bytes": sum(s["bytes"] or 0 for s in items),
+        })
+    return rows
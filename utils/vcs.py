@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from utils.github import get_current_user
+from utils.yaml_merge import merge_yaml
+from utils.tracing import span
+
+# ------------------------ Backends ------------------------
+# Where submitted YAML goes. The repo setting (GITHUB_REPO) picks the
+# backend: "owner/name" is a GitHub repo (utils.github.GitHubBackend), a
+# path or file:// URL is a local bare or working git repository
+# (utils.local_git.LocalGitBackend). A backend provides:
+#   default_branch
+#   head(branch) -> commit            latest commit on branch (has .sha)
+#   read_file(path, ref) -> str|None  file contents at a commit sha
+#   commit(files, base, message)      one commit on top of base; None deletes
+#   create_branch(branch, commit, replace=False)
+#   move_branch(branch, commit, force=False)
+#   find_change(branch)               open change request from branch, or None
+#   change_is_open(change) -> bool
+#   open_change(branch, title, body) -> url
+#   update_change(change, body)       replace a change request's description
+#   list_changes(since=None)          change requests updated at/after since
+#                                     (ISO 8601 UTC), oldest first, as dicts:
+#                                     number, title, body, state (open, merged
+#                                     or closed), created_at, updated_at, url
+
+_lock = threading.Lock()
+_local = {}
+
+DEFAULT_REPO = "jacksongreig/streamlit_SF_perms"
+
+def vcs_settings():
+    # -> (token, repo_name) for every page that submits or lists changes:
+    # the GITHUB_PAT / GITHUB_REPO environment variables, else the app's
+    # secrets (GITHUB_TOKEN / GITHUB_REPO), else the dev defaults.
+    # TEMP: environment first until SYSTEM$GET_SECRET works.
+    secrets = {}
+    try:
+        import streamlit as st
+        secrets = {k: st.secrets[k] for k in ("GITHUB_TOKEN", "GITHUB_REPO") if k in st.secrets}
+    except Exception:
+        pass  # no secrets file
+    token = os.getenv("GITHUB_PAT") or secrets.get("GITHUB_TOKEN") or "<your-token-here>"
+    repo_name = os.getenv("GITHUB_REPO") or secrets.get("GITHUB_REPO") or DEFAULT_REPO
+    return token, repo_name
+
+def local_repo_path(repo_name: str):
+    # -> the path when repo_name names a local repository, else None
+    if repo_name.startswith("file://"):
+        return repo_name[len("file://"):]
+    if os.path.isabs(repo_name) or repo_name.startswith(("./", "../", "~")):
+        return os.path.expanduser(repo_name)
+    return None
+
+def get_backend(token: str, repo_name: str):
+    path = local_repo_path(repo_name)
+    if path is None:
+        from utils.github import GitHubBackend
+        return GitHubBackend(token, repo_name)
+    with _lock:
+        if path not in _local:
+            from utils.local_git import LocalGitBackend
+            _local[path] = LocalGitBackend(path)
+        return _local[path]
+
+def merge_files(backend, files: dict, ref: str):
+    # YAML contents hold only the entries being edited; upsert them into the
+    # file as it is at `ref` so the rest of it is left untouched.
+    merged = {}
+    for path, contents in files.items():
+        if contents is not None and path.endswith((".yaml", ".yml")):
+            current = backend.read_file(path, ref)
+            if current is not None:
+                with span("yaml.merge") as s:
+                    contents = merge_yaml(current, contents)
+                    s["bytes"] = len(contents)
+        merged[path] = contents
+    return merged
+
+# ------------------------ Change Requests ------------------------
+# The body names the submitter and the objects touched, which the history
+# page (utils.history) reads back.
+
+# "- name: X" / "role: X" lines: users, roles, warehouses and grant roles
+_NAME_LINE = re.compile(r"^\s*(?:- )?(?:name|role):\s*(.+?)\s*$", re.M)
+MAX_BODY_OBJECTS = 50
+
+def object_names(files: dict):
+    names = []
+    for path, contents in sorted(files.items()):
+        if contents and path.endswith((".yaml", ".yml")):
+            names += [n.strip("'\"") for n in _NAME_LINE.findall(contents)]
+    return list(dict.fromkeys(names))
+
+def _objects_line(files: dict) -> str:
+    names = object_names(files)
+    if not names:
+        return ""
+    line = "Objects: " + ", ".join(f"`{n}`" for n in names[:MAX_BODY_OBJECTS])
+    if len(names) > MAX_BODY_OBJECTS:
+        line += f" (+{len(names) - MAX_BODY_OBJECTS} more)"
+    return "\n\n" + line
+
+def raise_change(files: dict, token: str, repo_name: str, title: str = None):
+    # A new branch off the default branch with every file in one commit, and
+    # a change request for it. Returns its url.
+    if not files:
+        raise ValueError("No files to commit.")
+
+    snowflake_user = get_current_user()
+    backend = get_backend(token, repo_name)
+
+    paths = sorted(files)
+    label = paths[0] if len(paths) == 1 else f"{len(paths)} files"
+    # Suffixed so two submissions of a file in the same second don't collide
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    branch_name = f"iac-update-{label.replace('/', '_').replace('.', '_').replace(' ', '_')}-{timestamp}"
+    commit_message = f"update: {label}"
+    if len(paths) > 1:
+        commit_message += "\n\n" + "\n".join(f"- {p}" for p in paths)
+
+    base = backend.head(backend.default_branch)
+    commit = backend.commit(merge_files(backend, files, base.sha), base, commit_message)
+    backend.create_branch(branch_name, commit)
+
+    body = f"Generated by Snowflake user: `{snowflake_user}` via the IaC Assistant."
+    if len(paths) > 1:
+        body += "\n\nFiles:\n" + "\n".join(f"- `{p}`" for p in paths)
+    body += _objects_line(files)
+    return backend.open_change(branch_name, title or f"[IaC] Update: {label}", body)
+
+# ------------------------ Rolling Change Requests ------------------------
+# In batching mode each object type has one long-lived branch and change
+# request. A batch of changes is upserted into the files as they are on
+# that branch and pushed as one more commit, so CI and the apply workflow
+# run once per merge rather than once per change. Once the change request
+# is merged or closed the next batch starts the branch again from the
+# default branch. Every push also rewrites the body so its submitter and
+# Objects lines cover all batches so far, not just the first.
+
+# GitHub caps a body at 65536 characters
+MAX_ROLLING_OBJECTS = 1000
+
+_SUBMITTERS_LINE = re.compile(r"^Submitted by Snowflake users: (.+)$", re.M)
+_OBJECTS_LINE = re.compile(r"^Objects: (.+?)(?: \(\+(\d+) more\))?$", re.M)
+
+def rolling_branch(kind: str) -> str:
+    return f"iac-pending-{kind}"
+
+def _rolling_body(kind: str, users, names, more: int = 0) -> str:
+    body = (f"Rolling PR for `{kind}` changes raised via the IaC Assistant. Each commit "
+            "is one batch of submissions; merge to apply them all in one run.\n\n"
+            f"Opened by Snowflake user: `{users[0]}`\n"
+            "Submitted by Snowflake users: " + ", ".join(f"`{u}`" for u in users))
+    more += max(len(names) - MAX_ROLLING_OBJECTS, 0)
+    if names:
+        body += "\n\nObjects: " + ", ".join(f"`{n}`" for n in names[:MAX_ROLLING_OBJECTS])
+        if more:
+            body += f" (+{more} more)"
+    return body
+
+def _add_to_body(kind: str, body: str, user: str, files: dict) -> str:
+    # The rolling body with this batch's submitter and objects added
+    submitters = _SUBMITTERS_LINE.search(body or "")
+    users = re.findall(r"`([^`]+)`", submitters.group(1)) if submitters else []
+    objects = _OBJECTS_LINE.search(body or "")
+    names = re.findall(r"`([^`]+)`", objects.group(1)) if objects else []
+    more = int(objects.group(2) or 0) if objects else 0
+    users = list(dict.fromkeys(users + [user]))
+    names = list(dict.fromkeys(names + object_names(files)))
+    return _rolling_body(kind, users, names, more)
+
+def raise_rolling_change(files: dict, token: str, repo_name: str, kind: str, changes: int = 1):
+    # Adds `files` to the open rolling change request for `kind`, opening
+    # one if there is none. Returns its url.
+    if not files:
+        raise ValueError("No files to commit.")
+
+    snowflake_user = get_current_user()
+    backend = get_backend(token, repo_name)
+    branch = rolling_branch(kind)
+    paths = sorted(files)
+
+    commit_message = f"update: {kind} ({changes} change{'s' if changes != 1 else ''})\n\n"
+    commit_message += "\n".join(f"- {p}" for p in paths)
+    commit_message += f"\n\nSubmitted by Snowflake user: {snowflake_user}"
+
+    for _ in range(2):
+        change = backend.find_change(branch)
+        base = backend.head(branch if change else backend.default_branch)
+        commit = backend.commit(merge_files(backend, files, base.sha), base, commit_message)
+        if not change:
+            break
+        backend.move_branch(branch, commit)
+        if backend.change_is_open(change):
+            backend.update_change(change, _add_to_body(kind, change.get("body"), snowflake_user, files))
+            return change["html_url"]
+        # Merged while we pushed, so this commit missed it: start again from
+        # the default branch.
+
+    # A branch left behind by a merged or closed change request is reset
+    backend.create_branch(branch, commit, replace=True)
+    return backend.open_change(branch, f"[IaC] Pending {kind} changes",
+                               _add_to_body(kind, None, snowflake_user, files))
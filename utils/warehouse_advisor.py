@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.tracing import span, frame_size
+from utils.session import get_session
+
+# ------------------------ Usage History ------------------------
+# All three views are aggregated to one row per warehouse per hour in SQL,
+# so 90 days of history for 200 warehouses is ~430k rows per view instead of
+# millions of 5-minute load samples and individual queries.
+
+ADVISOR_DAYS = 90
+USAGE_TTL_SECONDS = 3600
+
+# Sizes as the catalog spells them (SHOW WAREHOUSES' "X-Large" without the
+# dash), smallest first, with the other names Snowflake accepts for them.
+# Snowpark-optimized warehouses bill a flat multiple of these rates, so the
+# ratios below hold for them too; they start at MEDIUM.
+SIZES = ["XSMALL", "SMALL", "MEDIUM", "LARGE", "XLARGE", "2XLARGE", "3XLARGE", "4XLARGE", "5XLARGE", "6XLARGE"]
+SIZE_ALIASES = {
+    "XXLARGE": "2XLARGE", "X2LARGE": "2XLARGE", "XXXLARGE": "3XLARGE", "X3LARGE": "3XLARGE",
+    "X4LARGE": "4XLARGE", "X5LARGE": "5XLARGE", "X6LARGE": "6XLARGE",
+}
+SIZE_INDEX = {**{s: i for i, s in enumerate(SIZES)}, **{a: SIZES.index(s) for a, s in SIZE_ALIASES.items()}}
+CREDITS_PER_HOUR = np.array([1, 2, 4, 8, 16, 32, 64, 128, 256, 512], dtype=float)
+SNOWPARK_MIN_SIZE = SIZES.index("MEDIUM")
+
+METERING_SQL = """
+    SELECT WAREHOUSE_NAME, DATE_TRUNC('hour', START_TIME) AS HOUR,
+           SUM(CREDITS_USED_COMPUTE) AS CREDITS
+    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+    WHERE START_TIME >= DATEADD(day, -{days}, CURRENT_TIMESTAMP()) AND WAREHOUSE_ID > 0
+    GROUP BY 1, 2
+"""
+
+LOAD_SQL = """
+    SELECT WAREHOUSE_NAME, DATE_TRUNC('hour', START_TIME) AS HOUR,
+           AVG(AVG_RUNNING) AS RUNNING, AVG(AVG_QUEUED_LOAD) AS QUEUED,
+           MAX(AVG_RUNNING + AVG_QUEUED_LOAD) AS PEAK_LOAD
+    FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_LOAD_HISTORY
+    WHERE START_TIME >= DATEADD(day, -{days}, CURRENT_TIMESTAMP())
+    GROUP BY 1, 2
+"""
+
+QUERY_SQL = """
+    SELECT WAREHOUSE_NAME, DATE_TRUNC('hour', START_TIME) AS HOUR,
+           COUNT(*) AS QUERIES,
+           SUM(EXECUTION_TIME) / 1000 AS EXECUTION_SECONDS,
+           SUM(QUEUED_OVERLOAD_TIME) / 1000 AS QUEUED_SECONDS,
+           SUM(BYTES_SPILLED_TO_LOCAL_STORAGE) AS LOCAL_SPILL_BYTES,
+           SUM(BYTES_SPILLED_TO_REMOTE_STORAGE) AS REMOTE_SPILL_BYTES,
+           COUNT_IF(BYTES_SPILLED_TO_LOCAL_STORAGE + BYTES_SPILLED_TO_REMOTE_STORAGE > 0) AS SPILLING_QUERIES
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE START_TIME >= DATEADD(day, -{days}, CURRENT_TIMESTAMP())
+      AND WAREHOUSE_NAME IS NOT NULL AND EXECUTION_TIME > 0
+    GROUP BY 1, 2
+"""
+
+def load_warehouse_usage(session, days: int = ADVISOR_DAYS):
+    # The three views are queried concurrently; ACCOUNT_USAGE scans dominate.
+    jobs = {
+        name: session.sql(sql.format(days=int(days))).collect_nowait()
+        for name, sql in (("metering", METERING_SQL), ("load", LOAD_SQL), ("queries", QUERY_SQL))
+    }
+    usage = {}
+    for name, job in jobs.items():
+        with span(f"snowflake.{name}_history") as s:
+            job.result()
+            df = session.sql(f"SELECT * FROM TABLE(RESULT_SCAN('{job.query_id}'))").to_pandas()
+            s["rows"], s["bytes"] = len(df), frame_size(df)
+        df.columns = [c.lower() for c in df.columns]
+        usage[name] = df
+    return usage
+
+@st.cache_data(ttl=USAGE_TTL_SECONDS, show_spinner="Loading warehouse usage history…")
+def get_warehouse_usage(days: int = ADVISOR_DAYS):
+    return summarise_usage(load_warehouse_usage(get_session(), days), days)
+
+# ------------------------ Metrics ------------------------
+
+def summarise_usage(usage, days: int = ADVISOR_DAYS):
+    # One row per warehouse:
+    #   credits_per_day     compute credits burned per day
+    #   idle_share          share of credits billed in hours with no running load
+    #   utilisation         mean running load per billed hour
+    #   queued_share        queued / (running + queued) load
+    #   peak_load_p95       95th percentile of hourly peak running+queued load
+    #   spill_share         share of queries that spilled
+    #   remote_spill_gb     GB spilled to remote storage
+    #   mean_exec_seconds   mean execution time per query
+    #   mean_queued_seconds mean time a query waited for a free slot
+    metering = usage["metering"].astype({"credits": float})
+    load = usage["load"].astype({"running": float, "queued": float, "peak_load": float})
+    queries = usage["queries"].astype({
+        "queries": float, "execution_seconds": float, "queued_seconds": float,
+        "local_spill_bytes": float, "remote_spill_bytes": float, "spilling_queries": float,
+    })
+
+    hours = metering.merge(load, on=["warehouse_name", "hour"], how="left")
+    hours[["running", "queued", "peak_load"]] = hours[["running", "queued", "peak_load"]].fillna(0.0)
+    hours["idle_credits"] = np.where(hours["running"] < 0.01, hours["credits"], 0.0)
+
+    by_wh = hours.groupby("warehouse_name")
+    metrics = pd.DataFrame({
+        "credits": by_wh["credits"].sum(),
+        "idle_credits": by_wh["idle_credits"].sum(),
+        "billed_hours": by_wh["credits"].count(),
+        "utilisation": by_wh["running"].mean(),
+        "queued_load": by_wh["queued"].mean(),
+    })
+    metrics["peak_load_p95"] = load.groupby("warehouse_name")["peak_load"].quantile(0.95)
+
+    q = queries.groupby("warehouse_name")[[
+        "queries", "execution_seconds", "queued_seconds", "remote_spill_bytes", "spilling_queries",
+    ]].sum()
+    metrics = metrics.join(q, how="outer").fillna(0.0)
+
+    total_queries = metrics["queries"].replace(0, np.nan)
+    metrics["credits_per_day"] = metrics["credits"] / days
+    metrics["idle_share"] = (metrics["idle_credits"] / metrics["credits"].replace(0, np.nan)).fillna(0.0)
+    metrics["queued_share"] = (
+        metrics["queued_load"] / (metrics["utilisation"] + metrics["queued_load"]).replace(0, np.nan)
+    ).fillna(0.0)
+    metrics["spill_share"] = (metrics["spilling_queries"] / total_queries).fillna(0.0)
+    metrics["remote_spill_gb"] = metrics["remote_spill_bytes"] / 1024 ** 3
+    metrics["mean_exec_seconds"] = (metrics["execution_seconds"] / total_queries).fillna(0.0)
+    metrics["mean_queued_seconds"] = (metrics["queued_seconds"] / total_queries).fillna(0.0)
+    metrics.index.name = "name"
+    return metrics
+
+# ------------------------ Recommendations ------------------------
+
+def recommend(metrics, current):
+    # `current` has one row per warehouse (index = name) with the settings
+    # from the catalog. Rules, applied to every warehouse at once:
+    # - size up one step when queries spill to remote storage, or more than
+    #   10% of them spill at all; size down one step when the warehouse runs
+    #   below 30% load without spilling and queries finish in under 10s
+    # - enough clusters to cover the p95 hourly peak at the warehouse's
+    #   MAX_CONCURRENCY_LEVEL; ECONOMY when queueing is negligible
+    # - AUTO_SUSPEND 60s when more than 20% of credits are burned idle
+    # Warehouses whose size isn't in SIZE_INDEX get no recommendation.
+    df = current.join(metrics, how="inner")
+    size_idx = df["warehouse_size"].map(lambda size: SIZE_INDEX.get(str(size).replace("-", "").upper()))
+    df = df[size_idx.notna()]
+    size_idx = size_idx[size_idx.notna()].astype(int).to_numpy()
+    concurrency = pd.to_numeric(df.get("max_concurrency_level", pd.Series(8, index=df.index)), errors="coerce").fillna(8).clip(lower=1)
+    auto_suspend = pd.to_numeric(df["auto_suspend"], errors="coerce").fillna(600)
+
+    spilling = (df["remote_spill_gb"] > 1) | (df["spill_share"] > 0.10)
+    underused = (df["utilisation"] < 0.3) & (df["spill_share"] < 0.01) & (df["mean_exec_seconds"] < 10)
+    snowpark = df.get("warehouse_type", pd.Series("", index=df.index)).astype(str).str.upper().str.startswith("SNOWPARK")
+    min_idx = np.where(snowpark, np.minimum(SNOWPARK_MIN_SIZE, size_idx), 0)
+    new_idx = np.clip(size_idx + np.select([spilling, underused], [1, -1], 0), min_idx, len(SIZES) - 1)
+    step = new_idx - size_idx
+
+    clusters = np.ceil(df["peak_load_p95"] / concurrency).clip(lower=1, upper=10).astype(int)
+    queueing = df["queued_share"] > 0.05
+
+    rec = pd.DataFrame(index=df.index)
+    rec["warehouse_size"] = np.array(SIZES)[new_idx]
+    rec["min_cluster_count"] = 1
+    rec["max_cluster_count"] = clusters
+    rec["scaling_policy"] = np.where(queueing | (clusters == 1), "STANDARD", "ECONOMY")
+    rec["auto_suspend"] = np.where(
+        df["idle_share"] > 0.2, 60, auto_suspend.clip(lower=60, upper=600)
+    ).astype(int)
+
+    # Expected impact, as rough ratios against the observed history. Credits
+    # are size rate x active time. Sizing up for spill roughly halves the
+    # time spilling work runs, so cost is about flat; an underused warehouse
+    # is active mostly for its suspend window, so sizing down halves cost
+    # while its short queries take up to twice as long. Queueing goes away
+    # once the p95 peak fits in the cluster range.
+    size_ratio = CREDITS_PER_HOUR[new_idx] / CREDITS_PER_HOUR[size_idx]
+    active_ratio = np.where(step > 0, 0.5, 1.0)
+    idle_saved = np.where(rec["auto_suspend"] < auto_suspend, df["idle_share"] * 0.5, 0.0)
+    rec["credits_per_day"] = df["credits_per_day"]
+    rec["expected_credits_per_day"] = df["credits_per_day"] * (1 - idle_saved) * size_ratio * active_ratio
+    rec["mean_exec_seconds"] = df["mean_exec_seconds"]
+    rec["expected_exec_seconds"] = df["mean_exec_seconds"] * np.power(2.0, -step)
+    rec["mean_queued_seconds"] = df["mean_queued_seconds"]
+    rec["expected_queued_seconds"] = np.where(
+        clusters * concurrency >= df["peak_load_p95"], 0.0, df["mean_queued_seconds"]
+    )
+    return rec
+
+def current_settings(warehouses: dict, selected: dict = None):
+    # Catalog warehouse records -> one row of settings per warehouse. The
+    # opened warehouse's record also carries its parameters.
+    current = pd.DataFrame.from_dict(warehouses, orient="index")
+    if selected:
+        for key, value in selected.items():
+            current.loc[selected["name"], key] = value
+    return current
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import threading
+from io import StringIO
+from utils.tracing import span
+
+# ------------------------ Emitters ------------------------
+# One ruamel emitter per style for the life of the process, built on first
+# use. A YAML instance keeps state while it dumps, so dumps through the same
+# emitter are serialised; they take a few milliseconds.
+
+YAML_STYLES = {
+    # The layout of the repo's users/roles/warehouses files
+    "repo": {"indent": {"mapping": 2, "sequence": 4, "offset": 2}, "default_flow_style": False},
+    # ruamel's defaults
+    "plain": {},
+}
+
+_lock = threading.Lock()
+_emitters = {}
+
+def _emitter(style: str):
+    emitter = _emitters.get(style)
+    if emitter is None:
+        from ruamel.yaml import YAML
+        options = YAML_STYLES[style]
+        emitter = YAML()
+        if "indent" in options:
+            emitter.indent(**options["indent"])
+        if "default_flow_style" in options:
+            emitter.default_flow_style = options["default_flow_style"]
+        _emitters[style] = emitter
+    return emitter
+
+def dump_yaml(data, style: str = "repo") -> str:
+    stream = StringIO()
+    with _lock:
+        _emitter(style).dump(data, stream)
+    return stream.getvalue()
+
+def dump_yaml_memo(data, memo, key: str, style: str = "repo") -> str:
+    # dump_yaml keyed on a hash of data: memo[key] (a session_state slot)
+    # keeps the last dump, so reruns that leave the form as it was reuse it.
+    digest = hashlib.sha256(json.dumps([style, data], default=str).encode()).hexdigest()
+    cached = memo.get(key)
+    if not cached or cached[0] != digest:
+        with span("yaml.dump") as s:
+            cached = (digest, dump_yaml(data, style))
+            s["bytes"] = len(cached[1])
+        memo[key] = cached
+    return cached[1]
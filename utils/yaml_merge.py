@@ -0,0 +1,193 @@
+import re
+from io import StringIO
+from utils.grants import grant_group_key, combine_grant_entries
+
+# Keyed upsert-merge of edited entries into a repo YAML file shaped like
+#   <kind>:
+#     - name: ...
+# The file is split into one text block per list item in a single pass and
+# indexed by key. Only the blocks being replaced are parsed (round-trip, so
+# their comments and key order survive) and re-emitted; every other byte of
+# the file is copied through unchanged. Cost is linear in the file size plus
+# the size of the edited entries.
+
+PLAIN_VALUE = re.compile(r"[A-Za-z0-9_$@.\-]+")
+
+def _name_key(entry):
+    name = entry.get("name") if hasattr(entry, "get") else None
+    return None if name is None else str(name).strip().upper()
+
+# kind -> (key of an entry, how an existing entry absorbs an update)
+MERGE_RULES = {
+    "grants": (grant_group_key, combine_grant_entries),
+}
+DEFAULT_RULE = (_name_key, None)
+
+def _yaml(typ=None):
+    # ruamel is imported on first merge, not when the pages load
+    from ruamel.yaml import YAML
+    return YAML(typ=typ) if typ else YAML()
+
+def _round_trip():
+    yaml = _yaml()
+    yaml.indent(mapping=2, sequence=4, offset=2)
+    yaml.default_flow_style = False
+    yaml.width = 4096
+    return yaml
+
+def _is_filler(line: str) -> bool:
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+def _is_item(line: str, indent: int) -> bool:
+    rest = line[indent:]
+    return _indent(line) == indent and (rest == "-" or rest.startswith("- "))
+
+def _split_section(lines, kind):
+    # -> (header, item_indent, blocks, end). `header` is the index of the
+    # "<kind>:" line (None if missing), `blocks` are [start, end) line ranges
+    # with trailing blank/comment lines left outside, `end` is where the
+    # section stops.
+    header = None
+    for i, line in enumerate(lines):
+        if line.startswith(f"{kind}:"):
+            value = line[len(kind) + 1:].split("#")[0].strip()
+            if value in ("[]", "~", "null"):
+                lines[i] = f"{kind}:"
+            elif value:
+                raise ValueError(f"`{kind}` is not a block list; can't merge into it.")
+            header = i
+            break
+    if header is None:
+        return None, 2, [], len(lines)
+
+    item_indent = None
+    starts = []
+    end = len(lines)
+    for i in range(header + 1, len(lines)):
+        line = lines[i]
+        if _is_filler(line):
+            continue
+        if _indent(line) == 0 and not line.startswith("-"):
+            end = i
+            break
+        if item_indent is None and line.lstrip(" ").startswith("-"):
+            item_indent = _indent(line)
+        if item_indent is not None and _is_item(line, item_indent):
+            starts.append(i)
+
+    blocks = []
+    for n, start in enumerate(starts):
+        stop = starts[n + 1] if n + 1 < len(starts) else end
+        while stop > start + 1 and _is_filler(lines[stop - 1]):
+            stop -= 1
+        blocks.append([start, stop])
+    return header, 2 if item_indent is None else item_indent, blocks, end
+
+def _block_name(lines, start, stop, item_indent):
+    # Fast path for the default rule: find `name:` at the entry's key indent
+    # without parsing the block.
+    key_indent = item_indent + 2
+    for i in range(start, stop):
+        line = lines[i]
+        rest = line[key_indent:] if i > start else line[item_indent + 1:].lstrip(" ")
+        if i > start and _indent(line) != key_indent:
+            continue
+        if rest.startswith("name:"):
+            value = rest[5:].strip()
+            if PLAIN_VALUE.fullmatch(value):
+                return value.upper()
+            return _name_key(_yaml("safe").load(f"name: {value}") or {})
+    return None
+
+def _block_entry(lines, start, stop, item_indent):
+    text = "\n".join(line[item_indent:] if _indent(line) >= item_indent else line.lstrip(" ")
+                     for line in lines[start:stop])
+    loaded = _round_trip().load(text)
+    return loaded[0] if loaded else None
+
+def _emit(entry, item_indent: int):
+    stream = StringIO()
+    _round_trip().dump(entry, stream)
+    body = stream.getvalue().rstrip("\n").split("\n")
+    pad = " " * item_indent
+    return [f"{pad}- {body[0]}"] + [f"{pad}  {line}" if line else line for line in body[1:]]
+
+def _replace(old, new):
+    # Update the round-trip map in place so comments on surviving keys stay put.
+    for key in [k for k in old if k not in new]:
+        del old[key]
+    for key, value in new.items():
+        old[key] = value
+    return old
+
+def merge_entries(text: str, kind: str, upserts=()):
+    # Upsert `upserts` (entries) in the `kind` section of `text`, returning
+    # the new file contents. Deletes are upserts too: the pages write them as
+    # entries with `action: delete`.
+    key_of, combine = MERGE_RULES.get(kind, DEFAULT_RULE)
+    lines = text.split("\n")
+    header, item_indent, blocks, end = _split_section(lines, kind)
+
+    pending = {}
+    for entry in upserts:
+        key = key_of(entry)
+        pending[key] = combine(pending[key], entry) if combine and key in pending else entry
+
+    replaced = {}
+    for start, stop in blocks:
+        if not pending:
+            break
+        if key_of is _name_key:
+            key = _block_name(lines, start, stop, item_indent)
+            if key not in pending:
+                continue
+            old = _block_entry(lines, start, stop, item_indent)
+        else:
+            old = _block_entry(lines, start, stop, item_indent)
+            key = key_of(old) if old is not None else None
+        if key in pending:
+            new = pending.pop(key)
+            if combine:
+                new = combine(old, new)
+            replaced[start] = (stop, _emit(_replace(old, new) if hasattr(old, "items") else new, item_indent))
+
+    added = [line for entry in pending.values() for line in _emit(entry, item_indent)]
+    if header is None:
+        if lines and lines[-1] == "":
+            lines.pop()
+        return "\n".join(lines + [f"{kind}:"] + added) + "\n"
+
+    out = lines[:header + 1]
+    i = header + 1
+    insert_at = blocks[-1][1] if blocks else header + 1
+    while i < len(lines):
+        if i == insert_at:
+            out += added
+        if i in replaced:
+            stop, new_lines = replaced[i]
+            out += new_lines
+            i = stop
+            continue
+        out.append(lines[i])
+        i += 1
+    if insert_at >= len(lines):
+        out += added
+    return "\n".join(out)
+
+def merge_yaml(existing: str, update: str):
+    # `update` is a document as the pages produce it ({kind: [entries]}).
+    # Each of its sections is merged into `existing`; a missing file just
+    # takes the update.
+    if existing is None or not existing.strip():
+        return update
+    changes = _yaml("safe").load(update) or {}
+    merged = existing
+    for kind, entries in changes.items():
+        merged = merge_entries(merged, kind, entries or [])
+    if not merged.endswith("\n"):
+        merged += "\n"
+    return merged